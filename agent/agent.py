@@ -1,18 +1,20 @@
 from dotenv import load_dotenv
 from google.adk.agents import Agent
 from google.adk.agents.callback_context import CallbackContext
-from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset, StreamableHTTPConnectionParams
-from google.adk.tools.application_integration_tool.application_integration_toolset import ApplicationIntegrationToolset
 from google.genai.types import Part, Blob
 from google.adk.tools import FunctionTool, BaseTool
 from typing import Dict, Any
-from fpdf import FPDF
-from google.adk.memory import VertexAiMemoryBankService
-from google.adk.artifacts import InMemoryArtifactService
-from google.adk.tools.preload_memory_tool import PreloadMemoryTool
 from google.adk.tools.tool_context import ToolContext
-import google.auth
-from google.auth.transport.requests import Request
+from .token_cache import token_cache
+from .tool_cache import tool_cache
+from .compact_results import result_compactor
+from .pdf_renderer import PdfRenderError, pdf_renderer
+from .memory_writer import CloseWithRunner, MemoryWriter, SimulatedMemoryBankService
+from .disk_artifact_service import ArtifactQuotaExceeded, DiskArtifactService
+from .investigation import bundle_tool
+from .tracing import serve_prometheus, tracer
+from .lazy import Lazy, LazyToolset, warm_up
+from .vector_memory import CachedPreloadMemoryTool, open_store
 import os
 import datetime
 load_dotenv()
@@ -21,29 +23,15 @@ load_dotenv()
 # OAuth Configuration
 OAUTH_KEY = "temp:token"
 
-def get_token_from_adc():
-    """ Function to get OAuth token from ADC when running locally (adk web)"""
-    #scopes = ["https://www.googleapis.com/auth/bigquery"]
-    credentials, project_id = google.auth.default()
-    
-    # Force a refresh to get a valid access token.
-    credentials.refresh(Request())
-    oauth_token = credentials.token
-
-    # A quick check to make sure the token isn't None
-    if oauth_token is None:
-        raise ValueError("Failed to retrieve OAuth token from ADC. "
-                        "Make sure you have run 'gcloud auth application-default login'.")
-    return oauth_token
-
-def check_token(tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext): 
+async def check_token(tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext):
     """Before tool callback to check for OAuth token in context"""
 
-    oauth_token = tool_context.state.get(OAUTH_KEY)
-    
     if OAUTH_KEY == "temp:token":
-        # local run, add token from adc
-        tool_context.state[OAUTH_KEY] = get_token_from_adc()
+        # local run, add token from adc (cached process-wide, refreshed off the event loop)
+        with tracer.span('adc_token', 'auth'):
+            oauth_token = await token_cache.get_token()
+        if tool_context.state.get(OAUTH_KEY) != oauth_token:
+            tool_context.state[OAUTH_KEY] = oauth_token
 
     return None
 
@@ -52,22 +40,38 @@ def get_token_from_context(context: ToolContext):
     return {"Authorization": f"Bearer {oauth_token}"}
 
 
-# MCP Toolset configuration
+# MCP Toolset configuration (built on first use or warm-up; see agent/lazy.py)
 port = os.getenv("PORT", "8080")
-mcp_tools = MCPToolset(
-    connection_params=StreamableHTTPConnectionParams(
-        url = os.getenv('MCP_URL')
-    ),
-    header_provider=get_token_from_context,
-)
 
-# Function to generate valid PDF bytes from text content
-def generate_valid_pdf_bytes(text_content: str) -> bytes:
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-    pdf.multi_cell(0, 10, text_content)
-    return pdf.output(dest='S')
+# The false-positive-reduction-toolset in mcp_server/tools.yaml. The server also serves the
+# batch-triage-toolset, whose queue tools (claim, complete, release) only batch_triage may call.
+MCP_TOOL_FILTER = [
+    'get-user-details',
+    'get-user-details-batch',
+    'search-user-by-name',
+    'get-alert-details',
+    'get-alert-details-batch',
+    'trace-money-flow',
+    'analyze-counterparties',
+    'get-recent-transactions',
+    'get-ring-membership',
+    'get-high-priority-alerts',
+]
+
+def create_mcp_toolset():
+    from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset, StreamableHTTPConnectionParams
+    return MCPToolset(
+        connection_params=StreamableHTTPConnectionParams(
+            url = os.getenv('MCP_URL')
+        ),
+        header_provider=get_token_from_context,
+        tool_filter=MCP_TOOL_FILTER,
+    )
+
+mcp_tools = LazyToolset('mcp_toolset', create_mcp_toolset)
+
+# One-call investigation bundle over the same toolset, its session, cache and rate limit
+investigation_bundle_tool = bundle_tool(mcp_tools)
 
 async def create_pdf_file(
     content_to_save: str,
@@ -89,8 +93,13 @@ async def create_pdf_file(
     if tool_context is None:
         return {"status": "error", "message": "Tool context is missing."}
 
-    # 1. Convert text to PDF bytes
-    pdf_bytes = generate_valid_pdf_bytes(content_to_save)
+    # 1. Convert text to PDF bytes (rendered on the worker pool, off the event loop)
+    try:
+        with tracer.span('pdf_render', 'pdf', chars=len(content_to_save)) as span:
+            pdf_bytes = await pdf_renderer.render(content_to_save)
+            span.attributes['bytes'] = len(pdf_bytes)
+    except PdfRenderError as e:
+        return {"status": "error", "message": str(e)}
 
     # 2. Create the ADK Artifact (types.Part)
     artifact_part = Part(
@@ -98,10 +107,14 @@ async def create_pdf_file(
     )
 
     # 3. Save the Artifact to the ADK System
-    version = await tool_context.save_artifact(
-        filename=filename,
-        artifact=artifact_part,
-    )
+    try:
+        with tracer.span('artifact_save', 'pdf', bytes=len(pdf_bytes)):
+            version = await tool_context.save_artifact(
+                filename=filename,
+                artifact=artifact_part,
+            )
+    except ArtifactQuotaExceeded as e:
+        return {"status": "error", "message": str(e)}
 
     # 4. Return structured response (ADK UI intercepts this)
     return {
@@ -117,31 +130,73 @@ pdf_tool = FunctionTool(
 
 
 
-# Application Integration Tool for sending emails
-integration_tool = ApplicationIntegrationToolset(
+# Application Integration Tool for sending emails (fetches the sendEmail spec when built)
+def create_integration_toolset():
+    from google.adk.tools.application_integration_tool.application_integration_toolset import ApplicationIntegrationToolset
+    return ApplicationIntegrationToolset(
+            project=os.getenv('GOOGLE_CLOUD_PROJECT'),
+            location=os.getenv('GOOGLE_CLOUD_LOCATION'),
+            integration="sendEmail",
+            triggers=["api_trigger/send_email"],
+            tool_instructions="Usable to send an email of a conversation."
+        )
+
+integration_tool = LazyToolset('integration_toolset', create_integration_toolset)
+
+# Disk-backed artifact service for PDF storage (deduplicated, bounded per session); opens its
+# directory and database on first use. Runners get it from agent/services.py (adk web/api_server
+# with --artifact_service_uri=disk://) and from batch_triage
+artifact_service = Lazy('artifact_service', DiskArtifactService)
+
+# Memory Bank service for persistent memory storage
+def create_memory_service():
+    if os.getenv('MEMORY_BACKEND') == 'local':
+        # Offline stand-in with simulated Memory Bank latency
+        return SimulatedMemoryBankService()
+    if os.getenv('MEMORY_BACKEND') == 'vector':
+        # Local vector store on disk; memory preload searches it directly
+        return open_store(os.getenv('MEMORY_DIR', '.memory'))
+    from google.adk.memory import VertexAiMemoryBankService
+    return VertexAiMemoryBankService(
         project=os.getenv('GOOGLE_CLOUD_PROJECT'),
         location=os.getenv('GOOGLE_CLOUD_LOCATION'),
-        integration="sendEmail",
-        triggers=["api_trigger/send_email"],
-        tool_instructions="Usable to send an email of a conversation."
+        agent_engine_id=os.getenv('AGENT_ENGINE_ID'),
     )
 
-# In-memory artifact service for PDF storage
-artifact_service = InMemoryArtifactService()
+memory_bank_service = Lazy('memory_service', create_memory_service)
 
-# Memory Bank service for persistent memory storage
-memory_bank_service = VertexAiMemoryBankService(
-    project=os.getenv('GOOGLE_CLOUD_PROJECT'),
-    location=os.getenv('GOOGLE_CLOUD_LOCATION'),
-    agent_engine_id=os.getenv('AGENT_ENGINE_ID'),
-)
+# Background writer: turns are queued and coalesced instead of awaiting memory generation
+memory_writer = MemoryWriter(memory_bank_service)
 
 # Callback to auto-save session to memory after each interaction
 async def auto_save_to_memory_callback(callback_context):
-    await memory_bank_service.add_session_to_memory(
-        callback_context._invocation_context.session
-    )
-    print("\n****Triggered memory generation****\n")
+    with tracer.span('memory_submit', 'memory'):
+        await memory_writer.submit(callback_context._invocation_context.session)
+
+# Prometheus scrape endpoint for the metrics registry (spans are written to TRACE_FILE, if set)
+if os.getenv('METRICS_PORT'):
+    serve_prometheus(int(os.getenv('METRICS_PORT')))
+
+# Built in the background at import when WARM_UP is set, so the first request finds them ready.
+# The PDF pool comes first: it forks its workers before the warm-up threads start.
+WARM_UP_TARGETS = {
+    'pdf': pdf_renderer,
+    'token': token_cache,
+    'mcp': mcp_tools,
+    'email': integration_tool,
+    'memory': memory_bank_service,
+    'artifacts': artifact_service,
+}
+
+def warm_up_services(names=None):
+    """Starts building the named services (default: all) concurrently; returns their futures."""
+    return warm_up(*(WARM_UP_TARGETS[name] for name in (names or WARM_UP_TARGETS)))
+
+# Off by default, so the batch runner and CLIs importing the agent do not fork the PDF pool or
+# fetch credentials they may not use. Serving sets WARM_UP=all, or names a subset, e.g. WARM_UP=mcp,token
+WARM_UP = os.getenv('WARM_UP', '0')
+if WARM_UP not in ('0', ''):
+    warm_up_services(None if WARM_UP == 'all' else WARM_UP.split(','))
 
 
 
@@ -217,6 +272,12 @@ sar_agent = Agent(
     - Any additional investigative steps suggested
     """,
     tools=[mcp_tools, pdf_tool, integration_tool],
+    before_agent_callback=tracer.before_agent,
+    after_agent_callback=tracer.after_agent,
+    before_model_callback=tracer.before_model,
+    after_model_callback=tracer.after_model,
+    before_tool_callback=[tracer.before_tool, tool_cache.before_tool_callback],
+    after_tool_callback=[tracer.after_tool, tool_cache.after_tool_callback, result_compactor.after_tool_callback],
 )
 
 root_agent = Agent(
@@ -234,7 +295,7 @@ root_agent = Agent(
     
     **HANDLING USER QUERIES:**
     - **Simple Lookups:** If the user asks "who is this person" or similar questions about a specific user, use ONLY `search-user-by-name` to provide their profile (name, occupation, income, PEP status, risk score). Do NOT automatically fetch alerts or transactions unless asked.
-    - **Alert Investigation:** If the user asks to "investigate an alert" or provides an alert ID, then perform the full investigation workflow (get alert details, trace money flow, analyze network).
+    - **Alert Investigation:** If the user asks to "investigate an alert" or provides an alert ID, then perform the full investigation workflow by calling `get_investigation_bundle` once with the alert ID. It returns the alert context, KYC, money flow, counterparties, recent activity and any mule rings the customer belongs to (found across all transactions, with the hub the members forward to) together; only call the individual tools if you need something the bundle does not contain.
     - **General Questions:** Answer questions about the data, process, or provide summaries as requested.
 
     **THE DATA:**
@@ -283,8 +344,13 @@ root_agent = Agent(
     If the user explicitly asks you to draft a SAR report, then and only then,
     send the task over to the 'sar_agent' sub-agent to handle the SAR drafting and PDF generation.
     """,
-    tools=[PreloadMemoryTool(), mcp_tools],
-    after_agent_callback=auto_save_to_memory_callback,
-    before_tool_callback=check_token,
+    tools=[CachedPreloadMemoryTool(memory_bank_service), investigation_bundle_tool, mcp_tools,
+           CloseWithRunner(memory_writer)],
+    before_agent_callback=tracer.before_agent,
+    after_agent_callback=[auto_save_to_memory_callback, tracer.after_agent],
+    before_model_callback=tracer.before_model,
+    after_model_callback=tracer.after_model,
+    before_tool_callback=[tracer.before_tool, tool_cache.before_tool_callback, check_token],
+    after_tool_callback=[tracer.after_tool, tool_cache.after_tool_callback, result_compactor.after_tool_callback],
     sub_agents=[sar_agent],
     )
\ No newline at end of file
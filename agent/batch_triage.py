@@ -0,0 +1,451 @@
+"""
+Headless batch triage of the NY alert queue.
+
+Claims the highest priority alerts from the queue (`claim-alerts`) and runs the `aml_agent`
+investigation workflow for many alerts concurrently, with bounded concurrency, rate limits
+on model and MCP calls and retries with backoff. Each verdict is streamed to a JSONL or
+Parquet file as it arrives, and the alert is closed with it (STÄNGD or ESKALERAD).
+
+Claims are leased: while an alert waits or is investigated its lease is renewed in the
+background, and if the process dies the alert is claimable again once the lease expires.
+Any number of runners can therefore share the queue without investigating an alert twice.
+With `--no-claim` the queue is only read (`list-new-alerts`) and no status is changed.
+
+    python -m agent.batch_triage --concurrency 16 --model-rps 5 --mcp-rps 20 --output verdicts.jsonl
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import re
+import socket
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from google.adk.memory import InMemoryMemoryService
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.adk.tools.mcp_tool.mcp_tool import McpTool
+from google.genai import types
+
+from .agent import artifact_service, memory_writer, root_agent
+from .mcp_client import McpClient
+from .metrics import registry
+from .prescreen import describe_hits, evaluate, load_frames
+
+APP_NAME = 'aml_batch_triage'
+USER_ID = 'batch-triage'
+
+PROMPT = (
+    "Investigate alert {alert_id}. This is an automated batch run: skip the greeting, perform the "
+    "full investigation workflow now and answer in the OUTPUT FORMAT."
+)
+
+# Seconds a claimed alert stays ours without a renewal; renewed every third of that
+LEASE_SECONDS = 900
+# Queue status an alert is closed with, per verdict. Alerts without a verdict are not closed:
+# their lease runs out and the queue hands them out again later.
+VERDICT_STATUS = {'False Positive': 'STÄNGD', 'True Positive': 'ESKALERAD'}
+
+_VERDICT_RE = re.compile(r'Verdict:?\**:?\s*\[?\s*(False Positive|True Positive)', re.IGNORECASE)
+_CONFIDENCE_RE = re.compile(r'Confidence:?\**:?\s*\[?\s*(High|Medium|Low)', re.IGNORECASE)
+
+
+class RateLimiter:
+    """Async token bucket: at most `rate` acquisitions per second, with bursts up to `burst`."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.rate:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class RateLimitPlugin(BasePlugin):
+    """Throttles every model request and MCP tool call made by any agent in the run."""
+
+    def __init__(self, model_limiter, mcp_limiter):
+        super().__init__(name='rate_limit')
+        self.model_limiter = model_limiter
+        self.mcp_limiter = mcp_limiter
+        self.model_calls = registry.counter('batch_model_calls_total', 'Model requests made by the batch runner.')
+        self.tool_calls = registry.counter('batch_mcp_calls_total', 'MCP tool calls made by the batch runner.')
+
+    async def before_model_callback(self, *, callback_context, llm_request):
+        await self.model_limiter.acquire()
+        self.model_calls.inc()
+        return None
+
+    async def acquire_mcp(self):
+        """Waits for the MCP rate limit; also used by tools that call MCP tools from code."""
+        await self.mcp_limiter.acquire()
+        self.tool_calls.inc()
+
+    async def before_tool_callback(self, *, tool, tool_args, tool_context):
+        if isinstance(tool, McpTool):
+            await self.acquire_mcp()
+        return None
+
+
+class VerdictSink:
+    """Appends verdict records to a JSONL file, or to a Parquet file in row groups of `batch_size`."""
+
+    def __init__(self, path, batch_size=500):
+        self.path = path
+        self.parquet = path.endswith('.parquet')
+        self.batch_size = batch_size
+        self._pending = []
+        self._writer = None
+        self._file = None if self.parquet else open(path, 'a', encoding='utf-8')
+
+    def write(self, record):
+        if not self.parquet:
+            self._file.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+            self._file.flush()
+            return
+        self._pending.append(record)
+        if len(self._pending) >= self.batch_size:
+            self._flush_parquet()
+
+    def _flush_parquet(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        if not self._pending:
+            return
+        table = pa.Table.from_pylist([{k: v if not isinstance(v, (dict, list)) else json.dumps(v, ensure_ascii=False)
+                                       for k, v in r.items()} for r in self._pending])
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table.cast(self._writer.schema))
+        self._pending = []
+
+    def close(self):
+        if self.parquet:
+            self._flush_parquet()
+            if self._writer:
+                self._writer.close()
+        else:
+            self._file.close()
+
+
+def parse_verdict(text):
+    verdict = _VERDICT_RE.search(text or '')
+    confidence = _CONFIDENCE_RE.search(text or '')
+    return (verdict.group(1).title() if verdict else None,
+            confidence.group(1).title() if confidence else None)
+
+
+class BatchTriage:
+    """Runs the investigation workflow over the alert queue and streams verdicts to a sink."""
+
+    def __init__(self, sink, concurrency=8, model_rps=5.0, mcp_rps=20.0, max_retries=3, backoff=2.0,
+                 page_size=100, limit=None, mcp_url=None, use_adc=True, prescreen=None, agent=root_agent,
+                 claim=True, claim_size=None, lease_seconds=LEASE_SECONDS, worker_id=None):
+        self.sink = sink
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.page_size = page_size
+        self.limit = limit
+        self.mcp_url = mcp_url
+        self.use_adc = use_adc
+        self.claim = claim
+        # Claim no more than the workers can start on soon, so alerts are not held idle
+        self.claim_size = claim_size or concurrency
+        self.lease_seconds = lease_seconds
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self._held = {}  # claim_id -> alert ids of the claim not yet closed
+        # alert_id -> pre-screen row (see prescreen.evaluate)
+        self.prescreen = {} if prescreen is None else {r['alert_id']: r for r in prescreen.to_dict('records')}
+        self.runner = Runner(
+            agent=agent,
+            app_name=APP_NAME,
+            session_service=InMemorySessionService(),
+            memory_service=InMemoryMemoryService(),
+            artifact_service=artifact_service.get(),
+            plugins=[RateLimitPlugin(RateLimiter(model_rps), RateLimiter(mcp_rps))],
+        )
+        self.completed = 0
+        self.failed = 0
+        self.started_at = None
+        self.skipped_llm = registry.counter('batch_prescreen_closed_total', 'Alerts closed by the pre-screen without the LLM.')
+        self.alert_latency = registry.histogram('batch_alert_seconds', 'End-to-end investigation time per alert.')
+        self.claimed = registry.counter('batch_alerts_claimed_total', 'Alerts claimed from the queue.')
+        self.leases_lost = registry.counter('batch_leases_lost_total', 'Claimed alerts closed or renewed after their lease was lost.')
+
+    async def _call(self, tool, params):
+        # One short-lived MCP session per call keeps the token fresh over a long run
+        async with McpClient(self.mcp_url, self.use_adc) as client:
+            return await client.call(tool, params)
+
+    async def prioritize(self):
+        """Recomputes the queue priority of every open alert; returns the open and unprioritized counts."""
+        return await self._call('prioritize-alerts', {})
+
+    def alerts(self):
+        """Alerts to investigate: claimed from the queue, or with `claim=False` only listed."""
+        return self._claim_alerts() if self.claim else self._list_alerts()
+
+    async def _list_alerts(self):
+        """Yields NY alerts page by page, read-only."""
+        after, yielded = {}, 0
+        while self.limit is None or yielded < self.limit:
+            page = await self._call('list-new-alerts', dict(after, page_size=self.page_size))
+            for alert in page:
+                if self.limit is not None and yielded >= self.limit:
+                    return
+                yield alert
+                yielded += 1
+            if len(page) < self.page_size:
+                return
+            after = {'after_priority': page[-1]['priority'], 'after_alert_id': page[-1]['alert_id']}
+
+    async def _claim_alerts(self):
+        """Claims and yields batches of the highest priority alerts until the queue is empty."""
+        yielded = 0
+        while self.limit is None or yielded < self.limit:
+            size = self.claim_size if self.limit is None else min(self.claim_size, self.limit - yielded)
+            claim_id = uuid.uuid4().hex
+            params = {'worker_id': self.worker_id, 'claim_id': claim_id, 'batch_size': size,
+                      'lease_seconds': self.lease_seconds}
+            for attempt in range(self.max_retries + 1):
+                try:
+                    batch = await self._call('claim-alerts', params)
+                    break
+                except Exception:
+                    # BigQuery aborts one of two DML statements that touch the same rows at once
+                    if attempt == self.max_retries:
+                        raise
+                    await asyncio.sleep(self.backoff * 2 ** attempt * (0.5 + random.random()))
+            if not batch:
+                return
+            self.claimed.inc(len(batch))
+            self._held[claim_id] = {alert['alert_id'] for alert in batch}
+            for alert in batch:
+                yield dict(alert, claim_id=claim_id)
+                yielded += 1
+
+    def _drop(self, alert):
+        held = self._held.get(alert['claim_id'])
+        if held is not None:
+            held.discard(alert['alert_id'])
+            if not held:
+                del self._held[alert['claim_id']]
+
+    async def settle(self, alert, verdict):
+        """Closes a claimed alert with its verdict; returns its queue status."""
+        status = VERDICT_STATUS.get(verdict)
+        # Without a verdict the alert stays UTREDS and, no longer renewed, goes back to the queue
+        # when the lease expires; the wait is the backoff before another worker retries it
+        self._drop(alert)
+        if status is None:
+            return 'UTREDS'
+        rows = await self._call('complete-alert', {'alert_id': alert['alert_id'], 'claim_id': alert['claim_id'],
+                                                   'status': status})
+        if not rows:
+            self.leases_lost.inc()
+            print(f"[batch-triage] lease on {alert['alert_id']} was lost; verdict not recorded in the queue")
+            return None
+        return status
+
+    async def _renew_leases(self):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            for claim_id in list(self._held):
+                try:
+                    rows = await self._call('renew-alert-lease', {'claim_id': claim_id, 'lease_seconds': self.lease_seconds})
+                except Exception as e:  # retried at the next interval, well before the lease runs out
+                    print(f"[batch-triage] could not renew claim {claim_id}: {type(e).__name__}: {e}")
+                    continue
+                lost = self._held.get(claim_id, set()) - {row['alert_id'] for row in rows}
+                if lost:
+                    self.leases_lost.inc(len(lost))
+                    print(f"[batch-triage] lost the lease on {len(lost)} alerts of claim {claim_id}")
+
+    async def _release_held(self):
+        """Gives claimed alerts that were never investigated back to the queue."""
+        for claim_id, alert_ids in list(self._held.items()):
+            for alert_id in alert_ids:
+                await self._call('release-alert', {'alert_id': alert_id, 'claim_id': claim_id})
+        self._held.clear()
+
+    async def investigate(self, alert, context=None) -> Dict[str, Any]:
+        """Runs one investigation in a fresh session and returns the final response text."""
+        session = await self.runner.session_service.create_session(app_name=APP_NAME, user_id=USER_ID)
+        prompt = PROMPT.format(alert_id=alert['alert_id'])
+        if context:
+            prompt += "\n\n" + context
+        message = types.Content(role='user', parts=[types.Part(text=prompt)])
+        final_text = ''
+        async for event in self.runner.run_async(user_id=USER_ID, session_id=session.id, new_message=message):
+            if event.is_final_response() and event.content and event.content.parts:
+                final_text = ''.join(part.text or '' for part in event.content.parts)
+        # The investigation session ends here: write its memories now rather than after the debounce
+        await memory_writer.flush(session)
+        return {'session_id': session.id, 'response': final_text}
+
+    async def triage(self, alert) -> Dict[str, Any]:
+        start = time.perf_counter()
+        error: Optional[str] = None
+        screen = self.prescreen.get(alert['alert_id'])
+        if screen is not None and screen['skip_llm']:
+            # Deterministic high-confidence false positive: no model calls at all
+            self.skipped_llm.inc()
+            result = {'session_id': None, 'response': describe_hits(screen)}
+            verdict, confidence, attempt, source = screen['verdict'], screen['confidence'], -1, 'prescreen'
+        else:
+            context = describe_hits(screen) if screen is not None else None
+            for attempt in range(self.max_retries + 1):
+                try:
+                    result = await self.investigate(alert, context)
+                    break
+                except Exception as e:  # model quota, transport and tool errors are all retried
+                    error = f"{type(e).__name__}: {e}"
+                    if attempt == self.max_retries:
+                        result = {'session_id': None, 'response': None}
+                        break
+                    await asyncio.sleep(self.backoff * 2 ** attempt * (0.5 + random.random()))
+            verdict, confidence = parse_verdict(result['response'])
+            source = 'agent'
+        queue_status = None
+        if 'claim_id' in alert:
+            try:
+                queue_status = await self.settle(alert, verdict)
+            except Exception as e:
+                print(f"[batch-triage] could not close {alert['alert_id']}: {type(e).__name__}: {e}")
+        elapsed = time.perf_counter() - start
+        self.alert_latency.observe(elapsed)
+        return {
+            'alert_id': alert['alert_id'],
+            'user_id': alert.get('user_id'),
+            'trigger_reason': alert.get('trigger_reason'),
+            'severity': alert.get('severity'),
+            'verdict': verdict,
+            'confidence': confidence,
+            'source': source,
+            'rule_hits': screen['rule_hits'] if screen is not None else [],
+            'response': result['response'],
+            'session_id': result['session_id'],
+            'attempts': attempt + 1,
+            'queue_status': queue_status,
+            'error': error if result['response'] is None else None,
+            'latency_seconds': round(elapsed, 3),
+            'completed_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        }
+
+    def throughput(self):
+        minutes = (time.monotonic() - self.started_at) / 60
+        return (self.completed + self.failed) / minutes if minutes else 0.0
+
+    async def _worker(self, queue):
+        while True:
+            alert = await queue.get()
+            if alert is None:
+                return
+            record = await self.triage(alert)
+            self.sink.write(record)
+            if record['response'] is None:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    async def _report(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            print(f"[batch-triage] {self.completed} done, {self.failed} failed, "
+                  f"{self.throughput():.1f} alerts/min")
+
+    async def run(self, report_interval=30):
+        self.started_at = time.monotonic()
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(self.concurrency)]
+        reporter = asyncio.create_task(self._report(report_interval))
+        renewer = asyncio.create_task(self._renew_leases()) if self.claim else None
+        try:
+            async for alert in self.alerts():
+                await queue.put(alert)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+            await memory_writer.close()
+        finally:
+            reporter.cancel()
+            if renewer is not None:
+                renewer.cancel()
+            for worker in workers:
+                worker.cancel()
+            if self._held:
+                await self._release_held()
+        summary = {
+            'completed': self.completed,
+            'failed': self.failed,
+            'claimed': self.claimed.value,
+            'leases_lost': self.leases_lost.value,
+            'closed_by_prescreen': self.skipped_llm.value,
+            'elapsed_seconds': round(time.monotonic() - self.started_at, 1),
+            'alerts_per_minute': round(self.throughput(), 2),
+            'alert_seconds': self.alert_latency.snapshot(),
+        }
+        print(f"[batch-triage] finished: {json.dumps(summary)}")
+        return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless concurrent triage of the NY alert queue.")
+    parser.add_argument('--output', default=f"verdicts_{uuid.uuid4().hex[:8]}.jsonl",
+                        help="Verdict sink; .jsonl or .parquet.")
+    parser.add_argument('--concurrency', type=int, default=8, help="Alerts investigated at the same time.")
+    parser.add_argument('--model-rps', type=float, default=5.0, help="Max model requests per second (0 = no limit).")
+    parser.add_argument('--mcp-rps', type=float, default=20.0, help="Max MCP tool calls per second (0 = no limit).")
+    parser.add_argument('--max-retries', type=int, default=3)
+    parser.add_argument('--backoff', type=float, default=2.0, help="Base backoff in seconds, doubled per retry.")
+    parser.add_argument('--page-size', type=int, default=100, help="Alerts per page with --no-claim.")
+    parser.add_argument('--no-claim', action='store_true',
+                        help="Only read the NY queue: no claims, and alert statuses are left unchanged.")
+    parser.add_argument('--claim-size', type=int, default=None, help="Alerts per claim (default: --concurrency).")
+    parser.add_argument('--lease-seconds', type=int, default=LEASE_SECONDS,
+                        help="Lease on claimed alerts; renewed while they are held.")
+    parser.add_argument('--prioritize', action='store_true',
+                        help="Recompute the priority of every open alert (prioritize-alerts) before claiming.")
+    parser.add_argument('--limit', type=int, default=None, help="Stop after this many alerts.")
+    parser.add_argument('--mcp-url', default=None, help="Defaults to MCP_URL.")
+    parser.add_argument('--no-adc', action='store_true', help="Do not send an ADC token (local MCP server).")
+    parser.add_argument('--prescreen-data', default=None,
+                        help="Directory with alerts/users/transactions CSV or Parquet files; enables the rule "
+                             "pre-screen so deterministic false positives skip the LLM.")
+    parser.add_argument('--report-interval', type=float, default=30.0)
+    args = parser.parse_args()
+
+    prescreen = evaluate(*load_frames(args.prescreen_data)) if args.prescreen_data else None
+    sink = VerdictSink(args.output)
+    triage = BatchTriage(sink, args.concurrency, args.model_rps, args.mcp_rps, args.max_retries, args.backoff,
+                         args.page_size, args.limit, args.mcp_url, not args.no_adc, prescreen,
+                         claim=not args.no_claim, claim_size=args.claim_size, lease_seconds=args.lease_seconds)
+    try:
+        if args.prioritize:
+            print(f"[batch-triage] prioritized: {asyncio.run(triage.prioritize())}")
+        asyncio.run(triage.run(args.report_interval))
+    finally:
+        sink.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+"""
+Compact encoding of MCP tool results before they reach the model.
+
+Toolbox tools return one JSON object per row, so column names, account ids and names repeat on
+every row, and the whole response is re-sent with the history on every later turn. The
+after-tool callback rewrites row results into a table:
+
+  legend    each account once, by a short ref: a1 -> [user_id, name]
+  columns   the column names once
+  rows      one list per row, accounts given by ref
+  totals    sums over every row the tool returned
+
+`trace-money-flow` rows are aggregated into one row per edge and hop (transfer count and sum, each
+transfer counted once by its txn_id, including the deeper hops of a `depth` > 2 trace),
+`get-recent-transactions` rows are given relative to the investigated user. Amounts keep their
+öre. If the encoding is over TOOL_RESULT_TOKEN_BUDGET (about 4 characters per token), optional
+columns are dropped, then the least significant rows; `omitted` counts them and sums their
+amounts, so the totals stay exact.
+
+    COMPACT_TOOL_RESULTS=0   pass results through unchanged
+"""
+import json
+import os
+from typing import Any, Dict, Optional
+
+from google.adk.tools import BaseTool
+from google.adk.tools.tool_context import ToolContext
+
+from .metrics import registry
+
+TOKEN_BUDGET = int(os.environ.get('TOOL_RESULT_TOKEN_BUDGET', 1500))
+CHARS_PER_TOKEN = 4
+TOKEN_BUCKETS = (32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 65536)
+
+FORMAT = 'rows follow columns; a1, a2... are accounts listed in legend as [user_id, name]'
+
+
+def approx_tokens(value):
+    """Rough token count of a value as it is serialized into the prompt."""
+    return len(json.dumps(value, ensure_ascii=False, default=str)) // CHARS_PER_TOKEN
+
+
+def response_rows(response):
+    """Row dicts of an MCP tool response (a CallToolResult dict), or None if it holds anything else."""
+    if not isinstance(response, dict) or response.get('isError') or not isinstance(response.get('content'), list):
+        return None
+    rows = []
+    for content in response['content']:
+        if not isinstance(content, dict) or content.get('type') != 'text':
+            return None
+        try:
+            value = json.loads(content.get('text') or 'null')
+        except ValueError:
+            return None
+        if value is None:
+            continue
+        rows.extend(value if isinstance(value, list) else [value])
+    if not all(isinstance(row, dict) for row in rows):
+        return None
+    return rows
+
+
+def _money(value):
+    return round(value or 0, 2)
+
+
+class _Table:
+    """Rows with accounts still as ids, plus what the budget may drop and what it must keep exact."""
+
+    def __init__(self, columns, rows, accounts=(), names=None, totals=None, optional=(), amount=None):
+        self.columns = columns
+        self.rows = rows
+        self.accounts = set(accounts)  # columns holding account ids
+        self.names = names or {}
+        self.totals = totals
+        self.optional = list(optional)  # columns to drop first, in order
+        self.amount = amount  # column summed into `omitted`
+
+    def encode(self, columns, keep):
+        index = [self.columns.index(c) for c in columns]
+        refs, legend = {}, {}
+        rows = []
+        for row in self.rows[:keep]:
+            values = []
+            for i in index:
+                value = row[i]
+                if self.columns[i] in self.accounts and value is not None:
+                    if value not in refs:
+                        refs[value] = f'a{len(refs) + 1}'
+                        name = self.names.get(value)
+                        legend[refs[value]] = [value, name] if name else [value]
+                    value = refs[value]
+                values.append(value)
+            rows.append(values)
+        result = {'format': FORMAT, 'legend': legend} if legend else {}
+        result.update(columns=columns, rows=rows)
+        if self.totals:
+            result['totals'] = self.totals
+        if keep < len(self.rows):
+            omitted = {'rows': len(self.rows) - keep}
+            if self.amount:
+                i = self.columns.index(self.amount)
+                omitted[self.amount] = _money(sum(row[i] or 0 for row in self.rows[keep:]))
+            result['omitted'] = omitted
+        return result
+
+    def fit(self, budget):
+        """Encodes within `budget` tokens, dropping optional columns and then trailing rows."""
+        columns = list(self.columns)
+        result = self.encode(columns, len(self.rows))
+        for column in self.optional:
+            if approx_tokens(result) <= budget:
+                return result
+            columns.remove(column)
+            result = self.encode(columns, len(self.rows))
+        if approx_tokens(result) <= budget:
+            return result
+        # Largest row count that fits; at least one row is always kept
+        low, high = 1, len(self.rows) - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            if approx_tokens(self.encode(columns, middle)) <= budget:
+                low = middle
+            else:
+                high = middle - 1
+        return self.encode(columns, low)
+
+
+def _legs(row):
+    """(hop, sender, receiver, txn_id, amount) of each transfer on a trace-money-flow path."""
+    if row.get('hops'):
+        # Paths deeper than two hops (graph index with depth > 2) list every transfer
+        return [(hop, h['sender_id'], h['receiver_id'], h['txn_id'], h.get('amount'))
+                for hop, h in enumerate(row['hops'], 1)]
+    legs = [(1, row['source'], row['intermediate'], row.get('txn_id_in'), row.get('amount_in'))]
+    if row.get('final_destination'):
+        legs.append((2, row['intermediate'], row['final_destination'], row.get('txn_id_out'), row.get('amount_out')))
+    return legs
+
+
+def _money_flow(rows, args):
+    names, edges, seen = {}, {}, set()
+    for row in rows:
+        names[row['source']] = row.get('source_name')
+        names[row['intermediate']] = row.get('intermediate_name')
+        if row.get('final_destination'):
+            names[row['final_destination']] = row.get('destination_name')
+        for hop, sender, receiver, txn_id, amount in _legs(row):
+            # A transfer repeats on every path through it; count it once
+            if (hop, txn_id) in seen:
+                continue
+            seen.add((hop, txn_id))
+            edge = edges.setdefault((hop, sender, receiver), [0, 0.0])
+            edge[0] += 1
+            edge[1] += amount or 0
+    table = sorted(([hop, sender, receiver, count, _money(amount)]
+                    for (hop, sender, receiver), (count, amount) in edges.items()), key=lambda r: (r[0], -r[4]))
+    totals = {'sent': _money(sum(r[4] for r in table if r[0] == 1)),
+              'forwarded': _money(sum(r[4] for r in table if r[0] == 2))}
+    for hop in sorted({r[0] for r in table if r[0] > 2}):
+        totals[f'hop{hop}'] = _money(sum(r[4] for r in table if r[0] == hop))
+    return _Table(['hop', 'from', 'to', 'transfers', 'amount'], table, accounts=('from', 'to'), names=names,
+                  totals=totals, amount='amount')
+
+
+def _counterparties(rows, args):
+    table = [[r.get('counterparty_id'), r.get('counterparty_name'),
+              round(r['counterparty_risk'], 3) if r.get('counterparty_risk') is not None else None,
+              r.get('txn_count'), _money(r.get('total_volume'))] for r in rows]
+    totals = {'transactions': sum(r[3] or 0 for r in table), 'volume': _money(sum(r[4] for r in table))}
+    return _Table(['id', 'name', 'risk', 'transactions', 'volume'], table, totals=totals, amount='volume')
+
+
+def _recent(rows, args):
+    user_id = (args or {}).get('user_id')
+    table = []
+    totals = {'in': 0.0, 'out': 0.0}
+    for r in rows:
+        outgoing = r.get('sender_id') == user_id
+        amount = r.get('amount') or 0
+        totals['out' if outgoing else 'in'] += amount
+        table.append([str(r.get('timestamp') or '')[:19], 'out' if outgoing else 'in',
+                      r.get('receiver_id') if outgoing else r.get('sender_id'), _money(amount),
+                      r.get('txn_type'), r.get('txn_id')])
+    totals = {k: _money(v) for k, v in totals.items()}
+    return _Table(['time', 'dir', 'counterparty', 'amount', 'type', 'txn_id'], table, accounts=('counterparty',),
+                  totals=totals, optional=('txn_id',), amount='amount')
+
+
+def _generic(rows, args):
+    columns = []
+    for row in rows:
+        columns.extend(k for k in row if k not in columns)
+    return _Table(columns, [[row.get(c) for c in columns] for row in rows])
+
+
+ENCODERS = {
+    'trace-money-flow': _money_flow,
+    'analyze-counterparties': _counterparties,
+    'get-recent-transactions': _recent,
+}
+
+
+class ResultCompactor:
+    """Replaces row results of MCP tools with the compact encoding, through the after-tool callback."""
+
+    def __init__(self, token_budget=TOKEN_BUDGET, enabled=True):
+        self.token_budget = token_budget
+        self.enabled = enabled
+
+    @staticmethod
+    def _tokens(tool, stage):
+        return registry.histogram('tool_result_tokens', 'Approximate tokens of a tool result before and after compaction.',
+                                  labels={'tool': tool, 'stage': stage}, buckets=TOKEN_BUCKETS)
+
+    def compact(self, tool_name, rows, args=None):
+        table = ENCODERS.get(tool_name, _generic)(rows, args)
+        return {'status': 'success', **table.fit(self.token_budget)}
+
+    def after_tool_callback(self, tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext,
+                            tool_response: Any) -> Optional[Dict]:
+        """Returns the compact result, or None to keep the response (errors, non-row results, no gain).
+
+        Must come last in the chain: the callbacks after the first non-None result are skipped,
+        and the result cache and tracer should see the raw response.
+        """
+        if not self.enabled:
+            return None
+        rows = response_rows(tool_response)
+        if rows is None or (tool.name not in ENCODERS and len(rows) < 2):
+            return None
+        compact = self.compact(tool.name, rows, args)
+        raw_tokens, compact_tokens = approx_tokens(tool_response), approx_tokens(compact)
+        self._tokens(tool.name, 'raw').observe(raw_tokens)
+        if compact_tokens >= raw_tokens:
+            self._tokens(tool.name, 'compact').observe(raw_tokens)
+            return None
+        self._tokens(tool.name, 'compact').observe(compact_tokens)
+        return compact
+
+
+result_compactor = ResultCompactor(enabled=os.environ.get('COMPACT_TOOL_RESULTS', '1') != '0')
@@ -0,0 +1,141 @@
+"""Dataloader: coalesces single-key lookups made in the same event-loop tick into one batched tool call."""
+import asyncio
+import time
+from collections import OrderedDict
+
+from .metrics import registry
+
+# Upper bounds for the batch-size histogram
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class DataLoader:
+    """Collects `load(key)` calls until the current tick ends, then resolves them with one `batch_fn` call.
+
+    `batch_fn(keys, group)` receives unique keys and returns a dict mapping each key to its
+    value; keys it leaves out resolve to None. Loads passing a different `group` (e.g. the
+    client making the call) go out in separate batches, each with its own group. Duplicate
+    keys within a group share one lookup. Batches are capped at `max_batch_size` keys.
+    Nothing is cached across batches; put a cache in front if results may be reused.
+    """
+
+    def __init__(self, batch_fn, name, max_batch_size=500):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self._pending = {}  # group -> (group value, {key: future})
+        self._scheduled = False
+        # The event loop only keeps weak references to tasks; a batch dropped mid-flight would
+        # leave its callers waiting forever
+        self._tasks = set()
+        self.batch_sizes = registry.histogram('dataloader_batch_size', 'Unique keys per batched lookup.',
+                                              labels={'loader': name}, buckets=BATCH_SIZE_BUCKETS)
+        self.latency = registry.histogram('dataloader_batch_seconds', 'Batched lookup latency.', labels={'loader': name})
+        self.requested = registry.counter('dataloader_keys_requested_total', 'Individual lookups requested.',
+                                          labels={'loader': name})
+        self.deduplicated = registry.counter('dataloader_keys_deduplicated_total',
+                                             'Lookups answered by another lookup of the same key in the batch.',
+                                             labels={'loader': name})
+
+    def load(self, key, group=None):
+        """Returns an awaitable resolving to the value for `key` (or None if it does not exist)."""
+        self.requested.inc()
+        # By identity, so groups need not be hashable and equal-looking clients stay apart
+        _, futures = self._pending.setdefault(id(group), (group, {}))
+        future = futures.get(key)
+        if future is not None:
+            self.deduplicated.inc()
+            return future
+        loop = asyncio.get_running_loop()
+        future = futures[key] = loop.create_future()
+        if not self._scheduled:
+            self._scheduled = True
+            loop.call_soon(self._dispatch)
+        return future
+
+    async def load_many(self, keys, group=None):
+        return await asyncio.gather(*(self.load(key, group) for key in keys))
+
+    def _dispatch(self):
+        self._scheduled = False
+        pending, self._pending = self._pending, {}
+        for group, futures in pending.values():
+            keys = list(futures)
+            for i in range(0, len(keys), self.max_batch_size):
+                batch = {key: futures[key] for key in keys[i:i + self.max_batch_size]}
+                task = asyncio.ensure_future(self._run_batch(batch, group))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch, group):
+        self.batch_sizes.observe(len(batch))
+        start = time.perf_counter()
+        try:
+            values = await self.batch_fn(list(batch), group)
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.latency.observe(time.perf_counter() - start)
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(values.get(key))
+
+
+class SessionLoader:
+    """DataLoader over a batched tool, for the callers on one MCP session.
+
+    Callers pass their own client with each load, and each client's keys go out as one batch
+    through that client, so a call always runs with its own invocation's tool context, rate
+    limit and trace.
+    """
+
+    def __init__(self, tool_name, ids_param, key_field, max_batch_size=500):
+        self.tool_name = tool_name
+        self.ids_param = ids_param
+        self.key_field = key_field
+        self.loader = DataLoader(self._batch, tool_name, max_batch_size)
+
+    async def _batch(self, keys, client):
+        rows = await client.call(self.tool_name, {self.ids_param: keys})
+        return {row[self.key_field]: row for row in rows}
+
+    def load(self, client, key):
+        return self.loader.load(key, client)
+
+    async def load_many(self, client, keys):
+        return await self.loader.load_many(keys, client)
+
+
+# Loader name -> (batched tool, ids parameter, key field of its rows)
+BATCH_TOOLS = {
+    'user': ('get-user-details-batch', 'user_ids', 'user_id'),
+    'alert': ('get-alert-details-batch', 'alert_ids', 'alert_id'),
+}
+# Sessions are keyed by their token, which rotates; loaders of the oldest are dropped past this
+MAX_SESSIONS = 64
+
+_sessions = OrderedDict()  # session key -> {loader name: SessionLoader}
+
+
+def session_loader(name, session_key):
+    """The `name` loader ('user' or 'alert') of the MCP session identified by `session_key`."""
+    loaders = _sessions.get(session_key)
+    if loaders is None:
+        loaders = _sessions[session_key] = {}
+        while len(_sessions) > MAX_SESSIONS:
+            _sessions.popitem(last=False)
+    else:
+        _sessions.move_to_end(session_key)
+    if name not in loaders:
+        loaders[name] = SessionLoader(*BATCH_TOOLS[name])
+    return loaders[name]
+
+
+def user_loader(session_key):
+    return session_loader('user', session_key)
+
+
+def alert_loader(session_key):
+    return session_loader('alert', session_key)
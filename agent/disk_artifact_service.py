@@ -0,0 +1,299 @@
+"""Bounded, content-addressed, disk-backed replacement for InMemoryArtifactService."""
+import asyncio
+import contextlib
+import hashlib
+import json
+import mmap
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Union
+
+from google.adk.artifacts.base_artifact_service import ArtifactVersion, BaseArtifactService
+from google.genai import types
+
+from .metrics import registry
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS versions (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    mime_type TEXT,
+    is_text INTEGER NOT NULL DEFAULT 0,
+    size INTEGER NOT NULL,
+    create_time REAL NOT NULL,
+    custom_metadata TEXT,
+    PRIMARY KEY (app_name, user_id, session_id, filename, version)
+);
+CREATE INDEX IF NOT EXISTS versions_sha256 ON versions (sha256);
+"""
+
+# Session id used for user-scoped ("user:" prefixed) artifacts
+_USER_SCOPE = ''
+
+
+class ArtifactQuotaExceeded(Exception):
+    pass
+
+
+class DiskArtifactService(BaseArtifactService):
+    """Stores artifact payloads once per content hash under `root/blobs`, with version metadata in SQLite.
+
+    Identical reports saved by different sessions share one blob. Recently used payloads are
+    kept in an in-memory LRU bounded by `cache_bytes`; everything else is read through mmap.
+    Each session is limited to `session_quota_bytes` of stored versions, and each artifact
+    keeps at most `max_versions` versions no older than `max_age_days` (older ones are pruned
+    on save, and blobs no longer referenced are deleted).
+    """
+
+    def __init__(self, root=None, cache_bytes=64 * 1024 * 1024, session_quota_bytes=50 * 1024 * 1024,
+                 max_versions=10, max_age_days=None):
+        self.root = root or os.getenv('ARTIFACT_DIR', '.artifacts')
+        self.cache_bytes = cache_bytes
+        self.session_quota_bytes = session_quota_bytes
+        self.max_versions = max_versions
+        self.max_age_days = max_age_days
+        os.makedirs(os.path.join(self.root, 'blobs'), exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(self.root, 'artifacts.db'), check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # sha256 -> bytes
+        self._cached_bytes = 0
+        self.cache_hits = registry.counter('artifact_cache_hits_total', 'Artifact reads served from the LRU.')
+        self.cache_misses = registry.counter('artifact_cache_misses_total', 'Artifact reads served from disk.')
+        self.dedup_saves = registry.counter('artifact_dedup_saves_total', 'Saves whose payload was already stored.')
+
+    # ------------------------------------------------------------------
+    # Blob storage
+    # ------------------------------------------------------------------
+    def _blob_path(self, sha256):
+        return os.path.join(self.root, 'blobs', sha256[:2], sha256)
+
+    def _write_blob(self, sha256, data):
+        path = self._blob_path(sha256)
+        if os.path.exists(path):
+            self.dedup_saves.inc()
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _read_blob(self, sha256):
+        with self._lock:
+            data = self._cache.get(sha256)
+            if data is not None:
+                self._cache.move_to_end(sha256)
+                self.cache_hits.inc()
+                return data
+        self.cache_misses.inc()
+        with open(self._blob_path(sha256), 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                data = b''
+            else:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    data = mapped[:]
+        self._cache_put(sha256, data)
+        return data
+
+    def _cache_put(self, sha256, data):
+        if len(data) > self.cache_bytes:
+            return
+        with self._lock:
+            if sha256 in self._cache:
+                return
+            self._cache[sha256] = data
+            self._cached_bytes += len(data)
+            while self._cached_bytes > self.cache_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cached_bytes -= len(evicted)
+
+    @contextlib.contextmanager
+    def _write(self):
+        """One SQLite write transaction, taken up front: other writers, in this or another process, wait.
+
+        Version rows and the blobs they point at only change inside it, so a save that reuses a
+        stored blob and the clean-up that deletes unreferenced blobs cannot interleave.
+        """
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                yield
+            except BaseException:
+                self._db.rollback()
+                raise
+            self._db.commit()
+
+    def _drop_unreferenced(self, hashes):
+        """Deletes the blobs of `hashes` that no version refers to any more; call inside `_write`."""
+        for sha256 in set(hashes):
+            (refs,) = self._db.execute('SELECT COUNT(*) FROM versions WHERE sha256 = ?', (sha256,)).fetchone()
+            if refs:
+                continue
+            evicted = self._cache.pop(sha256, None)
+            if evicted is not None:
+                self._cached_bytes -= len(evicted)
+            try:
+                os.remove(self._blob_path(sha256))
+            except FileNotFoundError:
+                pass
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _scope(filename, session_id):
+        if filename.startswith('user:'):
+            return _USER_SCOPE
+        if session_id is None:
+            raise ValueError("Session ID must be provided for session-scoped artifacts.")
+        return session_id
+
+    @staticmethod
+    def _payload(artifact):
+        if isinstance(artifact, dict):
+            artifact = types.Part.model_validate(artifact)
+        if artifact.inline_data is not None:
+            return artifact.inline_data.data or b'', artifact.inline_data.mime_type, False
+        if artifact.text is not None:
+            return artifact.text.encode('utf-8'), 'text/plain', True
+        raise ValueError("Only inline_data and text artifacts can be stored on disk.")
+
+    def _rows(self, app_name, user_id, session_id, filename, version=None):
+        query = ('SELECT version, sha256, mime_type, is_text, create_time, custom_metadata FROM versions '
+                 'WHERE app_name = ? AND user_id = ? AND session_id = ? AND filename = ?')
+        args = [app_name, user_id, session_id, filename]
+        if version is not None:
+            query += ' AND version = ?'
+            args.append(version)
+        with self._lock:
+            return self._db.execute(query + ' ORDER BY version', args).fetchall()
+
+    def _canonical_uri(self, sha256):
+        return 'file://' + os.path.abspath(self._blob_path(sha256))
+
+    def _apply_retention(self, app_name, user_id, session_id, filename):
+        """Deletes versions beyond `max_versions` or older than `max_age_days`; returns their hashes.
+
+        Call inside `_write`.
+        """
+        conditions, args = [], [app_name, user_id, session_id, filename]
+        if self.max_versions:
+            conditions.append('version <= (SELECT MAX(version) FROM versions WHERE app_name = ? AND user_id = ? '
+                              'AND session_id = ? AND filename = ?) - ?')
+            args += [app_name, user_id, session_id, filename, self.max_versions]
+        if self.max_age_days:
+            conditions.append('create_time < ?')
+            args.append(time.time() - self.max_age_days * 86400)
+        if not conditions:
+            return []
+        where = ('app_name = ? AND user_id = ? AND session_id = ? AND filename = ? AND (' + ' OR '.join(conditions) + ')')
+        hashes = [r[0] for r in self._db.execute(f'SELECT sha256 FROM versions WHERE {where}', args)]
+        self._db.execute(f'DELETE FROM versions WHERE {where}', args)
+        return hashes
+
+    # ------------------------------------------------------------------
+    # Blocking implementations, run in a thread
+    # ------------------------------------------------------------------
+    def _save(self, app_name, user_id, filename, artifact, session_id, custom_metadata):
+        scope = self._scope(filename, session_id)
+        data, mime_type, is_text = self._payload(artifact)
+        sha256 = hashlib.sha256(data).hexdigest()
+        # Quota check, blob write, version row and retention in one transaction, so parallel
+        # saves cannot both pass the quota and the blob cannot be collected before its row exists
+        with self._write():
+            (used,) = self._db.execute(
+                'SELECT COALESCE(SUM(size), 0) FROM versions WHERE app_name = ? AND user_id = ? AND session_id = ?',
+                (app_name, user_id, scope)).fetchone()
+            if self.session_quota_bytes and used + len(data) > self.session_quota_bytes:
+                raise ArtifactQuotaExceeded(
+                    f"Artifact quota exceeded: {used + len(data):,} bytes > {self.session_quota_bytes:,} bytes.")
+            self._write_blob(sha256, data)
+            (latest,) = self._db.execute(
+                'SELECT MAX(version) FROM versions WHERE app_name = ? AND user_id = ? AND session_id = ? '
+                'AND filename = ?', (app_name, user_id, scope, filename)).fetchone()
+            version = 0 if latest is None else latest + 1
+            self._db.execute('INSERT INTO versions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', (
+                app_name, user_id, scope, filename, version, sha256, mime_type, int(is_text), len(data),
+                time.time(), json.dumps(custom_metadata) if custom_metadata else None))
+            self._drop_unreferenced(self._apply_retention(app_name, user_id, scope, filename))
+        self._cache_put(sha256, data)
+        return version
+
+    def _load(self, app_name, user_id, filename, session_id, version):
+        rows = self._rows(app_name, user_id, self._scope(filename, session_id), filename, version)
+        if not rows:
+            return None
+        _, sha256, mime_type, is_text, _, _ = rows[-1]
+        data = self._read_blob(sha256)
+        if is_text:
+            return types.Part(text=data.decode('utf-8'))
+        return types.Part(inline_data=types.Blob(data=data, mime_type=mime_type))
+
+    def _list_keys(self, app_name, user_id, session_id):
+        scopes = [_USER_SCOPE] if session_id is None else [session_id, _USER_SCOPE]
+        with self._lock:
+            rows = self._db.execute(
+                f'SELECT DISTINCT filename FROM versions WHERE app_name = ? AND user_id = ? '
+                f'AND session_id IN ({",".join("?" * len(scopes))}) ORDER BY filename',
+                [app_name, user_id, *scopes]).fetchall()
+        return [r[0] for r in rows]
+
+    def _delete(self, app_name, user_id, filename, session_id):
+        scope = self._scope(filename, session_id)
+        with self._write():
+            hashes = [r[0] for r in self._db.execute(
+                'SELECT sha256 FROM versions WHERE app_name = ? AND user_id = ? AND session_id = ? AND filename = ?',
+                (app_name, user_id, scope, filename))]
+            self._db.execute('DELETE FROM versions WHERE app_name = ? AND user_id = ? AND session_id = ? '
+                             'AND filename = ?', (app_name, user_id, scope, filename))
+            self._drop_unreferenced(hashes)
+
+    def _versions(self, app_name, user_id, filename, session_id, version=None):
+        return [
+            ArtifactVersion(version=v, canonical_uri=self._canonical_uri(sha256), mime_type=mime_type,
+                            create_time=create_time, custom_metadata=json.loads(metadata) if metadata else {})
+            for v, sha256, mime_type, _, create_time, metadata
+            in self._rows(app_name, user_id, self._scope(filename, session_id), filename, version)
+        ]
+
+    # ------------------------------------------------------------------
+    # BaseArtifactService
+    # ------------------------------------------------------------------
+    async def save_artifact(self, *, app_name: str, user_id: str, filename: str,
+                            artifact: Union[types.Part, dict[str, Any]], session_id: Optional[str] = None,
+                            custom_metadata: Optional[dict[str, Any]] = None) -> int:
+        return await asyncio.to_thread(self._save, app_name, user_id, filename, artifact, session_id, custom_metadata)
+
+    async def load_artifact(self, *, app_name: str, user_id: str, filename: str, session_id: Optional[str] = None,
+                            version: Optional[int] = None) -> Optional[types.Part]:
+        return await asyncio.to_thread(self._load, app_name, user_id, filename, session_id, version)
+
+    async def list_artifact_keys(self, *, app_name: str, user_id: str, session_id: Optional[str] = None) -> list[str]:
+        return await asyncio.to_thread(self._list_keys, app_name, user_id, session_id)
+
+    async def delete_artifact(self, *, app_name: str, user_id: str, filename: str,
+                              session_id: Optional[str] = None) -> None:
+        await asyncio.to_thread(self._delete, app_name, user_id, filename, session_id)
+
+    async def list_versions(self, *, app_name: str, user_id: str, filename: str,
+                            session_id: Optional[str] = None) -> list[int]:
+        versions = await asyncio.to_thread(self._versions, app_name, user_id, filename, session_id)
+        return [v.version for v in versions]
+
+    async def list_artifact_versions(self, *, app_name: str, user_id: str, filename: str,
+                                     session_id: Optional[str] = None) -> list[ArtifactVersion]:
+        return await asyncio.to_thread(self._versions, app_name, user_id, filename, session_id)
+
+    async def get_artifact_version(self, *, app_name: str, user_id: str, filename: str,
+                                   session_id: Optional[str] = None,
+                                   version: Optional[int] = None) -> Optional[ArtifactVersion]:
+        versions = await asyncio.to_thread(self._versions, app_name, user_id, filename, session_id, version)
+        return versions[-1] if versions else None
@@ -0,0 +1,201 @@
+"""Investigation bundle: everything needed to judge one alert, fetched in one tool call."""
+import asyncio
+import datetime
+import os
+import time
+from typing import Any, Dict
+
+from google.adk.tools import FunctionTool
+from google.adk.tools.tool_context import ToolContext
+
+from .dataloader import alert_loader, user_loader
+from .mcp_client import ToolsetClient
+from .metrics import registry
+
+# Tools fanned out once the alert's user is known
+USER_TOOLS = ('get-user-details', 'trace-money-flow', 'analyze-counterparties', 'get-recent-transactions',
+              'get-ring-membership')
+# Per-user tools that read the transactions table and take the lookback window
+WINDOWED_TOOLS = ('trace-money-flow', 'analyze-counterparties', 'get-recent-transactions')
+
+# Alert columns that belong to the alert rather than the KYC profile
+ALERT_FIELDS = ('alert_id', 'trigger_reason', 'severity', 'created_at')
+KYC_FIELDS = ('user_id', 'name', 'occupation', 'email', 'phone', 'address', 'annual_income', 'risk_score',
+              'joined_date', 'is_pep')
+
+# Transaction history read per alert, counted back from the alert's creation. The window lets
+# the transaction queries skip the older daily partitions; 0 reads the full history.
+LOOKBACK_DAYS = int(os.environ.get('BUNDLE_LOOKBACK_DAYS', '180'))
+
+# trace-money-flow paths read per alert. The money-flow totals are over all of them; only the
+# MONEY_FLOW_EDGES largest edges of each hop are listed.
+MONEY_FLOW_PATHS = int(os.environ.get('BUNDLE_MONEY_FLOW_PATHS', '1000'))
+MONEY_FLOW_EDGES = 10
+
+# Counterparty risk_score (0-1) at or above which a counterparty counts as high risk
+HIGH_RISK = 0.7
+
+bundle_latency = registry.histogram('investigation_bundle_seconds', 'End-to-end investigation bundle latency.')
+bundle_errors = registry.counter('investigation_bundle_errors_total', 'Bundle sub-queries that failed.')
+
+
+def _money_flow(rows):
+    """Aggregates trace-money-flow rows into per-edge totals for each hop."""
+    first, second, seen = {}, {}, set()
+    for row in rows:
+        key = row['intermediate']
+        # A transfer repeats on every path through it; count it once
+        if ('in', row.get('txn_id_in')) not in seen:
+            seen.add(('in', row.get('txn_id_in')))
+            edge = first.setdefault(key, {'to': key, 'name': row.get('intermediate_name'), 'count': 0, 'amount': 0.0})
+            edge['count'] += 1
+            edge['amount'] += row.get('amount_in') or 0
+        if row.get('final_destination') and ('out', row.get('txn_id_out')) not in seen:
+            seen.add(('out', row.get('txn_id_out')))
+            key2 = (key, row['final_destination'])
+            onward = second.setdefault(key2, {'from': key, 'to': row['final_destination'],
+                                              'name': row.get('destination_name'), 'count': 0, 'amount': 0.0})
+            onward['count'] += 1
+            onward['amount'] += row.get('amount_out') or 0
+    total_out = sum(e['amount'] for e in first.values())
+    forwarded = sum(e['amount'] for e in second.values())
+    money_flow = {
+        'total_out': round(total_out, 2),
+        'forwarded_onward': round(forwarded, 2),
+        'recipients': len(first),
+        'onward_edges': len(second),
+        'hop1': sorted(first.values(), key=lambda e: -e['amount'])[:MONEY_FLOW_EDGES],
+        'hop2': sorted(second.values(), key=lambda e: -e['amount'])[:MONEY_FLOW_EDGES],
+    }
+    for edge in money_flow['hop1'] + money_flow['hop2']:
+        edge['amount'] = round(edge['amount'], 2)
+    if len(rows) >= MONEY_FLOW_PATHS:
+        # The trace itself was cut off, so the totals are lower bounds
+        money_flow['truncated'] = True
+    return money_flow
+
+
+def _counterparties(rows):
+    high_risk = [r for r in rows if (r.get('counterparty_risk') or 0) >= HIGH_RISK]
+    return {
+        'top': [{'id': r['counterparty_id'], 'name': r.get('counterparty_name'), 'risk': r.get('counterparty_risk'),
+                 'count': r.get('txn_count'), 'volume': r.get('total_volume')} for r in rows],
+        'high_risk_count': len(high_risk),
+        'high_risk_volume': round(sum(r.get('total_volume') or 0 for r in high_risk), 2),
+    }
+
+
+def _recent(rows, user_id):
+    sent = [r for r in rows if r.get('sender_id') == user_id]
+    received = [r for r in rows if r.get('receiver_id') == user_id]
+    return {
+        'count': len(rows),
+        'total_sent': round(sum(r.get('amount') or 0 for r in sent), 2),
+        'total_received': round(sum(r.get('amount') or 0 for r in received), 2),
+        'first': rows[-1].get('timestamp') if rows else None,
+        'last': rows[0].get('timestamp') if rows else None,
+        'transactions': [[r.get('timestamp'), 'out' if r.get('sender_id') == user_id else 'in',
+                          r.get('receiver_id') if r.get('sender_id') == user_id else r.get('sender_id'),
+                          r.get('amount'), r.get('txn_type')] for r in rows],
+    }
+
+
+def _rings(rows, user_id):
+    """The precomputed rings the user belongs to, with every member's role and forwarded amounts."""
+    rings = {}
+    for r in rows:
+        ring = rings.setdefault(r['ring_id'], {'ring_id': r['ring_id'], 'size': r.get('ring_size'),
+                                               'hub_id': r.get('hub_id'), 'role': None, 'members': []})
+        if r['user_id'] == user_id:
+            ring['role'] = r.get('role')
+        ring['members'].append([r['user_id'], r.get('name'), r.get('role'), r.get('fan_in'),
+                                r.get('amount_in'), r.get('amount_out'), r.get('in_cycle')])
+    return list(rings.values())
+
+
+async def _add_recipient_risk(client, session_key, edges):
+    """Adds each money-flow recipient's risk score and PEP flag, looked up in one batched query."""
+    try:
+        profiles = await user_loader(session_key).load_many(client, [edge['to'] for edge in edges])
+    except Exception:
+        bundle_errors.inc()
+        return
+    for edge, profile in zip(edges, profiles):
+        if profile is not None:
+            edge['risk'] = profile.get('risk_score')
+            edge['pep'] = profile.get('is_pep')
+
+
+async def fetch_bundle(client, alert_id, session_key=None):
+    """Runs the alert lookup, then the per-user queries concurrently, and assembles the bundle.
+
+    Alert and recipient lookups go through the loaders of `session_key`'s MCP session, which
+    batch the lookups of each client, so all the recipients of a bundle take one query.
+    """
+    start = time.perf_counter()
+    alert = await alert_loader(session_key).load(client, alert_id)
+    if alert is None:
+        return {'status': 'error', 'message': f"Alert {alert_id} not found."}
+    user_id = alert['user_id']
+    window = {}
+    if LOOKBACK_DAYS and alert.get('created_at'):
+        created = datetime.datetime.fromisoformat(str(alert['created_at']))
+        window = {'start_date': (created - datetime.timedelta(days=LOOKBACK_DAYS)).date().isoformat()}
+
+    def arguments(tool):
+        args = {'user_id': user_id, **(window if tool in WINDOWED_TOOLS else {})}
+        if tool == 'trace-money-flow':
+            args['limit'] = MONEY_FLOW_PATHS
+        return args
+
+    results = await asyncio.gather(*(client.call(tool, arguments(tool)) for tool in USER_TOOLS), return_exceptions=True)
+    parts, errors = {}, {}
+    for tool, result in zip(USER_TOOLS, results):
+        if isinstance(result, Exception):
+            bundle_errors.inc()
+            errors[tool] = f"{type(result).__name__}: {result}"
+            result = []
+        parts[tool] = result
+    profile = parts['get-user-details'][0] if parts['get-user-details'] else alert
+    money_flow = _money_flow(parts['trace-money-flow'])
+    await _add_recipient_risk(client, session_key, money_flow['hop1'] + money_flow['hop2'])
+    bundle = {
+        'status': 'success',
+        'alert': {k: alert.get(k) for k in ALERT_FIELDS},
+        'kyc': {k: profile.get(k) for k in KYC_FIELDS if k in profile},
+        'money_flow': money_flow,
+        'counterparties': _counterparties(parts['analyze-counterparties']),
+        'recent_activity': _recent(parts['get-recent-transactions'], user_id),
+        'rings': _rings(parts['get-ring-membership'], user_id),
+    }
+    if errors:
+        bundle['errors'] = errors
+    bundle_latency.observe(time.perf_counter() - start)
+    return bundle
+
+
+def bundle_tool(toolset):
+    """The get_investigation_bundle tool, calling the MCP tools of `toolset` (the agent's own)."""
+
+    async def get_investigation_bundle(alert_id: str, tool_context: ToolContext = None) -> Dict[str, Any]:
+        """
+        Gathers everything needed to investigate an alert in a single call: the alert context,
+        the customer's KYC profile, money flow (totals and the largest recipients with their risk
+        for two hops), counterparty aggregates, recent activity and any precomputed mule rings
+        the customer belongs to.
+
+        Args:
+            alert_id: The unique Alert UUID.
+
+        Returns:
+            A dictionary with 'alert', 'kyc', 'money_flow', 'counterparties', 'recent_activity' and 'rings'.
+            Recent transactions are [timestamp, direction, counterparty_id, amount, txn_type].
+            Ring members are [user_id, name, role, fan_in, amount_in, amount_out, in_cycle].
+        """
+        if tool_context is None:
+            return {'status': 'error', 'message': "Tool context is missing."}
+        # The toolset pools one MCP session per token; the session's loaders are shared the same way
+        client = ToolsetClient(toolset, tool_context)
+        return await fetch_bundle(client, alert_id, session_key=tool_context.state.get('temp:token'))
+
+    return FunctionTool(func=get_investigation_bundle)
@@ -0,0 +1,99 @@
+"""
+Deferred construction of the agent's toolsets and services.
+
+Importing the agent only declares them; each is built on first use, or ahead of it by a
+warm-up on a background thread. Builds run on a small shared pool, so several warm-ups
+proceed at once and a slow one (the Application Integration spec fetch) holds up nothing
+but its own first use.
+"""
+import asyncio
+import concurrent.futures
+import threading
+import time
+
+from google.adk.tools.base_toolset import BaseToolset
+
+from .tracing import tracer
+
+# Seconds a failed build is reported to callers before it is attempted again
+RETRY_AFTER = 30.0
+
+_pool = concurrent.futures.ThreadPoolExecutor(max_workers=8, thread_name_prefix='warm-up')
+
+
+class Lazy:
+    """A value built by `factory` on first use; concurrent users share one build.
+
+    A failed build is re-raised for RETRY_AFTER seconds and then retried, so a service
+    that is briefly unavailable at start-up does not stay broken.
+    """
+
+    def __init__(self, name, factory, retry_after=RETRY_AFTER):
+        self.name = name
+        self.factory = factory
+        self.retry_after = retry_after
+        self._future = None
+        self._failed_at = None
+        self._lock = threading.Lock()
+
+    def _build(self):
+        with tracer.span(self.name, 'startup', detached=True):
+            return self.factory()
+
+    def _done(self, future):
+        if future.exception() is not None:
+            self._failed_at = time.monotonic()
+
+    def warm_up(self):
+        """Starts the build in the background unless it is done or in flight; returns its future."""
+        with self._lock:
+            future = self._future
+            if future is None or (self._failed_at is not None
+                                  and time.monotonic() - self._failed_at >= self.retry_after):
+                self._failed_at = None
+                future = self._future = _pool.submit(self._build)
+                future.add_done_callback(self._done)
+            return future
+
+    def get(self):
+        """The value, waiting for the build if needed."""
+        return self.warm_up().result()
+
+    async def aget(self):
+        """The value, awaiting the build without blocking the event loop."""
+        return await asyncio.wrap_future(self.warm_up())
+
+    def ready(self):
+        future = self._future
+        return future is not None and future.done() and future.exception() is None
+
+
+class LazyToolset(BaseToolset):
+    """Toolset that builds the real one the first time the agent lists its tools.
+
+    If the build fails, ADK runs the agent without these tools for that turn.
+    """
+
+    def __init__(self, name, factory):
+        super().__init__()
+        self.toolset = Lazy(name, factory)
+
+    def warm_up(self):
+        return self.toolset.warm_up()
+
+    async def get_tools(self, readonly_context=None):
+        toolset = await self.toolset.aget()
+        return await toolset.get_tools(readonly_context)
+
+    async def close(self):
+        if self.toolset.ready():
+            await self.toolset.get().close()
+
+
+def warm_up(*targets):
+    """Starts the warm-up of every target at once; returns the futures to wait on, if wanted."""
+    futures = []
+    for target in targets:
+        started = target.warm_up()
+        futures.extend(started if isinstance(started, list) else [started])
+    return futures
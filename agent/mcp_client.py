@@ -0,0 +1,103 @@
+"""MCP clients for calling the toolbox tools from code: directly, or through an agent's toolset."""
+import json
+import os
+from contextlib import AsyncExitStack
+
+from .token_cache import token_cache
+from .tool_cache import tool_cache
+from .tracing import tracer
+
+
+def parse_rows(result):
+    """Flattens a CallToolResult's text content into a list of row dicts."""
+    if result.isError:
+        message = ' '.join(getattr(c, 'text', '') for c in result.content)
+        raise RuntimeError(f"Tool call failed: {message}")
+    rows = []
+    for content in result.content:
+        text = getattr(content, 'text', None)
+        if not text:
+            continue
+        value = json.loads(text)
+        if isinstance(value, list):
+            rows.extend(value)
+        else:
+            rows.append(value)
+    return rows
+
+
+class McpClient:
+    """Async context manager holding one MCP session to the toolbox server.
+
+        async with McpClient() as client:
+            rows = await client.call('get-alert-details', {'alert_id': alert_id})
+    """
+
+    def __init__(self, url=None, use_adc=True, headers=None):
+        self.url = url or os.getenv('MCP_URL')
+        self.use_adc = use_adc
+        self.headers = headers or {}
+        self._stack = None
+        self.session = None
+
+    async def __aenter__(self):
+        # Imported here: the MCP SDK is a large share of the agent's import time
+        from mcp import ClientSession
+        from mcp.client.streamable_http import streamablehttp_client
+        headers = dict(self.headers)
+        if self.use_adc:
+            headers['Authorization'] = f"Bearer {await token_cache.get_token()}"
+        self._stack = AsyncExitStack()
+        read, write, _ = await self._stack.enter_async_context(streamablehttp_client(self.url, headers=headers))
+        self.session = await self._stack.enter_async_context(ClientSession(read, write))
+        await self.session.initialize()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._stack.aclose()
+
+    async def call(self, tool_name, arguments):
+        with tracer.span(tool_name, 'mcp') as span:
+            rows = parse_rows(await self.session.call_tool(tool_name, arguments))
+            span.attributes['rows'] = len(rows)
+            return rows
+
+
+class ToolsetClient:
+    """Calls the tools of an agent's MCP toolset from code, inside one of that agent's tool calls.
+
+    Calls go over the toolset's pooled MCP session, are answered from the shared tool result
+    cache while fresh, and otherwise wait for the run's MCP rate limit, like the model's calls.
+
+        client = ToolsetClient(mcp_tools, tool_context)
+        rows = await client.call('get-alert-details', {'alert_id': alert_id})
+    """
+
+    def __init__(self, toolset, tool_context, cache=tool_cache):
+        self.toolset = toolset
+        self.tool_context = tool_context
+        self.cache = cache
+        # RateLimitPlugin of agent/batch_triage.py, if the runner has one
+        self.rate_limit = tool_context._invocation_context.plugin_manager.get_plugin('rate_limit')
+        self._tools = None
+
+    async def call(self, tool_name, arguments):
+        from mcp.types import CallToolResult
+        cacheable = self.cache is not None and tool_name in self.cache.ttls
+        response = self.cache.get(tool_name, arguments) if cacheable else None
+        if response is not None:
+            self.cache.hits.inc()
+            return parse_rows(CallToolResult.model_validate(response))
+        if cacheable:
+            self.cache.misses.inc()
+        if self._tools is None:
+            self._tools = {tool.name: tool for tool in await self.toolset.get_tools(self.tool_context)}
+        if self.rate_limit is not None:
+            await self.rate_limit.acquire_mcp()
+        with tracer.span(tool_name, 'mcp') as span:
+            response = await self._tools[tool_name].run_async(args=arguments, tool_context=self.tool_context)
+            rows = parse_rows(CallToolResult.model_validate(response))
+            span.attributes['rows'] = len(rows)
+        if cacheable:
+            self.cache.put(tool_name, arguments, response)
+        return rows
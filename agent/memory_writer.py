@@ -0,0 +1,196 @@
+"""Background, coalescing writer that feeds sessions to the memory service off the turn's critical path."""
+import asyncio
+import time
+
+from google.adk.memory import BaseMemoryService, InMemoryMemoryService
+from google.adk.tools.base_toolset import BaseToolset
+
+from .lazy import Lazy
+from .metrics import registry
+from .tracing import tracer
+
+
+def _supports_event_deltas(service):
+    return type(service).add_events_to_memory is not BaseMemoryService.add_events_to_memory
+
+
+class MemoryWriter:
+    """Queues memory generation requests and sends them from a background task.
+
+    Successive turns of the same session are coalesced: while a session is waiting out its
+    debounce window only its latest state is kept, and only events that have not been sent
+    before are submitted. A session is written at most `max_delay` seconds after its first
+    queued turn even if it keeps changing. `submit` waits for room when `max_pending`
+    sessions are already queued, which bounds memory and pushes back on producers.
+
+    How many events of a session were sent is forgotten once the session has had no write for
+    `idle_ttl` seconds (or is flushed on its own); if it continues after that, it is sent again
+    in full.
+    """
+
+    def __init__(self, service, debounce=2.0, max_delay=10.0, max_pending=1000, max_concurrent_writes=8,
+                 idle_ttl=3600.0):
+        self.service = service
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.idle_ttl = idle_ttl
+        self._queue = asyncio.Queue(maxsize=max_pending)
+        self._write_slots = asyncio.Semaphore(max_concurrent_writes)
+        self._pending = {}  # session key -> (latest session, first queued time, last update time)
+        self._sent = {}  # session key -> (number of events already sent, time of the last write)
+        self._swept = time.monotonic()
+        self._writes = set()
+        self._worker = None
+        self.submitted = registry.counter('memory_writer_submitted_total', 'Turns handed to the memory writer.')
+        self.coalesced = registry.counter('memory_writer_coalesced_total', 'Turns merged into an already queued write.')
+        self.writes = registry.counter('memory_writer_writes_total', 'Memory generation requests sent.')
+        self.errors = registry.counter('memory_writer_errors_total', 'Memory generation requests that failed.')
+        self.write_latency = registry.histogram('memory_write_seconds', 'Latency of memory service writes.')
+        self.submit_latency = registry.histogram('memory_submit_seconds', 'Time a turn spends handing off to the writer.')
+
+    @staticmethod
+    def _key(session):
+        return (session.app_name, session.user_id, session.id)
+
+    def _evict_idle(self, now):
+        """Forgets the sent counts of sessions idle for `idle_ttl`, checking at most once a minute."""
+        if now - self._swept < min(60.0, self.idle_ttl):
+            return
+        self._swept = now
+        for key in [k for k, (_, written) in self._sent.items() if now - written > self.idle_ttl]:
+            if key not in self._pending:
+                del self._sent[key]
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, session):
+        """Schedules the session's new events for memory generation; returns without waiting for the write."""
+        start = time.perf_counter()
+        self._ensure_worker()
+        key = self._key(session)
+        self.submitted.inc()
+        now = time.monotonic()
+        self._evict_idle(now)
+        if key in self._pending:
+            self._pending[key] = (session, self._pending[key][1], now)
+            self.coalesced.inc()
+        else:
+            await self._queue.put(key)
+            self._pending[key] = (session, now, now)
+        self.submit_latency.observe(time.perf_counter() - start)
+
+    async def _run(self):
+        while True:
+            key = await self._queue.get()
+            self._queue.task_done()
+            # Debounce: wait until the session has been quiet for `debounce` seconds (capped by max_delay)
+            while key in self._pending:
+                _, first, last = self._pending[key]
+                wait = min(last + self.debounce, first + self.max_delay) - time.monotonic()
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            await self._write_slots.acquire()
+            task = asyncio.create_task(self._write(key))
+            self._writes.add(task)
+            task.add_done_callback(self._write_done)
+
+    def _write_done(self, task):
+        self._writes.discard(task)
+        self._write_slots.release()
+
+    async def _write(self, key):
+        entry = self._pending.pop(key, None)
+        if entry is None:
+            return
+        session = entry[0]
+        sent = self._sent.get(key, (0, 0.0))[0]
+        events = session.events[sent:]
+        if not events:
+            return
+        # Claim the events before awaiting so an overlapping write of the same session does not resend them
+        self._sent[key] = (sent + len(events), time.monotonic())
+        start = time.perf_counter()
+        # The worker task outlives the turn that queued the session, so the write is its own trace
+        span = tracer.start('memory_write', 'memory', detached=True, session_id=session.id, events=len(events))
+        try:
+            service = await self.service.aget() if isinstance(self.service, Lazy) else self.service
+            if _supports_event_deltas(service):
+                await service.add_events_to_memory(
+                    app_name=session.app_name, user_id=session.user_id, events=events, session_id=session.id)
+            else:
+                # Memory Bank consolidates generated memories, so a session holding only the new events is enough
+                await service.add_session_to_memory(session.model_copy(update={'events': list(events)}))
+            self.writes.inc()
+            print(f"\n****Triggered memory generation ({len(events)} new events)****\n")
+        except Exception as e:
+            self.errors.inc()
+            if self._sent.get(key, (None,))[0] == sent + len(events):
+                self._sent[key] = (sent, time.monotonic())
+            print(f"Memory generation failed for session {session.id}: {e}")
+            span.attributes['error'] = type(e).__name__
+        finally:
+            self.write_latency.observe(time.perf_counter() - start)
+            tracer.end(span)
+
+    async def flush(self, session=None):
+        """Writes one session (e.g. when it ends) or every pending session immediately."""
+        keys = [self._key(session)] if session is not None else list(self._pending)
+        await asyncio.gather(*(self._write(key) for key in keys), *list(self._writes))
+        if session is not None:
+            self._sent.pop(self._key(session), None)
+
+    async def close(self):
+        """Flushes everything on shutdown and stops the background task."""
+        await self.flush()
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+
+
+class CloseWithRunner(BaseToolset):
+    """Toolset without tools that closes the writer when the runner closes.
+
+    A runner closes the toolsets of its agents on `Runner.close()`, which `adk web` and
+    `adk api_server` call for every runner on shutdown. Put it in the root agent's tools.
+    """
+
+    def __init__(self, writer):
+        super().__init__()
+        self.writer = writer
+
+    async def get_tools(self, readonly_context=None):
+        return []
+
+    async def close(self):
+        await self.writer.close()
+
+
+class SimulatedMemoryBankService(InMemoryMemoryService):
+    """Offline stand-in for VertexAiMemoryBankService with a configurable write latency.
+
+    Latency is `base_latency + per_event_latency * events`, mimicking a memory generation
+    round trip whose cost grows with the amount of conversation submitted.
+    """
+
+    def __init__(self, base_latency=1.5, per_event_latency=0.05):
+        super().__init__()
+        self.base_latency = base_latency
+        self.per_event_latency = per_event_latency
+        self.latency = registry.histogram('simulated_memory_bank_seconds', 'Simulated memory generation latency.')
+
+    async def _simulate(self, events):
+        delay = self.base_latency + self.per_event_latency * len(events)
+        self.latency.observe(delay)
+        await asyncio.sleep(delay)
+
+    async def add_session_to_memory(self, session):
+        await self._simulate(session.events)
+        await super().add_session_to_memory(session)
+
+    async def add_events_to_memory(self, *, app_name, user_id, events, session_id=None, custom_metadata=None):
+        await self._simulate(events)
+        await super().add_events_to_memory(app_name=app_name, user_id=user_id, events=events,
+                                           session_id=session_id, custom_metadata=custom_metadata)
@@ -0,0 +1,123 @@
+"""Lightweight in-process counters and latency histograms shared by the agent's caches and services."""
+import bisect
+import threading
+
+# Upper bounds in seconds; the last bucket is +Inf
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _key(name, labels):
+    if not labels:
+        return name
+    return name + '{' + ','.join(f'{k}="{v}"' for k, v in sorted(labels.items())) + '}'
+
+
+class Counter:
+    def __init__(self, name, description='', labels=None):
+        self.name = name
+        self.description = description
+        self.labels = labels or {}
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self):
+        return self.value
+
+
+class Histogram:
+    """Fixed-bucket histogram (Prometheus style) with count, sum and approximate quantiles."""
+
+    def __init__(self, name, description='', labels=None, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = labels or {}
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q):
+        """Upper bound of the bucket containing the q-quantile."""
+        with self._lock:
+            if not self.count:
+                return None
+            rank, seen = q * self.count, 0
+            for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+                seen += count
+                if seen >= rank:
+                    return bound
+        return float('inf')
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else None,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+        }
+
+
+class Registry:
+    """Named (and optionally labelled) metrics, created on first use."""
+
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, description, labels, **kwargs):
+        key = _key(name, labels)
+        with self._lock:
+            if key not in self.metrics:
+                self.metrics[key] = cls(name, description, labels, **kwargs)
+            return self.metrics[key]
+
+    def counter(self, name, description='', labels=None):
+        return self._get(Counter, name, description, labels)
+
+    def histogram(self, name, description='', labels=None, buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, description, labels, buckets=buckets)
+
+    def snapshot(self):
+        return {name: metric.snapshot() for name, metric in sorted(self.metrics.items())}
+
+    def prometheus(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = sorted(self.metrics.values(), key=lambda m: (m.name, _key('', m.labels)))
+        lines, described = [], set()
+        for metric in metrics:
+            kind = 'histogram' if isinstance(metric, Histogram) else 'counter'
+            if metric.name not in described:
+                described.add(metric.name)
+                lines.append(f"# HELP {metric.name} {metric.description}")
+                lines.append(f"# TYPE {metric.name} {kind}")
+            if kind == 'counter':
+                lines.append(f"{_key(metric.name, metric.labels)} {metric.value}")
+                continue
+            with metric._lock:
+                counts, total, count = list(metric.counts), metric.sum, metric.count
+            cumulative = 0
+            for bound, bucket in zip(metric.buckets + (float('inf'),), counts):
+                cumulative += bucket
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f"{_key(metric.name + '_bucket', {**metric.labels, 'le': le})} {cumulative}")
+            lines.append(f"{_key(metric.name + '_sum', metric.labels)} {total}")
+            lines.append(f"{_key(metric.name + '_count', metric.labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide registry
+registry = Registry()
@@ -0,0 +1,131 @@
+"""Off-event-loop PDF rendering for the SAR reports."""
+import asyncio
+import concurrent.futures
+import os
+import time
+
+from .metrics import registry
+
+# Longest narrative we render; a full SAR is well under this
+MAX_CHARS = int(os.getenv('PDF_MAX_CHARS', '200000'))
+RENDER_TIMEOUT = float(os.getenv('PDF_RENDER_TIMEOUT', '30'))
+
+# Layout template shared by every report
+PAGE_FORMAT = 'A4'
+FONT = ('Arial', 12)
+LINE_HEIGHT = 10
+
+_fpdf_class = None
+
+
+class PdfRenderError(Exception):
+    pass
+
+
+def _warm_worker():
+    """Pool initializer: imports fpdf and renders once so fonts and layout code are loaded before the first request."""
+    global _fpdf_class
+    from fpdf import FPDF
+    _fpdf_class = FPDF
+    generate_valid_pdf_bytes("warm-up")
+
+
+# Function to generate valid PDF bytes from text content
+def generate_valid_pdf_bytes(text_content: str) -> bytes:
+    if _fpdf_class is None:
+        _warm_worker()
+    pdf = _fpdf_class(format=PAGE_FORMAT)
+    pdf.add_page()
+    pdf.set_font(FONT[0], size=FONT[1])
+    pdf.multi_cell(0, LINE_HEIGHT, text_content)
+    # fpdf2 returns a bytearray; convert once here, in the worker, so the event loop
+    # side hands the buffer to the artifact without another copy
+    return bytes(pdf.output())
+
+
+class PdfRenderer:
+    """Renders PDFs on a warm worker pool so long narratives never stall the event loop.
+
+    Uses processes by default (rendering is CPU bound and holds the GIL); set
+    `kind='thread'` where subprocesses are not allowed.
+    """
+
+    def __init__(self, workers=None, kind=None, max_chars=MAX_CHARS, timeout=RENDER_TIMEOUT):
+        self.workers = workers or int(os.getenv('PDF_RENDER_WORKERS', '2'))
+        self.kind = kind or os.getenv('PDF_RENDER_EXECUTOR', 'process')
+        self.max_chars = max_chars
+        self.timeout = timeout
+        self._executor = None
+        self.latency = registry.histogram('pdf_render_seconds', 'PDF render latency, including pool queueing.')
+        self.sizes = registry.histogram('pdf_render_bytes', 'Rendered PDF size.',
+                                        buckets=(1e4, 5e4, 1e5, 5e5, 1e6, 5e6, 1e7))
+        self.failures = registry.counter('pdf_render_failures_total', 'PDF renders rejected, timed out or failed.')
+
+    def _pool(self):
+        if self._executor is None:
+            if self.kind == 'thread':
+                self._executor = concurrent.futures.ThreadPoolExecutor(self.workers, 'pdf-render', _warm_worker)
+            else:
+                self._executor = concurrent.futures.ProcessPoolExecutor(self.workers, initializer=_warm_worker)
+        return self._executor
+
+    def warm_up(self):
+        """Starts the pool and preloads every worker ahead of the first report."""
+        pool = self._pool()
+        return [pool.submit(generate_valid_pdf_bytes, "warm-up") for _ in range(self.workers)]
+
+    async def render(self, text_content: str) -> bytes:
+        if len(text_content) > self.max_chars:
+            self.failures.inc()
+            raise PdfRenderError(f"Report is {len(text_content):,} characters; the limit is {self.max_chars:,}.")
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        pool = self._pool()
+        try:
+            pdf_bytes = await asyncio.wait_for(
+                loop.run_in_executor(pool, generate_valid_pdf_bytes, text_content), self.timeout)
+        except asyncio.TimeoutError:
+            self.failures.inc()
+            self._recycle(pool, loop)
+            raise PdfRenderError(f"PDF rendering timed out after {self.timeout:.0f}s.")
+        except concurrent.futures.process.BrokenProcessPool:
+            # A worker died (e.g. OOM); start a fresh pool for the next request
+            self.failures.inc()
+            if self._executor is pool:
+                self._executor = None
+            raise PdfRenderError("PDF rendering worker crashed.")
+        except Exception as e:
+            self.failures.inc()
+            raise PdfRenderError(f"PDF rendering failed: {e}") from e
+        self.latency.observe(time.perf_counter() - start)
+        self.sizes.observe(len(pdf_bytes))
+        return pdf_bytes
+
+    def _recycle(self, pool, loop):
+        """Replaces the pool after a timeout, since the stuck render still holds its worker.
+
+        The old pool takes no new work. Its workers are killed once every render already on it
+        has finished or timed out too; thread workers cannot be killed and are left to finish.
+        """
+        if self._executor is not pool:
+            return  # another timed-out render already replaced it
+        self._executor = None
+        # shutdown() forgets the worker processes, so take them first
+        processes = list((getattr(pool, '_processes', None) or {}).values())
+        pool.shutdown(wait=False, cancel_futures=True)
+        if isinstance(pool, concurrent.futures.ProcessPoolExecutor):
+            loop.call_later(self.timeout, _terminate, processes)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def _terminate(processes):
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+
+
+pdf_renderer = PdfRenderer()
@@ -0,0 +1,113 @@
+"""
+Deterministic pre-screen for the false-positive rules spelled out in the root_agent instruction.
+
+Evaluates every rule for every alert in one vectorized pandas pass over the alert, user and
+transaction tables. Alerts with a high-confidence false-positive verdict can skip the LLM;
+the rest are investigated with their rule hits attached.
+
+    python -m agent.prescreen --data-dir data --output prescreen.jsonl
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+HIGH_INCOME = 1_500_000
+AFFORDABLE_SHARE = 0.20
+# How far before the alert we look for the triggering transaction
+LOOKBACK = pd.Timedelta(days=7)
+
+MERCHANT_PREFIXES = ('EXTERNAL_MERCHANT', 'EXTERNAL_SUPPLIER')
+
+# Rule ids and the sentence attached to the LLM prompt when they fire
+RULES = {
+    'high_income_affordable': "High income (>1,500,000 SEK) and the transaction is under 20% of annual income.",
+    'importer_geo_risk': "Occupation is Importör and the alert is Geografisk risk (likely supplier payment).",
+    'business_owner_merchant': "Högt värde transaktion by a Företagare with high income paying a merchant/supplier.",
+    'pep': "Customer is a PEP: enhanced due diligence, do not close without review.",
+}
+
+
+def load_frames(data_dir):
+    """Reads the alerts, users and transactions tables from CSV (or Parquet) files in `data_dir`."""
+    def read(table, columns=None):
+        parquet = os.path.join(data_dir, f'{table}.parquet')
+        if os.path.exists(parquet):
+            return pd.read_parquet(parquet, columns=columns)
+        return pd.read_csv(os.path.join(data_dir, f'{table}.csv'), usecols=columns)
+    return read('alerts'), read('users'), read('transactions', ['sender_id', 'receiver_id', 'amount', 'timestamp', 'txn_type'])
+
+
+def evaluate(alerts, users, transactions):
+    """Returns one row per alert with the rule hits, evidence and pre-screen verdict."""
+    frame = alerts.merge(users[['user_id', 'occupation', 'annual_income', 'is_pep']], on='user_id', how='left')
+    frame['created_at'] = pd.to_datetime(frame['created_at'], format='ISO8601')
+
+    # Largest outgoing transaction per alert in the lookback window: the trigger candidate
+    outgoing = transactions[transactions['sender_id'].isin(frame['user_id'])]
+    outgoing = outgoing.assign(timestamp=pd.to_datetime(outgoing['timestamp'], format='ISO8601'))
+    window = frame[['alert_id', 'user_id', 'created_at']].merge(outgoing, left_on='user_id', right_on='sender_id')
+    window = window[(window['timestamp'] <= window['created_at']) & (window['timestamp'] >= window['created_at'] - LOOKBACK)]
+    window = window.sort_values('amount', ascending=False).drop_duplicates('alert_id')
+    trigger = window.set_index('alert_id')[['amount', 'receiver_id', 'txn_type']]
+    frame = frame.join(trigger.rename(columns={'amount': 'txn_amount', 'receiver_id': 'txn_receiver'}), on='alert_id')
+
+    reason = frame['trigger_reason'].fillna('')
+    income = frame['annual_income'].fillna(0)
+    receiver = frame['txn_receiver'].fillna('')
+    has_txn = frame['txn_amount'].notna()
+    share = frame['txn_amount'] / income.where(income > 0)
+
+    hits = pd.DataFrame({
+        'high_income_affordable': reason.str.startswith('Högt värde transaktion') & (income > HIGH_INCOME)
+                                  & has_txn & (share < AFFORDABLE_SHARE),
+        'importer_geo_risk': reason.str.startswith('Geografisk risk') & (frame['occupation'] == 'Importör'),
+        'business_owner_merchant': reason.str.startswith('Högt värde transaktion')
+                                   & (frame['occupation'] == 'Företagare') & (income > HIGH_INCOME)
+                                   & (receiver.str.startswith(MERCHANT_PREFIXES) | (frame['txn_type'] == 'PURCHASE')),
+        'pep': frame['is_pep'].fillna(False).astype(bool),
+    })
+    false_positive = hits[['high_income_affordable', 'importer_geo_risk', 'business_owner_merchant']].any(axis=1)
+    skip_llm = false_positive & ~hits['pep']
+
+    rule_names = np.array(list(RULES))
+    hit_matrix = hits[list(RULES)].to_numpy()
+    return pd.DataFrame({
+        'alert_id': frame['alert_id'],
+        'user_id': frame['user_id'],
+        'rule_hits': [rule_names[row].tolist() for row in hit_matrix],
+        'txn_amount': frame['txn_amount'],
+        'income_share': share.round(4),
+        'verdict': np.where(skip_llm, 'False Positive', None),
+        'confidence': np.where(skip_llm, 'High', None),
+        'escalate': hits['pep'].to_numpy(),
+        'skip_llm': skip_llm.to_numpy(),
+    })
+
+
+def describe_hits(row):
+    """Prompt fragment describing a pre-screen row for the LLM."""
+    if not row['rule_hits']:
+        return "Pre-screen: no deterministic rule matched."
+    lines = [f"- {RULES[rule]}" for rule in row['rule_hits']]
+    if row.get('txn_amount') is not None and not pd.isna(row['txn_amount']):
+        lines.append(f"- Largest outgoing transaction in the 7 days before the alert: {row['txn_amount']:,.2f} SEK"
+                     f" ({row['income_share']:.1%} of annual income).")
+    return "Pre-screen rule hits (deterministic, verify before relying on them):\n" + "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the false-positive pre-screen rules over all alerts.")
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--output', default=None, help="Optional JSONL output path.")
+    args = parser.parse_args()
+    result = evaluate(*load_frames(args.data_dir))
+    if args.output:
+        result.to_json(args.output, orient='records', lines=True, force_ascii=False)
+    print(f"{len(result)} alerts, {int(result['skip_llm'].sum())} closed as false positives without the LLM, "
+          f"{int(result['escalate'].sum())} PEP escalations")
+
+
+if __name__ == '__main__':
+    main()
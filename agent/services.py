@@ -0,0 +1,38 @@
+"""Registers the disk artifact store with ADK's CLI, so `adk web` and `adk api_server` can use it.
+
+ADK imports this file as a top-level `services` module when it is given this folder, e.g.
+
+    adk web agent --artifact_service_uri=disk://.artifacts
+
+`disk://PATH` stores under PATH; `disk://` alone uses ARTIFACT_DIR (default `.artifacts`).
+"""
+import importlib
+import os
+import sys
+from urllib.parse import unquote, urlparse
+
+from google.adk.cli.service_registry import get_service_registry
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _agent_module():
+    # ADK puts this folder itself on sys.path, where `agent` would resolve to agent.py rather
+    # than the package; the parent has to come first so the agent loader reuses this import
+    parent = os.path.dirname(_HERE)
+    if sys.path[0] != parent:
+        sys.path.insert(0, parent)
+    return importlib.import_module(f'{os.path.basename(_HERE)}.agent')
+
+
+def disk_artifact_factory(uri, **kwargs):
+    agent_module = _agent_module()
+    parsed = urlparse(uri)
+    root = unquote(parsed.netloc + parsed.path)
+    if root and os.path.abspath(root) != os.path.abspath(os.getenv('ARTIFACT_DIR', '.artifacts')):
+        return agent_module.DiskArtifactService(root=root)
+    # The agent's own instance, so WARM_UP=artifacts warms the store the runner uses
+    return agent_module.artifact_service.get()
+
+
+get_service_registry().register_artifact_service('disk', disk_artifact_factory)
@@ -0,0 +1,111 @@
+"""Process-wide OAuth access token cache backed by Application Default Credentials."""
+import asyncio
+import concurrent.futures
+import datetime
+import threading
+import time
+
+import google.auth
+from google.auth.transport.requests import Request
+
+from .metrics import registry
+
+# Refresh in the background once the token is this close to expiry
+REFRESH_MARGIN = datetime.timedelta(minutes=5)
+# Below this, the cached token is no longer handed out and callers wait for the refresh
+MIN_VALIDITY = datetime.timedelta(seconds=30)
+
+
+def _utcnow():
+    # google-auth reports expiry as a naive UTC datetime
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+class TokenCache:
+    """Reuses an ADC access token until shortly before it expires.
+
+    Refreshes run on a dedicated thread so they never block the event loop, and at most
+    one refresh is in flight at a time no matter how many sessions ask for a token.
+    """
+
+    def __init__(self, refresh_margin=REFRESH_MARGIN, min_validity=MIN_VALIDITY):
+        self.refresh_margin = refresh_margin
+        self.min_validity = min_validity
+        self._credentials = None
+        self._token = None
+        self._expiry = None
+        self._inflight = None
+        self._lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='adc-refresh')
+        self.hits = registry.counter('token_cache_hits_total', 'Tool calls served with a cached OAuth token.')
+        self.misses = registry.counter('token_cache_misses_total', 'Tool calls that waited for an OAuth token refresh.')
+        self.refresh_latency = registry.histogram('token_refresh_seconds', 'Latency of ADC token refreshes.')
+
+    def _refresh(self):
+        """Blocking ADC refresh, run on the executor thread."""
+        start = time.perf_counter()
+        try:
+            if self._credentials is None:
+                self._credentials, _ = google.auth.default()
+            self._credentials.refresh(Request())
+            token = self._credentials.token
+            # A quick check to make sure the token isn't None
+            if token is None:
+                raise ValueError("Failed to retrieve OAuth token from ADC. "
+                                 "Make sure you have run 'gcloud auth application-default login'.")
+            with self._lock:
+                self._token = token
+                self._expiry = self._credentials.expiry
+            return token
+        finally:
+            self.refresh_latency.observe(time.perf_counter() - start)
+            with self._lock:
+                self._inflight = None
+
+    def _start_refresh(self):
+        """Returns the in-flight refresh, starting one if needed (single flight)."""
+        with self._lock:
+            if self._inflight is None:
+                self._inflight = self._executor.submit(self._refresh)
+            return self._inflight
+
+    def _remaining(self):
+        if self._token is None:
+            return None
+        if self._expiry is None:
+            # Credentials without an expiry (e.g. some metadata tokens) never go stale
+            return datetime.timedelta.max
+        return self._expiry - _utcnow()
+
+    async def get_token(self):
+        remaining = self._remaining()
+        if remaining is not None and remaining > self.min_validity:
+            self.hits.inc()
+            if remaining < self.refresh_margin:
+                self._start_refresh()
+            return self._token
+        self.misses.inc()
+        return await asyncio.wrap_future(self._start_refresh())
+
+    def prime(self, token, expiry=None):
+        """Hands out `token` from now on (until `expiry`, if given), e.g. for a local MCP server that ignores it."""
+        with self._lock:
+            self._token = token
+            self._expiry = expiry
+
+    def warm_up(self):
+        """Fetches the first token in the background, ahead of the first tool call."""
+        return self._start_refresh()
+
+    def stats(self):
+        hits, misses = self.hits.value, self.misses.value
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / (hits + misses) if hits + misses else None,
+            'refresh_seconds': self.refresh_latency.snapshot(),
+        }
+
+
+# Shared by every session in the process
+token_cache = TokenCache()
@@ -0,0 +1,157 @@
+"""Shared TTL/LRU cache for MCP tool results, wired in through the tool callbacks."""
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from google.adk.tools import BaseTool
+from google.adk.tools.tool_context import ToolContext
+
+from .metrics import registry
+
+# Seconds a result stays fresh, per tool. Tools not listed here are never cached. The alert queue
+# (get-high-priority-alerts) is not: claims by any runner change it, and a stale page would show
+# alerts that are already being investigated as free.
+DEFAULT_TTLS = {
+    'get-user-details': 600,
+    'get-user-details-batch': 600,
+    'search-user-by-name': 600,
+    'get-alert-details': 300,
+    'get-alert-details-batch': 300,
+    'trace-money-flow': 300,
+    'analyze-counterparties': 300,
+    'get-recent-transactions': 60,
+    'get-ring-membership': 3600,
+    'get_investigation_bundle': 300,
+}
+
+# Tables each tool reads, for invalidation when a table is reloaded
+TOOL_TABLES = {
+    'get-user-details': {'users'},
+    'get-user-details-batch': {'users'},
+    'search-user-by-name': {'users'},
+    'get-alert-details': {'alerts', 'users'},
+    'get-alert-details-batch': {'alerts', 'users'},
+    'trace-money-flow': {'transactions', 'users'},
+    'analyze-counterparties': {'transactions', 'users'},
+    'get-recent-transactions': {'transactions'},
+    'get-ring-membership': {'ring_membership', 'users'},
+    'get_investigation_bundle': {'alerts', 'users', 'transactions', 'ring_membership'},
+}
+
+# Arguments the underlying SQL compares case-insensitively
+CASE_INSENSITIVE_ARGS = {'name'}
+
+
+def normalize_args(args):
+    """Canonical form of tool arguments so equivalent calls share a cache entry."""
+    normalized = {}
+    for key, value in sorted(args.items()):
+        if isinstance(value, str):
+            value = ' '.join(value.split())
+            if key in CASE_INSENSITIVE_ARGS:
+                value = value.casefold()
+        normalized[key] = value
+    return json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)
+
+
+class ToolResultCache:
+    """LRU cache of tool responses keyed by tool name and normalized arguments.
+
+    Bounded by entry count and approximate size; entries expire after their tool's TTL.
+    One instance is shared by every agent and session in the process.
+    """
+
+    def __init__(self, ttls=None, max_entries=2048, max_bytes=64 * 1024 * 1024):
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (expires_at, size, response)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = registry.counter('tool_cache_hits_total', 'Tool calls answered from the result cache.')
+        self.misses = registry.counter('tool_cache_misses_total', 'Cacheable tool calls that went to the backend.')
+        self.evictions = registry.counter('tool_cache_evictions_total', 'Entries evicted to stay within bounds.')
+
+    def _pop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, tool_name, args):
+        key = (tool_name, normalize_args(args))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    self._pop(key)
+                return None
+            self._entries.move_to_end(key)
+            return copy.deepcopy(entry[2])
+
+    def put(self, tool_name, args, response):
+        ttl = self.ttls.get(tool_name)
+        if not ttl:
+            return
+        size = len(json.dumps(response, ensure_ascii=False, default=str))
+        if size > self.max_bytes:
+            return
+        key = (tool_name, normalize_args(args))
+        with self._lock:
+            if key in self._entries:
+                if self._entries[key][0] > time.monotonic():
+                    return
+                self._pop(key)
+            self._entries[key] = (time.monotonic() + ttl, size, copy.deepcopy(response))
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+                self.evictions.inc()
+
+    def invalidate(self, tool_name=None, tables=None):
+        """Drops cached results for one tool, for tools reading any of `tables`, or everything."""
+        with self._lock:
+            for key in list(self._entries):
+                name = key[0]
+                if tool_name is not None and name != tool_name:
+                    continue
+                if tables is not None and not TOOL_TABLES.get(name, set()) & set(tables):
+                    continue
+                self._pop(key)
+
+    def stats(self):
+        with self._lock:
+            entries, size = len(self._entries), self._bytes
+        return {
+            'hits': self.hits.value,
+            'misses': self.misses.value,
+            'evictions': self.evictions.value,
+            'entries': entries,
+            'bytes': size,
+        }
+
+    # ------------------------------------------------------------------
+    # ADK callbacks
+    # ------------------------------------------------------------------
+    def before_tool_callback(self, tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext):
+        """Answers the call from the cache, skipping the tool (and the rest of the chain) on a hit."""
+        if tool.name not in self.ttls:
+            return None
+        response = self.get(tool.name, args)
+        if response is None:
+            self.misses.inc()
+            return None
+        self.hits.inc()
+        return response
+
+    def after_tool_callback(self, tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext,
+                            tool_response: Any) -> Optional[Dict]:
+        """Stores successful responses; responses served from the cache keep their original expiry."""
+        if isinstance(tool_response, dict) and not tool_response.get('isError') and tool_response.get('status') != 'error':
+            self.put(tool.name, args, tool_response)
+        return None
+
+
+# Shared across sessions and agents in the process
+tool_cache = ToolResultCache()
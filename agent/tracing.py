@@ -0,0 +1,245 @@
+"""
+Per-phase tracing for investigations: agent runs, model turns, tool calls and the work inside them.
+
+Spans are opened and closed by the ADK agent, model and tool callbacks, and by `tracer.span()`
+around the phases in between (ADC token refresh, memory hand-off, PDF render, artifact save,
+direct MCP calls). Every finished span feeds the `span_seconds{phase,name}` histogram; tool
+spans also record payload sizes and model spans the token counts reported by the model.
+
+Export needs no cloud service:
+  TRACE_FILE=traces.jsonl   one JSON object per finished span
+  METRICS_PORT=9464         Prometheus text format at http://0.0.0.0:9464/metrics
+"""
+import contextlib
+import contextvars
+import http.server
+import json
+import os
+import threading
+import time
+import uuid
+
+from .metrics import registry
+
+BYTE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+TOKEN_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+# Open callback spans kept for their matching "after" callback; a tool that raises without an
+# error callback never gets one, so the oldest are dropped beyond this
+MAX_OPEN_SPANS = 10_000
+
+# Innermost open span of the running task; ADK awaits a tool's callbacks and the tool itself
+# in one task, so phases inside a tool nest under its span
+_current = contextvars.ContextVar('aml_trace_span', default=None)
+
+
+def _size(value):
+    try:
+        return len(json.dumps(value, default=str, ensure_ascii=False).encode('utf-8'))
+    except (TypeError, ValueError):
+        return 0
+
+
+class Span:
+    __slots__ = ('name', 'phase', 'trace_id', 'span_id', 'parent', 'start', 'wall_start', 'attributes')
+
+    def __init__(self, name, phase, trace_id, parent, attributes):
+        self.name = name
+        self.phase = phase
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent = parent
+        self.start = time.perf_counter()
+        self.wall_start = time.time()
+        self.attributes = attributes
+
+
+class Tracer:
+    """Collects spans into histograms and, if `path` is set, appends them to a JSONL file."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+        self._open = {}
+        self._agents = {}  # invocation_id -> stack of open agent spans
+        self._model_done = {}  # invocation_id -> perf_counter of the last model response
+
+    @staticmethod
+    def _payload_bytes(tool, direction):
+        return registry.histogram('tool_payload_bytes', 'Serialized tool arguments and responses.',
+                                  labels={'tool': tool, 'direction': direction}, buckets=BYTE_BUCKETS)
+
+    @staticmethod
+    def _model_tokens(agent, kind):
+        return registry.histogram('model_tokens', 'Tokens per model turn, as reported by the model.',
+                                  labels={'agent': agent, 'kind': kind}, buckets=TOKEN_BUCKETS)
+
+    # ------------------------------------------------------------------
+    # Spans
+    # ------------------------------------------------------------------
+    def start(self, name, phase, parent=None, trace_id=None, detached=False, **attributes):
+        """Opens a span under `parent` (default: the current span); `detached` starts a new trace."""
+        if parent is None and not detached:
+            parent = _current.get()
+        if trace_id is None:
+            trace_id = parent.trace_id if parent is not None else uuid.uuid4().hex
+        return Span(name, phase, trace_id, parent, attributes)
+
+    def end(self, span, **attributes):
+        duration = time.perf_counter() - span.start
+        span.attributes.update(attributes)
+        registry.histogram('span_seconds', 'Span latency by phase.',
+                           labels={'phase': span.phase, 'name': span.name}).observe(duration)
+        if self.path:
+            self._write({
+                'trace_id': span.trace_id,
+                'span_id': span.span_id,
+                'parent_id': span.parent.span_id if span.parent is not None else None,
+                'name': span.name,
+                'phase': span.phase,
+                'start': round(span.wall_start, 6),
+                'duration_ms': round(duration * 1000, 3),
+                'attributes': span.attributes,
+            })
+        return duration
+
+    @contextlib.contextmanager
+    def span(self, name, phase, detached=False, **attributes):
+        """Times the block as a child of the current span."""
+        span = self.start(name, phase, detached=detached, **attributes)
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.attributes['error'] = type(e).__name__
+            raise
+        finally:
+            _current.reset(token)
+            self.end(span)
+
+    def _write(self, record):
+        line = json.dumps(record, default=str, ensure_ascii=False) + '\n'
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, 'a', buffering=1, encoding='utf-8')
+            self._file.write(line)
+
+    def _push(self, key, span):
+        with self._lock:
+            self._open[key] = span
+            while len(self._open) > MAX_OPEN_SPANS:
+                self._open.pop(next(iter(self._open)))
+        _current.set(span)
+
+    def _pop(self, key):
+        with self._lock:
+            span = self._open.pop(key, None)
+        if span is not None:
+            _current.set(span.parent)
+        return span
+
+    # ------------------------------------------------------------------
+    # ADK callbacks
+    # ------------------------------------------------------------------
+    async def before_agent(self, callback_context):
+        invocation = callback_context.invocation_id
+        stack = self._agents.setdefault(invocation, [])
+        parent = stack[-1] if stack else None
+        if parent is not None and invocation in self._model_done:
+            # Transfer to a sub-agent: from the parent's last model response to the sub-agent starting
+            handoff = self.start(f"{parent.name}->{callback_context.agent_name}", 'handoff', parent=parent)
+            handoff.start = self._model_done[invocation]
+            self.end(handoff)
+        span = self.start(callback_context.agent_name, 'agent', parent=parent, trace_id=invocation)
+        if parent is not None:
+            span.attributes['transferred_from'] = parent.name
+        stack.append(span)
+        self._push(('agent', invocation, callback_context.agent_name), span)
+        return None
+
+    async def after_agent(self, callback_context):
+        invocation = callback_context.invocation_id
+        span = self._pop(('agent', invocation, callback_context.agent_name))
+        stack = self._agents.get(invocation, [])
+        if span in stack:
+            stack.remove(span)
+        if span is not None:
+            self.end(span)
+            if 'transferred_from' in span.attributes:
+                # The agents that transferred control do not resume, and ADK skips their
+                # after-agent callbacks, so their spans end with the sub-agent's
+                while stack:
+                    ancestor = stack.pop()
+                    self._pop(('agent', invocation, ancestor.name))
+                    self.end(ancestor, transferred_to=span.name)
+        if not stack:
+            self._agents.pop(invocation, None)
+            self._model_done.pop(invocation, None)
+        return None
+
+    async def before_model(self, callback_context, llm_request):
+        parent = self._open.get(('agent', callback_context.invocation_id, callback_context.agent_name))
+        span = self.start(callback_context.agent_name, 'model', parent=parent)
+        self._push(('model', callback_context.invocation_id, callback_context.agent_name), span)
+        return None
+
+    async def after_model(self, callback_context, llm_response):
+        span = self._pop(('model', callback_context.invocation_id, callback_context.agent_name))
+        self._model_done[callback_context.invocation_id] = time.perf_counter()
+        if span is None:
+            return None
+        usage = getattr(llm_response, 'usage_metadata', None)
+        tokens = {}
+        if usage is not None:
+            tokens = {'prompt_tokens': usage.prompt_token_count or 0, 'output_tokens': usage.candidates_token_count or 0,
+                      'cached_tokens': usage.cached_content_token_count or 0}
+            for kind, count in tokens.items():
+                self._model_tokens(callback_context.agent_name, kind.replace('_tokens', '')).observe(count)
+        calls = [p.function_call.name for p in (llm_response.content.parts or [])
+                 if getattr(p, 'function_call', None)] if llm_response.content else []
+        self.end(span, **tokens, function_calls=calls)
+        return None
+
+    async def before_tool(self, tool, args, tool_context):
+        agent = self._open.get(('agent', tool_context.invocation_id, tool_context.agent_name))
+        span = self.start(tool.name, 'tool', parent=agent, args_bytes=_size(args))
+        self._push(('tool', tool_context.function_call_id or id(tool_context)), span)
+        return None
+
+    async def after_tool(self, tool, args, tool_context, tool_response):
+        span = self._pop(('tool', tool_context.function_call_id or id(tool_context)))
+        if span is None:
+            return None
+        response_bytes = _size(tool_response)
+        self._payload_bytes(tool.name, 'args').observe(span.attributes['args_bytes'])
+        self._payload_bytes(tool.name, 'response').observe(response_bytes)
+        status = tool_response.get('status') if isinstance(tool_response, dict) else None
+        # ~4 bytes per token is the usual estimate for what the response adds to the next prompt
+        self.end(span, response_bytes=response_bytes, approx_tokens=response_bytes // 4, status=status)
+        return None
+
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = registry.prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve_prometheus(port, host='0.0.0.0'):
+    """Serves the metrics registry for Prometheus to scrape, from a daemon thread."""
+    server = http.server.ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
+
+
+tracer = Tracer(os.environ.get('TRACE_FILE'))
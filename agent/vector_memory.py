@@ -0,0 +1,371 @@
+"""
+Local memory service: conversation events embedded into an on-disk vector store, searched by
+cosine similarity, plus a preload tool that reuses a session's results until memory changes.
+
+Layout of the store directory (MEMORY_DIR, default `.memory`):
+  memories.jsonl   one JSON object per memory (scope, author, timestamp, text)
+  vectors.f32      the memories' embeddings, float32 rows in the same order
+Both files are append-only; a write torn by a crash is dropped on load.
+
+Each app/user scope is searched on its own. Small scopes are scanned exactly with one matrix
+product; from IVF_MIN_ROWS memories a scope gets an IVF index (spherical k-means centroids,
+NPROBE lists probed per query), retrained when the scope has doubled.
+
+Embeddings are hashed word and character-trigram features, so nothing has to be downloaded
+and Swedish inflections and compounds still overlap; pass `embed=` for a real model.
+
+    MEMORY_BACKEND=vector MEMORY_DIR=.memory adk web
+"""
+import asyncio
+import datetime
+import functools
+import json
+import os
+import re
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+from google.adk.memory.base_memory_service import BaseMemoryService, SearchMemoryResponse
+from google.adk.memory.memory_entry import MemoryEntry
+from google.adk.tools.preload_memory_tool import PreloadMemoryTool
+from google.genai import types
+
+from .lazy import Lazy
+from .metrics import registry
+
+DIM = 256
+TOP_K = 5
+# Cosine similarity below which a memory is not considered related to the query
+MIN_SCORE = 0.15
+IVF_MIN_ROWS = 4096
+NPROBE = 8
+KMEANS_ITERATIONS = 8
+KMEANS_SAMPLE = 20_000
+
+_WORD = re.compile(r'\w+')
+
+
+@functools.lru_cache(maxsize=200_000)
+def _feature(token):
+    h = zlib.crc32(token.encode('utf-8'))
+    return h % DIM, (1.0 if h & 0x80000000 else -1.0)
+
+
+def hashing_embed(texts):
+    """Unit vectors of signed, hashed words and (at half weight) character trigrams."""
+    vectors = np.zeros((len(texts), DIM), dtype=np.float32)
+    for i, text in enumerate(texts):
+        row = vectors[i]
+        for word in _WORD.findall(text.casefold()):
+            index, sign = _feature(word)
+            row[index] += sign
+            padded = f' {word} '
+            for j in range(len(padded) - 2):
+                index, sign = _feature(padded[j:j + 3])
+                row[index] += 0.5 * sign
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _kmeans(vectors, k, iterations=KMEANS_ITERATIONS, seed=0):
+    """Spherical k-means on unit vectors; returns unit centroids."""
+    rng = np.random.default_rng(seed)
+    if len(vectors) > KMEANS_SAMPLE:
+        vectors = vectors[rng.choice(len(vectors), KMEANS_SAMPLE, replace=False)]
+    centroids = vectors[rng.choice(len(vectors), k, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        empty = ~sums.any(axis=1)
+        sums[empty] = centroids[empty]
+        centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+    return centroids
+
+
+class _Scope:
+    """One app/user's memories: row numbers and vectors, with an IVF index once large enough."""
+    __slots__ = ('rows', 'vectors', 'count', 'centroids', 'lists', 'trained_at', 'training', 'version')
+
+    def __init__(self, dim):
+        self.rows = np.empty(64, dtype=np.int64)
+        self.vectors = np.empty((64, dim), dtype=np.float32)
+        self.count = 0
+        self.centroids = None
+        self.lists = None  # per centroid, positions in this scope
+        self.trained_at = 0
+        self.training = False
+        self.version = 0
+
+    def add(self, rows, vectors):
+        end = self.count + len(rows)
+        if end > len(self.rows):
+            size = max(end, 2 * len(self.rows))
+            self.rows = np.resize(self.rows, size)
+            grown = np.empty((size, self.vectors.shape[1]), dtype=np.float32)
+            grown[:self.count] = self.vectors[:self.count]
+            self.vectors = grown
+        self.rows[self.count:end] = rows
+        self.vectors[self.count:end] = vectors
+        if self.centroids is not None:
+            for position, nearest in zip(range(self.count, end), np.argmax(vectors @ self.centroids.T, axis=1)):
+                self.lists[nearest].append(position)
+        self.count = end
+        self.version += 1
+
+    def needs_training(self):
+        return not self.training and self.count >= IVF_MIN_ROWS and self.count >= 2 * self.trained_at
+
+    def train(self, lock):
+        """Builds the IVF lists from a snapshot without holding `lock`, then installs them under it."""
+        with lock:
+            self.training = True
+            count, vectors = self.count, self.vectors[:self.count]
+        try:
+            centroids = _kmeans(vectors, int(np.sqrt(count)))
+            assignment = np.argmax(vectors @ centroids.T, axis=1)
+            order = np.argsort(assignment, kind='stable')
+            bounds = np.searchsorted(assignment[order], np.arange(len(centroids) + 1))
+            lists = [order[bounds[i]:bounds[i + 1]].tolist() for i in range(len(centroids))]
+            with lock:
+                # Memories added while training
+                for position in range(count, self.count):
+                    lists[int(np.argmax(centroids @ self.vectors[position]))].append(position)
+                self.centroids, self.lists, self.trained_at = centroids, lists, count
+        finally:
+            self.training = False
+
+    def search(self, query, k, nprobe=NPROBE):
+        """(row numbers, scores) of the best `k` matches, best first."""
+        if self.centroids is None:
+            candidates = None
+            scores = self.vectors[:self.count] @ query
+        else:
+            probe = np.argsort(-(self.centroids @ query))[:nprobe]
+            candidates = np.fromiter((p for i in probe for p in self.lists[i]), dtype=np.int64)
+            scores = self.vectors[candidates] @ query
+        if len(scores) > k:
+            best = np.argpartition(-scores, k)[:k]
+        else:
+            best = np.arange(len(scores))
+        best = best[np.argsort(-scores[best])]
+        positions = best if candidates is None else candidates[best]
+        return self.rows[positions], scores[best]
+
+
+class VectorMemoryService(BaseMemoryService):
+    """Memory service over a local vector store; one instance per directory (see `open_store`)."""
+
+    def __init__(self, path='.memory', embed=None, top_k=TOP_K, min_score=MIN_SCORE):
+        self.path = path
+        self.embed = embed or hashing_embed
+        self.top_k = top_k
+        self.min_score = min_score
+        self._entries = []
+        self._scopes = {}
+        self._seen = set()  # event ids already stored, so re-adding a session adds nothing twice
+        self._dim = None
+        self._lock = threading.Lock()
+        self.search_latency = registry.histogram('vector_memory_search_seconds', 'Local memory search latency.')
+        os.makedirs(path, exist_ok=True)
+        self._load()
+
+    @property
+    def _meta_path(self):
+        return os.path.join(self.path, 'memories.jsonl')
+
+    @property
+    def _vectors_path(self):
+        return os.path.join(self.path, 'vectors.f32')
+
+    def _load(self):
+        entries, ends = [], [0]
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        break
+                    ends.append(ends[-1] + len(line))
+        if not entries:
+            return
+        self._dim = entries[0]['dim']
+        if len(self.embed(['dim'])[0]) != self._dim:
+            raise ValueError(f"{self.path} holds {self._dim}-dimensional vectors; the embedder makes a different size.")
+        vectors = np.fromfile(self._vectors_path, dtype=np.float32) if os.path.exists(self._vectors_path) else np.empty(0)
+        vectors = vectors[:len(vectors) // self._dim * self._dim].reshape(-1, self._dim)
+        count = min(len(entries), len(vectors))
+        # Cut both files back to the last complete write, so later appends stay aligned
+        if os.path.getsize(self._meta_path) != ends[count]:
+            os.truncate(self._meta_path, ends[count])
+        if os.path.exists(self._vectors_path) and os.path.getsize(self._vectors_path) != count * self._dim * 4:
+            os.truncate(self._vectors_path, count * self._dim * 4)
+        self._entries = entries[:count]
+        self._index(self._entries, vectors[:count], 0)
+        for scope in self._scopes.values():
+            if scope.needs_training():
+                scope.train(self._lock)
+
+    def _index(self, entries, vectors, first_row):
+        by_scope = {}
+        for i, entry in enumerate(entries):
+            by_scope.setdefault((entry['app_name'], entry['user_id']), []).append(i)
+            if entry.get('event_id'):
+                self._seen.add(entry['event_id'])
+        for key, positions in by_scope.items():
+            scope = self._scopes.get(key)
+            if scope is None:
+                scope = self._scopes[key] = _Scope(vectors.shape[1])
+            scope.add(np.asarray(positions) + first_row, vectors[positions])
+
+    def version(self, app_name, user_id):
+        """Changes whenever memories are added for the user."""
+        scope = self._scopes.get((app_name, user_id))
+        return scope.version if scope is not None else 0
+
+    # ------------------------------------------------------------------
+    # BaseMemoryService
+    # ------------------------------------------------------------------
+    async def add_session_to_memory(self, session):
+        await asyncio.to_thread(self._append, session.app_name, session.user_id, session.events, session.id)
+
+    async def add_events_to_memory(self, *, app_name, user_id, events, session_id=None, custom_metadata=None):
+        await asyncio.to_thread(self._append, app_name, user_id, events, session_id)
+
+    async def search_memory(self, *, app_name, user_id, query):
+        start = time.perf_counter()
+        memories = []
+        scope = self._scopes.get((app_name, user_id))
+        if scope is not None and query.strip():
+            vector = self.embed([query])[0]
+            with self._lock:
+                rows, scores = scope.search(vector, self.top_k)
+                entries = [self._entries[row] for row, score in zip(rows, scores) if score >= self.min_score]
+            memories = [MemoryEntry(id=e['id'], author=e.get('author'), timestamp=e.get('timestamp'),
+                                    content=types.Content(role=e.get('role') or 'user', parts=[types.Part(text=e['text'])]))
+                        for e in entries]
+        self.search_latency.observe(time.perf_counter() - start)
+        return SearchMemoryResponse(memories=memories)
+
+    def _append(self, app_name, user_id, events, session_id):
+        entries = []
+        for event in events:
+            if event.id in self._seen or not event.content or not event.content.parts:
+                continue
+            text = ' '.join(part.text for part in event.content.parts if part.text).strip()
+            if not text:
+                continue
+            entries.append({
+                'id': uuid.uuid4().hex,
+                'app_name': app_name,
+                'user_id': user_id,
+                'session_id': session_id,
+                'event_id': event.id,
+                'author': event.author,
+                'role': event.content.role,
+                'timestamp': datetime.datetime.fromtimestamp(event.timestamp).isoformat() if event.timestamp else None,
+                'text': text,
+            })
+        if not entries:
+            return
+        vectors = np.ascontiguousarray(self.embed([e['text'] for e in entries]), dtype=np.float32)
+        with self._lock:
+            if self._dim is None:
+                self._dim = vectors.shape[1]
+            for entry in entries:
+                entry['dim'] = self._dim
+            # Vectors first: on load, metadata without a vector is dropped
+            with open(self._vectors_path, 'ab') as f:
+                f.write(vectors.tobytes())
+            with open(self._meta_path, 'a', encoding='utf-8') as f:
+                f.writelines(json.dumps(e, ensure_ascii=False) + '\n' for e in entries)
+            first_row = len(self._entries)
+            self._entries.extend(entries)
+            self._index(entries, vectors, first_row)
+            scope = self._scopes[(app_name, user_id)]
+        # On the writer's thread and outside the lock, so searches never wait for k-means
+        if scope.needs_training():
+            scope.train(self._lock)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def open_store(path='.memory', **kwargs):
+    """The process's VectorMemoryService for `path`, so writers and readers share one index."""
+    key = os.path.abspath(path)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = VectorMemoryService(path, **kwargs)
+        return _stores[key]
+
+
+class _CachedSearch:
+    """A tool context whose `search_memory` goes through the session cache."""
+
+    def __init__(self, tool_context, search_memory):
+        self._tool_context = tool_context
+        self.search_memory = search_memory
+
+    def __getattr__(self, name):
+        return getattr(self._tool_context, name)
+
+
+class CachedPreloadMemoryTool(PreloadMemoryTool):
+    """PreloadMemoryTool that reuses a session's search results until the user's memories change.
+
+    Preload runs before every model request, i.e. several times per turn with the same query.
+    With a VectorMemoryService behind `service` (instance or Lazy) results are cached per
+    session and query, keyed on the store's version for the user; with any other service the
+    tool behaves exactly like PreloadMemoryTool and searches the runner's memory service.
+    """
+
+    def __init__(self, service, max_sessions=10_000, queries_per_session=8):
+        super().__init__()
+        self.service = service
+        self.max_sessions = max_sessions
+        self.queries_per_session = queries_per_session
+        self._cache = OrderedDict()  # session id -> OrderedDict(query -> (version, response))
+        self.hits = registry.counter('memory_preload_hits_total', 'Memory preloads answered from the session cache.')
+        self.misses = registry.counter('memory_preload_misses_total', 'Memory preloads that searched the store.')
+
+    async def _store(self):
+        try:
+            service = await self.service.aget() if isinstance(self.service, Lazy) else self.service
+        except Exception:
+            return None
+        return service if isinstance(service, VectorMemoryService) else None
+
+    async def process_llm_request(self, *, tool_context, llm_request):
+        store = await self._store()
+        if store is None:
+            return await super().process_llm_request(tool_context=tool_context, llm_request=llm_request)
+        session = tool_context.session
+
+        async def search_memory(query):
+            version = store.version(session.app_name, session.user_id)
+            queries = self._cache.get(session.id)
+            if queries is not None and queries.get(query, (None,))[0] == version:
+                self.hits.inc()
+                self._cache.move_to_end(session.id)
+                return queries[query][1]
+            self.misses.inc()
+            response = await store.search_memory(app_name=session.app_name, user_id=session.user_id, query=query)
+            if queries is None:
+                queries = self._cache[session.id] = OrderedDict()
+                while len(self._cache) > self.max_sessions:
+                    self._cache.popitem(last=False)
+            queries[query] = (version, response)
+            while len(queries) > self.queries_per_session:
+                queries.popitem(last=False)
+            return response
+
+        await super().process_llm_request(tool_context=_CachedSearch(tool_context, search_memory), llm_request=llm_request)
@@ -0,0 +1,183 @@
+"""
+Benchmark: the alert work queue under concurrent consumers.
+
+Loads `--alerts` synthetic NY alerts for the generated users into the local DuckDB backend and
+lets K consumer threads drain the queue the way `agent/batch_triage.py` does: `claim-alerts`
+a batch, "investigate" each alert for `--work-ms`, then `complete-alert`. For each K it
+reports throughput, scaling efficiency against one consumer, claim latency, and how many
+alerts were handed to more than one consumer (must be 0).
+
+A second run checks lease expiry: one consumer claims a batch and dies without closing it;
+the others must pick those alerts up once the lease runs out and still close every alert once.
+
+    python benchmarks/bench_alert_queue.py --alerts 1000 --work-ms 20 --consumers 1,2,4,8,16
+"""
+import argparse
+import collections
+import datetime
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'mcp_server'))
+
+from local_server import LocalBackend  # noqa: E402
+
+
+def synthetic_alerts(data_dir, alerts, seed=0):
+    rng = np.random.default_rng(seed)
+    users = pd.read_csv(os.path.join(data_dir, 'users.csv'), usecols=['user_id'])['user_id'].to_numpy()
+    pd.DataFrame({
+        'alert_id': [f'A-{i:08X}' for i in range(alerts)],
+        'user_id': users[rng.integers(len(users), size=alerts)],
+        'trigger_reason': 'Snabb rörelse: Pengar överförda omedelbart efter mottagande',
+        'status': 'NY',
+        'created_at': pd.Timestamp(datetime.datetime(2025, 12, 1)) - pd.to_timedelta(rng.integers(0, 30 * 86400, alerts), unit='s'),
+        'severity': rng.choice(['HÖG', 'MEDEL', 'LÅG'], alerts, p=[0.2, 0.5, 0.3]),
+    }).to_csv(os.path.join(data_dir, 'alerts.csv'), index=False)
+
+
+class Consumer(threading.Thread):
+    def __init__(self, backend, name, claim_size, work, lease_seconds, log, die_after_claim=False):
+        super().__init__(name=name)
+        self.backend = backend
+        self.claim_size = claim_size
+        self.work = work
+        self.lease_seconds = lease_seconds
+        self.log = log
+        self.die_after_claim = die_after_claim
+        self.claim_seconds = []
+        self.lost = 0
+
+    def claim(self):
+        claim_id = uuid.uuid4().hex
+        start = time.perf_counter()
+        batch = self.backend.run('claim-alerts', {'worker_id': self.name, 'claim_id': claim_id,
+                                                  'batch_size': self.claim_size, 'lease_seconds': self.lease_seconds})
+        self.claim_seconds.append(time.perf_counter() - start)
+        self.log.extend((self.name, alert['alert_id']) for alert in batch)
+        return claim_id, batch
+
+    def run(self):
+        while True:
+            claim_id, batch = self.claim()
+            if not batch or self.die_after_claim:
+                return
+            for alert in batch:
+                time.sleep(self.work)
+                if not self.backend.run('complete-alert', {'alert_id': alert['alert_id'], 'claim_id': claim_id,
+                                                           'status': 'STÄNGD'}):
+                    self.lost += 1
+
+
+def drain(backend, consumers, claim_size, work, lease_seconds, crashed=0, wait_for_leases=False):
+    log = []
+    threads = [Consumer(backend, f'crashed-{i}', claim_size, work, lease_seconds, log, die_after_claim=True)
+               for i in range(crashed)]
+    for thread in threads:
+        thread.run()
+    start = time.perf_counter()
+    while True:
+        workers = [Consumer(backend, f'worker-{i}', claim_size, work, lease_seconds, log) for i in range(consumers)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        threads += workers
+        # The crashed consumers' alerts only come back once their leases expire
+        open_alerts = backend.run('prioritize-alerts', {})[0]['open_alerts']
+        if not (wait_for_leases and open_alerts):
+            break
+        time.sleep(0.2)
+    elapsed = time.perf_counter() - start
+    return elapsed, log, threads
+
+
+def queue_state(backend):
+    cursor = backend.con.cursor()
+    try:
+        rows = cursor.execute("SELECT status, attempts, COUNT(*) FROM aml_dataset.alerts GROUP BY ALL ORDER BY ALL").fetchall()
+    finally:
+        cursor.close()
+    return {f'{status}/attempts={attempts}': count for status, attempts, count in rows}
+
+
+def percentile(samples, q):
+    return round(1000 * float(np.percentile(samples, q)), 3) if samples else None
+
+
+def main(args):
+    tmp = tempfile.mkdtemp(dir=args.tmp_dir)
+    try:
+        for table in ('users', 'transactions'):
+            shutil.copy(os.path.join(args.data_dir, f'{table}.csv'), tmp)
+        synthetic_alerts(tmp, args.alerts)
+        backend = LocalBackend(tmp)
+        results = {'alerts': args.alerts, 'work_ms': args.work_ms, 'claim_size': args.claim_size, 'runs': []}
+        base = None
+        for consumers in [int(c) for c in args.consumers.split(',')]:
+            backend.reload()
+            elapsed, log, threads = drain(backend, consumers, args.claim_size, args.work_ms / 1000, args.lease_seconds)
+            handed_out = collections.Counter(alert_id for _, alert_id in log)
+            claims = [s for thread in threads for s in thread.claim_seconds]
+            throughput = len(handed_out) / elapsed
+            base = base or throughput / consumers
+            run = {
+                'consumers': consumers,
+                'elapsed_s': round(elapsed, 2),
+                'alerts_per_s': round(throughput, 1),
+                'scaling_efficiency': round(throughput / (consumers * base), 3),
+                'claim_p50_ms': percentile(claims, 50),
+                'claim_p99_ms': percentile(claims, 99),
+                'handed_out_twice': sum(1 for count in handed_out.values() if count > 1),
+                'closed': queue_state(backend).get('STÄNGD/attempts=1', 0),
+            }
+            results['runs'].append(run)
+            print('  '.join(f"{k}={v}" for k, v in run.items()))
+
+        # Lease expiry: a consumer dies holding a claim; the rest recover its alerts after the lease
+        backend.reload()
+        lease = args.crash_lease_seconds
+        elapsed, log, threads = drain(backend, args.crash_consumers, args.claim_size, args.work_ms / 1000, lease,
+                                      crashed=1, wait_for_leases=True)
+        abandoned = {alert_id for name, alert_id in log if name.startswith('crashed')}
+        recovered = {alert_id for name, alert_id in log if name.startswith('worker') and alert_id in abandoned}
+        state = queue_state(backend)
+        results['lease_expiry'] = {
+            'lease_s': lease,
+            'abandoned': len(abandoned),
+            'recovered': len(recovered),
+            'elapsed_s': round(elapsed, 2),
+            'queue': state,
+            'all_closed': set(state) <= {'STÄNGD/attempts=1', 'STÄNGD/attempts=2'},
+        }
+        print(f"lease expiry: {json.dumps(results['lease_expiry'], ensure_ascii=False)}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data-dir', default=os.path.join(ROOT, 'data'), help="Directory with users.csv and transactions.csv.")
+    parser.add_argument('--alerts', type=int, default=1000)
+    parser.add_argument('--work-ms', type=float, default=20.0, help="Simulated investigation time per alert.")
+    parser.add_argument('--consumers', default='1,2,4,8,16')
+    parser.add_argument('--claim-size', type=int, default=4)
+    parser.add_argument('--lease-seconds', type=int, default=900)
+    parser.add_argument('--crash-consumers', type=int, default=4, help="Consumers left after one dies (lease expiry run).")
+    parser.add_argument('--crash-lease-seconds', type=int, default=2)
+    parser.add_argument('--tmp-dir', default=None)
+    parser.add_argument('--json', default=None, help="Write results as JSON to this path.")
+    main(parser.parse_args())
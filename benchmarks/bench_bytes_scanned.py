@@ -0,0 +1,205 @@
+"""
+Benchmark: bytes each tool reads from a flat Parquet export vs. the partitioned, clustered layout.
+
+Generates a synthetic dataset (transactions spread over `--days` days), writes it once as
+one unsorted Parquet file per table ("flat") and once with `data/export_parquet.py`
+("layout"), then runs the translated tools.yaml statements for sampled users and alerts,
+with and without a time window. Reads go through a counting fsspec filesystem, so the
+numbers are the bytes DuckDB actually fetched, footers included.
+
+On a 3M-transaction, 90-day run the 30-day window reads roughly a third of the history from
+the layout and nearly all of it from the flat file. Tools that match `sender_id = x OR
+receiver_id = x` only prune on the sender half of the clustering.
+
+    python benchmarks/bench_bytes_scanned.py --transactions 3000000 --days 90 --window-days 30
+"""
+import argparse
+import datetime
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+
+import duckdb
+import numpy as np
+import pandas as pd
+from fsspec.implementations.local import LocalFileSystem
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'mcp_server'))
+sys.path.insert(0, os.path.join(ROOT, 'data'))
+
+from export_parquet import export  # noqa: E402
+from local_server import DATASET, TABLES, create_parquet_views, load_tools, translate_sql  # noqa: E402
+
+# Tools measured, and the sampled key they take
+TOOLS = {
+    'get-user-details': 'user_id',
+    'get-recent-transactions': 'user_id',
+    'analyze-counterparties': 'user_id',
+    'trace-money-flow': 'user_id',
+    'get-alert-details': 'alert_id',
+    'list-new-alerts': None,
+}
+
+
+class CountingFS(LocalFileSystem):
+    """Local filesystem under the `counted://` protocol that totals the bytes read through it."""
+    protocol = 'counted'
+    bytes_read = 0
+
+    @classmethod
+    def _strip_protocol(cls, path):
+        path = str(path)
+        if path.startswith('counted://'):
+            path = path[len('counted://'):]
+        return super()._strip_protocol(path)
+
+    def _open(self, path, mode='rb', **kwargs):
+        f = super()._open(path, mode, **kwargs)
+        read = f.read
+
+        def counted_read(*args):
+            data = read(*args)
+            CountingFS.bytes_read += len(data)
+            return data
+        f.read = counted_read
+        return f
+
+
+def synthetic_data(data_dir, users, transactions, alerts, days, seed):
+    rng = np.random.default_rng(seed)
+    end = datetime.datetime(2025, 12, 1)
+    user_ids = np.array([f'U-{i:08X}' for i in range(users)], dtype=object)
+    income, risk = rng.integers(200_000, 2_000_000, users), rng.random(users)
+    pd.DataFrame({
+        'user_id': user_ids,
+        'name': [f'Person {i}' for i in range(users)],
+        'occupation': 'Konsult',
+        'email': [f'p{i}@example.org' for i in range(users)],
+        'phone': '070-000 00 00',
+        'address': 'Storgatan 1, 11122 Stockholm',
+        'annual_income': income,
+        'risk_score': risk,
+        'joined_date': (end - pd.to_timedelta(rng.integers(0, 3650, users), unit='D')).date,
+        'is_pep': rng.random(users) < 0.01,
+    }).sample(frac=1, random_state=seed).to_csv(os.path.join(data_dir, 'users.csv'), index=False)
+    seconds = rng.integers(0, days * 86400, transactions)
+    pd.DataFrame({
+        'txn_id': [f'TX-{i:012X}' for i in range(transactions)],
+        'sender_id': user_ids[rng.integers(users, size=transactions)],
+        'receiver_id': user_ids[rng.integers(users, size=transactions)],
+        'amount': np.round(rng.lognormal(8, 1.2, transactions), 2),
+        'currency': 'SEK',
+        'timestamp': pd.Timestamp(end) - pd.to_timedelta(seconds, unit='s'),
+        'txn_type': 'TRANSFER',
+    }).to_csv(os.path.join(data_dir, 'transactions.csv'), index=False)
+    created = pd.Timestamp(end) - pd.to_timedelta(rng.integers(0, days * 86400, alerts), unit='s')
+    alert_users = rng.integers(users, size=alerts)
+    status = rng.choice(['NY', 'STÄNGD', 'UTREDS'], alerts, p=[0.2, 0.7, 0.1])
+    severity = rng.choice(['HÖG', 'MEDEL', 'LÅG'], alerts)
+    pd.DataFrame({
+        'alert_id': [f'A-{i:08X}' for i in range(alerts)],
+        'user_id': user_ids[alert_users],
+        'trigger_reason': 'Snabb rörelse: Pengar överförda omedelbart efter mottagande',
+        'status': status,
+        'created_at': created,
+        'severity': severity,
+        # As set by the prioritize-alerts tool
+        'priority': np.select([severity == 'HÖG', severity == 'MEDEL'], [20, 10], 0) + risk[alert_users],
+    }).to_csv(os.path.join(data_dir, 'alerts.csv'), index=False)
+    return end
+
+
+def export_flat(data_dir, output_dir, row_group_size):
+    """One file per table in CSV (arrival) order: row-group statistics span the whole table."""
+    os.makedirs(output_dir, exist_ok=True)
+    con = duckdb.connect()
+    for table in TABLES:
+        source = os.path.join(data_dir, f'{table}.csv')
+        target = os.path.join(output_dir, f'{table}.parquet')
+        con.execute(f"COPY (SELECT * FROM read_csv_auto('{source}', header = true)) TO '{target}' "
+                    f"(FORMAT parquet, COMPRESSION zstd, ROW_GROUP_SIZE {row_group_size})")
+
+
+def connect(layout, parquet_dir):
+    con = duckdb.connect()
+    con.register_filesystem(CountingFS())
+    con.execute(f'CREATE SCHEMA {DATASET}')
+    if layout == 'layout':
+        create_parquet_views(con, f'counted://{parquet_dir}')
+    else:
+        for table in TABLES:
+            con.execute(f"CREATE VIEW {DATASET}.{table} AS SELECT * FROM read_parquet('counted://{parquet_dir}/{table}.parquet')")
+    # Every query reads from the files rather than from DuckDB's cache of earlier reads
+    con.execute('SET enable_external_file_cache = false')
+    return con
+
+
+def measure(con, statement, params):
+    CountingFS.bytes_read = 0
+    con.execute(statement, params).fetchall()
+    return CountingFS.bytes_read
+
+
+def main(args):
+    tmp = tempfile.mkdtemp(dir=args.tmp_dir)
+    try:
+        data_dir = os.path.join(tmp, 'csv')
+        os.makedirs(data_dir)
+        end = synthetic_data(data_dir, args.users, args.transactions, args.alerts, args.days, args.seed)
+        export_flat(data_dir, os.path.join(tmp, 'flat'), args.row_group_size)
+        export(data_dir, os.path.join(tmp, 'layout'), args.row_group_size)
+        tools = load_tools()
+        rng = np.random.default_rng(args.seed)
+        sample = {
+            'user_id': pd.read_csv(os.path.join(data_dir, 'transactions.csv'), usecols=['sender_id'])
+            ['sender_id'].sample(args.queries, random_state=args.seed).tolist(),
+            'alert_id': [f'A-{i:08X}' for i in rng.integers(args.alerts, size=args.queries)],
+        }
+        window = {'start_date': (end - datetime.timedelta(days=args.window_days)).date().isoformat(),
+                  'end_date': end.date().isoformat()}
+        results = []
+        for layout in ('flat', 'layout'):
+            con = connect(layout, os.path.join(tmp, layout))
+            for tool, key in TOOLS.items():
+                statement = translate_sql(tools[tool]['statement'])
+                names = set(p['name'] for p in tools[tool].get('parameters') or [])
+                for windowed in (False, True):
+                    if windowed and 'start_date' not in names:
+                        continue
+                    scanned = []
+                    for i in range(args.queries):
+                        params = {key: sample[key][i]} if key else {'page_size': 20, 'after_priority': 1e6, 'after_alert_id': ''}
+                        if 'start_date' in names:
+                            params.update(window if windowed else {'start_date': '1970-01-01', 'end_date': '9999-12-31'})
+                        scanned.append(measure(con, statement, params))
+                    result = {'layout': layout, 'tool': tool, 'window_days': args.window_days if windowed else None,
+                              'mean_bytes': round(statistics.mean(scanned)), 'max_bytes': max(scanned)}
+                    results.append(result)
+                    label = f"{tool}{f' ({args.window_days}d)' if windowed else ''}"
+                    print(f"{layout:>6}  {label:<32} mean={result['mean_bytes'] / 1e6:>9.2f} MB  "
+                          f"max={result['max_bytes'] / 1e6:>9.2f} MB")
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(results, f, indent=2)
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--transactions', type=int, default=3_000_000)
+    parser.add_argument('--alerts', type=int, default=50_000)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--window-days', type=int, default=30)
+    parser.add_argument('--row-group-size', type=int, default=10_000,
+                        help="Small enough that a day of synthetic transactions spans several row groups.")
+    parser.add_argument('--queries', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--tmp-dir', default=None)
+    parser.add_argument('--json', default=None, help="Write results as JSON to this path.")
+    main(parser.parse_args())
@@ -0,0 +1,124 @@
+"""
+Benchmark: prompt size of raw vs. compact tool results, and what it costs the model turn.
+
+Runs `trace-money-flow`, `analyze-counterparties` and `get-recent-transactions` for every
+alerted user on the local DuckDB backend, wraps the rows the way MCPTool hands them to the
+agent, and compares the raw response with `ResultCompactor` output: approximate tokens
+(4 characters each), the tokens an investigation adds to the history, and the CPU time of
+the encoding.
+
+With `--live` (needs Gemini credentials, as for the agent) each result is also sent to the
+model as a function response: `count_tokens` gives the exact prompt tokens, and a streamed
+answer gives time to first token and total latency, raw vs. compact.
+
+    python benchmarks/bench_compact_results.py --data-dir data --budget 1500
+    python benchmarks/bench_compact_results.py --live --users 5 --model gemini-2.5-flash
+"""
+import argparse
+import csv
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'mcp_server'))
+
+from agent.compact_results import ResultCompactor, approx_tokens  # noqa: E402
+from local_server import LocalBackend  # noqa: E402
+
+TOOLS = ['trace-money-flow', 'analyze-counterparties', 'get-recent-transactions']
+PROMPT = "Investigate user {user_id}: summarize where the money came from and where it went."
+
+
+def mcp_response(rows):
+    """The dict MCPTool returns to the agent for the local server's single text content."""
+    return {'content': [{'type': 'text', 'text': json.dumps(rows, ensure_ascii=False)}], 'isError': False}
+
+
+def live_turn(client, model, tool, args, response):
+    from google.genai import types
+    contents = [
+        types.Content(role='user', parts=[types.Part.from_text(text=PROMPT.format(**args))]),
+        types.Content(role='model', parts=[types.Part.from_function_call(name=tool, args=args)]),
+        types.Content(role='user', parts=[types.Part.from_function_response(name=tool, response=response)]),
+    ]
+    tokens = client.models.count_tokens(model=model, contents=contents).total_tokens
+    start = time.perf_counter()
+    first = None
+    for _ in client.models.generate_content_stream(model=model, contents=contents):
+        if first is None:
+            first = time.perf_counter() - start
+    return tokens, first, time.perf_counter() - start
+
+
+def main(args):
+    backend = LocalBackend(args.data_dir)
+    compactor = ResultCompactor(token_budget=args.budget)
+    with open(os.path.join(args.data_dir, 'alerts.csv'), newline='') as f:
+        users = list(dict.fromkeys(row['user_id'] for row in csv.DictReader(f)))[:args.users]
+    client = None
+    if args.live:
+        from google import genai
+        client = genai.Client()
+
+    stats = {tool: {'raw': [], 'compact': [], 'encode_ms': [], 'live': []} for tool in TOOLS}
+    per_user = []
+    for user_id in users:
+        params = {'user_id': user_id}
+        raw_total = compact_total = 0
+        for tool in TOOLS:
+            response = mcp_response(backend.run(tool, params))
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                compact = compactor.compact(tool, json.loads(response['content'][0]['text']), params)
+            stats[tool]['encode_ms'].append((time.perf_counter() - start) / args.repeat * 1000)
+            raw, small = approx_tokens(response), approx_tokens(compact)
+            stats[tool]['raw'].append(raw)
+            stats[tool]['compact'].append(small)
+            raw_total += raw
+            compact_total += small
+            if client is not None:
+                stats[tool]['live'].append((live_turn(client, args.model, tool, params, response),
+                                            live_turn(client, args.model, tool, params, compact)))
+        per_user.append((raw_total, compact_total))
+
+    results = {'users': len(users), 'budget': args.budget, 'tools': {}}
+    for tool, s in stats.items():
+        result = {
+            'raw_tokens': round(statistics.mean(s['raw'])),
+            'compact_tokens': round(statistics.mean(s['compact'])),
+            'ratio': round(sum(s['raw']) / max(1, sum(s['compact'])), 2),
+            'encode_ms': round(statistics.mean(s['encode_ms']), 3),
+        }
+        if s['live']:
+            for i, stage in enumerate(('raw', 'compact')):
+                turns = [turn[i] for turn in s['live']]
+                result[f'{stage}_prompt_tokens'] = round(statistics.mean(t[0] for t in turns))
+                result[f'{stage}_ttft_ms'] = round(statistics.median(t[1] for t in turns if t[1] is not None) * 1000)
+                result[f'{stage}_latency_ms'] = round(statistics.median(t[2] for t in turns) * 1000)
+        results['tools'][tool] = result
+        print(f"{tool:<26} " + '  '.join(f"{k}={v}" for k, v in result.items()))
+    # The results stay in the history and are re-sent with every later turn of the investigation
+    raw, small = zip(*per_user)
+    results['investigation_raw_tokens'] = round(statistics.mean(raw))
+    results['investigation_compact_tokens'] = round(statistics.mean(small))
+    print(f"{'per investigation':<26} raw_tokens={results['investigation_raw_tokens']}  "
+          f"compact_tokens={results['investigation_compact_tokens']}  ({len(users)} users)")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data-dir', default=os.path.join(ROOT, 'data'))
+    parser.add_argument('--users', type=int, default=100, help="Alerted users to run the tools for.")
+    parser.add_argument('--budget', type=int, default=1500, help="Token budget per compact result.")
+    parser.add_argument('--repeat', type=int, default=20, help="Encodings per result when timing.")
+    parser.add_argument('--live', action='store_true', help="Also measure prompt tokens and latency on Gemini.")
+    parser.add_argument('--model', default='gemini-2.5-flash')
+    parser.add_argument('--json', default=None, help="Write results as JSON to this path.")
+    main(parser.parse_args())
@@ -0,0 +1,99 @@
+"""
+Benchmark: `search-user-by-name` lookups from the trigram name index vs the LIKE scan.
+
+Generates synthetic Swedish names (Faker sv_SE first and last names, some double-barrelled),
+builds the index, and times lookups for full names, surnames, partial names and
+accent-free spellings. The LIKE query is the tools.yaml statement, run on DuckDB.
+
+    python benchmarks/bench_name_index.py --users 1000000 10000000
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import duckdb
+import numpy as np
+import pandas as pd
+from faker import Faker
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'mcp_server'))
+
+from name_index import NameIndex, fold  # noqa: E402
+
+LIKE_SQL = "SELECT user_id, name FROM users WHERE LOWER(name) LIKE LOWER(CONCAT('%', $name, '%')) LIMIT 5"
+
+
+def synthetic_users(count, seed):
+    fake = Faker('sv_SE')
+    fake.seed_instance(seed)
+    firsts = sorted({fake.first_name() for _ in range(3000)})
+    lasts = sorted({fake.last_name() for _ in range(3000)})
+    rng = np.random.default_rng(seed)
+    first = np.array(firsts, dtype=object)[rng.integers(len(firsts), size=count)]
+    last = np.array(lasts, dtype=object)[rng.integers(len(lasts), size=count)]
+    double = np.array(lasts, dtype=object)[rng.integers(len(lasts), size=count)]
+    names = first + ' ' + np.where(rng.random(count) < 0.1, last + '-' + double, last)
+    return pd.DataFrame({'user_id': [f'U-{i:08X}' for i in range(count)], 'name': names})
+
+
+def queries(users, count, seed):
+    sample = users['name'].sample(count, random_state=seed).tolist()
+    return {
+        'full name': sample,
+        'surname': [n.split()[-1] for n in sample],
+        'partial': [n.split()[0][:4] + ' ' + n.split()[-1][:5] for n in sample],
+        'unaccented': [fold(n) for n in sample],
+    }
+
+
+def timed(fn, items):
+    latencies = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        'p50_us': round(statistics.median(latencies) * 1e6, 1),
+        'p99_us': round(latencies[int(0.99 * (len(latencies) - 1))] * 1e6, 1),
+    }
+
+
+def main(args):
+    results = []
+    for count in args.users:
+        users = synthetic_users(count, args.seed)
+        start = time.perf_counter()
+        index = NameIndex.from_frame(users)
+        build = time.perf_counter() - start
+        path = os.path.join(args.tmp_dir, 'bench.names')
+        index.save(path)
+        index = NameIndex.load(path)
+        con = duckdb.connect()
+        con.register('users_frame', users)
+        con.execute('CREATE TABLE users AS SELECT * FROM users_frame')
+        for kind, items in queries(users, args.queries, args.seed).items():
+            result = {'users': count, 'query': kind, 'build_s': round(build, 1),
+                      'index': timed(index.search, items),
+                      'like': timed(lambda q: con.execute(LIKE_SQL, {'name': q}).fetchall(), items[:args.like_queries])}
+            results.append(result)
+            print(f"users={count:>10,} {kind:>10}  index p50={result['index']['p50_us']:>8.1f} us "
+                  f"p99={result['index']['p99_us']:>8.1f} us   LIKE p50={result['like']['p50_us']:>10.1f} us")
+        os.remove(path)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--like-queries', type=int, default=50, help="LIKE scans are slow; time fewer of them.")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--tmp-dir', default='.')
+    parser.add_argument('--json', default=None, help="Write results as JSON to this path.")
+    main(parser.parse_args())
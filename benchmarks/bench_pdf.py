@@ -0,0 +1,95 @@
+"""
+Benchmark: SAR PDF render latency against narrative length and concurrency.
+
+Compares rendering inline on the event loop (the old behaviour of create_pdf_file) with the
+worker pool in agent/pdf_renderer.py, and reports how long the event loop was stalled.
+
+    python benchmarks/bench_pdf.py --lengths 1000 5000 20000 80000 --concurrency 1 4 16
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from agent.pdf_renderer import PdfRenderer, generate_valid_pdf_bytes  # noqa: E402
+
+PARAGRAPH = ("The subject received 10 cash deposits between 80 000 and 95 000 SEK over eleven days, "
+             "each just under the reporting threshold, and forwarded the total to a single beneficiary. ")
+
+
+def narrative(length):
+    return (PARAGRAPH * (length // len(PARAGRAPH) + 1))[:length]
+
+
+async def _heartbeat(stalls, interval=0.005):
+    """Records how late a short sleep wakes up: a direct measure of event loop blocking."""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        stalls.append(time.perf_counter() - start - interval)
+
+
+async def run_case(mode, renderer, text, concurrency, repeats):
+    latencies, stalls = [], []
+    heartbeat = asyncio.create_task(_heartbeat(stalls))
+
+    async def one():
+        start = time.perf_counter()
+        if mode == 'inline':
+            generate_valid_pdf_bytes(text)
+        else:
+            await renderer.render(text)
+        latencies.append(time.perf_counter() - start)
+
+    wall = time.perf_counter()
+    for _ in range(repeats):
+        await asyncio.gather(*(one() for _ in range(concurrency)))
+    wall = time.perf_counter() - wall
+    heartbeat.cancel()
+    latencies.sort()
+    return {
+        'mode': mode,
+        'chars': len(text),
+        'concurrency': concurrency,
+        'p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'p95_ms': round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 2),
+        'renders_per_s': round(len(latencies) / wall, 1),
+        'max_loop_stall_ms': round(max(stalls, default=0) * 1000, 2),
+    }
+
+
+async def main(args):
+    renderer = PdfRenderer(workers=args.workers, kind=args.executor)
+    for future in renderer.warm_up():
+        future.result()
+    generate_valid_pdf_bytes("warm-up")
+    results = []
+    for length in args.lengths:
+        text = narrative(length)
+        for concurrency in args.concurrency:
+            for mode in ('inline', 'pool'):
+                result = await run_case(mode, renderer, text, concurrency, args.repeats)
+                results.append(result)
+                print(f"{mode:>6} chars={length:>7} conc={concurrency:>3}  p50={result['p50_ms']:>8.2f} ms  "
+                      f"p95={result['p95_ms']:>8.2f} ms  {result['renders_per_s']:>7.1f}/s  "
+                      f"max loop stall={result['max_loop_stall_ms']:>8.2f} ms")
+    renderer.shutdown()
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lengths', type=int, nargs='+', default=[1000, 5000, 20000, 80000])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--executor', choices=['process', 'thread'], default='process')
+    parser.add_argument('--json', default=None, help="Write results as JSON to this path.")
+    asyncio.run(main(parser.parse_args()))
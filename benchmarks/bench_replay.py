@@ -0,0 +1,350 @@
+"""
+Benchmark: end-to-end replay of investigation conversations through `root_agent` and `sar_agent`.
+
+Runs the real agents (callbacks, tool cache, result compaction, memory preload and writer,
+PDF rendering, artifacts) with every external service replaced:
+
+  * the model is scripted: each turn of a recorded conversation (`benchmarks/replays/*.json`)
+    lists the function calls and answers the model gave, and `--model-ms` adds a fixed
+    latency per model call;
+  * the MCP tools run on the local DuckDB server (`mcp_server/local_server.py`) over
+    `data/*.csv`, or over a dataset of `--users`/`--transactions` generated for the run;
+  * memory is the simulated Memory Bank (`--memory local`) or the local vector store
+    (`--memory vector`), and email is an in-process stand-in for the Application
+    Integration tool.
+
+Conversations are replayed `--concurrency` at a time over alerts sampled from the dataset.
+The report has per-tool, per-model-call, per-turn and end-to-end percentiles, the agent's own
+overhead per turn (turn time minus model time) and throughput. `--json` writes it for
+tracking over time; `--compare` checks it against an earlier report and exits non-zero when a
+p50 or p99 got more than `--tolerance` slower.
+
+    python benchmarks/bench_replay.py --conversations 200 --concurrency 16 --json replay.json
+    python benchmarks/bench_replay.py --users 20000 --transactions 2000000 --model-ms 800 --compare replay.json
+"""
+import argparse
+import asyncio
+import collections
+import contextvars
+import csv
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+DEFAULT_REPLAYS = os.path.join(ROOT, 'benchmarks', 'replays', 'investigations.json')
+APP_NAME = 'bench_replay'
+
+# The turn being replayed in the current task; ADK's tasks for the turn inherit it
+_turn = contextvars.ContextVar('replay_turn')
+
+
+class Turn:
+    """Script cursor and timings of one replayed turn."""
+
+    def __init__(self, steps):
+        self.steps = iter(steps)
+        self.model_seconds = 0.0
+        self.unscripted = 0
+
+
+def fill(value, fields):
+    if isinstance(value, str):
+        return value.format(**fields)
+    if isinstance(value, dict):
+        return {k: fill(v, fields) for k, v in value.items()}
+    if isinstance(value, list):
+        return [fill(v, fields) for v in value]
+    return value
+
+
+def percentiles(samples):
+    if not samples:
+        return {'count': 0}
+    ms = np.asarray(samples) * 1000
+    return {'count': len(samples), 'p50_ms': round(float(np.percentile(ms, 50)), 2),
+            'p95_ms': round(float(np.percentile(ms, 95)), 2), 'p99_ms': round(float(np.percentile(ms, 99)), 2),
+            'mean_ms': round(float(ms.mean()), 2)}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, server, timeout=600):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("MCP server exited during start-up")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"MCP server did not start on port {port}")
+
+
+def sample_subjects(data_dir, n, seed):
+    """(alert_id, user_id, user_name) of `n` alerts, drawn with replacement."""
+    with open(os.path.join(data_dir, 'users.csv'), newline='') as f:
+        names = {row['user_id']: row['name'] for row in csv.DictReader(f)}
+    with open(os.path.join(data_dir, 'alerts.csv'), newline='') as f:
+        alerts = [(row['alert_id'], row['user_id']) for row in csv.DictReader(f) if row['user_id'] in names]
+    rng = random.Random(seed)
+    return [{'alert_id': a, 'user_id': u, 'user_name': names[u]} for a, u in (rng.choice(alerts) for _ in range(n))]
+
+
+def build(args, tmp):
+    """Imports the agents with their services swapped for local stand-ins; returns (runner, probe, outbox)."""
+    sys.path.insert(0, ROOT)
+    from google.adk.models.base_llm import BaseLlm
+    from google.adk.models.llm_response import LlmResponse
+    from google.adk.plugins.base_plugin import BasePlugin
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+    from google.adk.tools import FunctionTool
+    from google.genai import types
+
+    from agent import agent as agent_module
+    from agent.disk_artifact_service import DiskArtifactService
+    from agent.token_cache import token_cache
+
+    class ReplayLlm(BaseLlm):
+        """Answers each request with the next scripted step of the current turn."""
+        model: str = 'replay'
+        delay: float = 0.0
+
+        async def generate_content_async(self, llm_request, stream=False):
+            turn = _turn.get()
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            step = next(turn.steps, None)
+            if step is None:
+                turn.unscripted += 1
+                step = {'text': '(end of recording)'}
+            if 'text' in step:
+                parts = [types.Part(text=step['text'])]
+            else:
+                parts = [types.Part(function_call=types.FunctionCall(name=call['name'], args=call['args']))
+                         for call in step['calls']]
+            yield LlmResponse(content=types.Content(role='model', parts=parts))
+
+    class Probe(BasePlugin):
+        """Times every tool and model call of the run."""
+
+        def __init__(self):
+            super().__init__(name='replay_probe')
+            self.tools = collections.defaultdict(list)
+            self.tool_errors = collections.Counter()
+            self.model = []
+            self._started = {}
+
+        async def before_model_callback(self, *, callback_context, llm_request):
+            self._started[('model', callback_context.invocation_id)] = time.perf_counter()
+
+        async def after_model_callback(self, *, callback_context, llm_response):
+            start = self._started.pop(('model', callback_context.invocation_id), None)
+            if start is not None:
+                elapsed = time.perf_counter() - start
+                self.model.append(elapsed)
+                _turn.get().model_seconds += elapsed
+
+        async def before_tool_callback(self, *, tool, tool_args, tool_context):
+            self._started[('tool', tool_context.function_call_id)] = time.perf_counter()
+
+        async def after_tool_callback(self, *, tool, tool_args, tool_context, result):
+            start = self._started.pop(('tool', tool_context.function_call_id), None)
+            if start is not None:
+                self.tools[tool.name].append(time.perf_counter() - start)
+            if isinstance(result, dict) and (result.get('isError') or result.get('status') == 'error'):
+                self.tool_errors[tool.name] += 1
+
+    outbox = []
+
+    async def send_email(to: str, subject: str, body: str) -> dict:
+        """Sends an email (in-process stand-in for the Application Integration sendEmail tool)."""
+        if args.email_ms:
+            await asyncio.sleep(args.email_ms / 1000)
+        outbox.append({'to': to, 'subject': subject, 'body': body})
+        return {'status': 'success', 'message': f"Email sent to {to}."}
+
+    model = ReplayLlm(delay=args.model_ms / 1000)
+    agent_module.root_agent.model = model
+    agent_module.sar_agent.model = model
+    agent_module.sar_agent.tools = [FunctionTool(send_email) if tool is agent_module.integration_tool else tool
+                                    for tool in agent_module.sar_agent.tools]
+    # The local MCP server does not check the bearer token
+    token_cache.prime('local')
+    if not args.tool_cache:
+        agent_module.tool_cache.ttls = {}
+    memory_service = agent_module.memory_bank_service.get()
+    if args.memory == 'local':
+        memory_service.base_latency = args.memory_write_ms / 1000
+        memory_service.per_event_latency = 0.0
+    runner = Runner(app_name=APP_NAME, agent=agent_module.root_agent, session_service=InMemorySessionService(),
+                    memory_service=memory_service,
+                    artifact_service=DiskArtifactService(root=os.path.join(tmp, 'artifacts')),
+                    plugins=[Probe()])
+    return runner, runner.plugin_manager.plugins[0], outbox, agent_module
+
+
+async def replay(args, runner, conversations, subjects):
+    from google.genai import types
+
+    rng = random.Random(args.seed)
+    plan = rng.choices(conversations, weights=[c.get('weight', 1) for c in conversations], k=args.conversations)
+    turns = collections.defaultdict(list)
+    overhead = collections.defaultdict(list)
+    end_to_end = collections.defaultdict(list)
+    unscripted = 0
+    slots = asyncio.Semaphore(args.concurrency)
+
+    async def run_conversation(i, conversation, fields):
+        nonlocal unscripted
+        async with slots:
+            user_id = f'analyst-{i % args.analysts}'
+            session = await runner.session_service.create_session(app_name=APP_NAME, user_id=user_id)
+            start = time.perf_counter()
+            for spec in conversation['turns']:
+                turn = Turn(fill(spec['steps'], fields))
+                _turn.set(turn)
+                message = types.Content(role='user', parts=[types.Part(text=fill(spec['user'], fields))])
+                turn_start = time.perf_counter()
+                async for _ in runner.run_async(user_id=user_id, session_id=session.id, new_message=message):
+                    pass
+                elapsed = time.perf_counter() - turn_start
+                key = f"{conversation['name']}/{spec['name']}"
+                turns[key].append(elapsed)
+                overhead[key].append(elapsed - turn.model_seconds)
+                unscripted += turn.unscripted + sum(1 for _ in turn.steps)
+            end_to_end[conversation['name']].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run_conversation(i, c, subjects[i]) for i, c in enumerate(plan)))
+    return time.perf_counter() - start, turns, overhead, end_to_end, unscripted
+
+
+def compare(results, baseline_path, tolerance):
+    """Latency metrics that got more than `tolerance` slower than in the baseline report."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    regressions = []
+    for section in ('tools', 'turns', 'turn_overhead', 'end_to_end'):
+        for name, now in results[section].items():
+            before = baseline.get(section, {}).get(name)
+            if not before:
+                continue
+            for key in ('p50_ms', 'p99_ms'):
+                if key in now and before.get(key) and now[key] > before[key] * (1 + tolerance):
+                    regressions.append(f"{section}/{name} {key}: {before[key]} -> {now[key]}")
+    return regressions
+
+
+def main(args):
+    with open(args.replays) as f:
+        conversations = json.load(f)['conversations']
+    tmp = tempfile.mkdtemp(prefix='bench_replay_')
+    server = None
+    try:
+        data_dir = args.data_dir
+        if args.users:
+            data_dir = os.path.join(tmp, 'data')
+            os.makedirs(data_dir)
+            subprocess.run([sys.executable, os.path.join(ROOT, 'data', 'generate_data.py'), '--bulk', '--users', str(args.users),
+                            '--transactions', str(args.transactions), '--seed', str(args.seed), '--output-dir', data_dir],
+                           check=True, stdout=subprocess.DEVNULL)
+        port = free_port()
+        server = subprocess.Popen([sys.executable, os.path.join(ROOT, 'mcp_server', 'local_server.py'), '--data-dir', data_dir,
+                                   '--port', str(port)] + args.server_args.split(),
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        wait_for_port(port, server)
+
+        os.environ.update({
+            'MCP_URL': f'http://127.0.0.1:{port}/mcp',
+            'MEMORY_BACKEND': args.memory,
+            'MEMORY_DIR': os.path.join(tmp, 'memory'),
+            # Only local services are warmed up; the token is primed and email is stood in for
+            'WARM_UP': 'pdf,mcp,memory',
+            # No metadata server offline: skip ADK's mTLS probe of it
+            'NO_GCE_CHECK': 'true',
+        })
+        runner, probe, outbox, agent_module = build(args, tmp)
+        subjects = sample_subjects(data_dir, args.conversations, args.seed)
+
+        async def run():
+            result = await replay(args, runner, conversations, subjects)
+            await agent_module.memory_writer.close()
+            return result
+        elapsed, turns, overhead, end_to_end, unscripted = asyncio.run(run())
+    finally:
+        if server is not None:
+            server.terminate()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    from agent.metrics import registry
+    counters = {name: registry.counter(name, '').value for name in ('tool_cache_hits_total', 'tool_cache_misses_total')}
+    total_turns = sum(len(samples) for samples in turns.values())
+    results = {
+        'config': {k: v for k, v in vars(args).items() if k not in ('compare', 'json')},
+        'elapsed_s': round(elapsed, 2),
+        'conversations_per_s': round(args.conversations / elapsed, 2),
+        'turns_per_s': round(total_turns / elapsed, 2),
+        'tools': {name: dict(percentiles(samples), errors=probe.tool_errors[name]) for name, samples in sorted(probe.tools.items())},
+        'model': percentiles(probe.model),
+        'turns': {name: percentiles(samples) for name, samples in sorted(turns.items())},
+        'turn_overhead': {name: percentiles(samples) for name, samples in sorted(overhead.items())},
+        'end_to_end': {name: percentiles(samples) for name, samples in sorted(end_to_end.items())},
+        'unscripted_steps': unscripted,
+        'emails_sent': len(outbox),
+        'tool_cache': counters,
+    }
+
+    print(f"{args.conversations} conversations ({total_turns} turns) in {elapsed:.1f}s at concurrency {args.concurrency}: "
+          f"{results['conversations_per_s']} conversations/s, {results['turns_per_s']} turns/s")
+    for section in ('tools', 'turns', 'turn_overhead', 'end_to_end'):
+        print(f"\n{section}")
+        for name, stats in results[section].items():
+            print(f"  {name:<32} " + '  '.join(f"{k}={v}" for k, v in stats.items()))
+    print(f"\nmodel calls  " + '  '.join(f"{k}={v}" for k, v in results['model'].items()))
+    if unscripted:
+        print(f"warning: {unscripted} model calls or steps did not match the recordings")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for regression in regressions:
+            print(f"regression: {regression}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--replays', default=DEFAULT_REPLAYS, help="Recorded conversations (JSON).")
+    parser.add_argument('--conversations', type=int, default=100, help="Conversations to replay.")
+    parser.add_argument('--concurrency', type=int, default=8, help="Conversations in flight at once.")
+    parser.add_argument('--analysts', type=int, default=10, help="Distinct users the conversations are spread over.")
+    parser.add_argument('--data-dir', default=os.path.join(ROOT, 'data'))
+    parser.add_argument('--users', type=int, default=None, help="Generate a dataset of this many users instead of --data-dir.")
+    parser.add_argument('--transactions', type=int, default=100_000, help="Background transactions of the generated dataset.")
+    parser.add_argument('--server-args', default='', help="Extra local_server.py arguments, e.g. '--graph-index /tmp/g'.")
+    parser.add_argument('--model-ms', type=float, default=0.0, help="Simulated latency of each model call.")
+    parser.add_argument('--memory', choices=['local', 'vector'], default='local', help="Memory stand-in.")
+    parser.add_argument('--memory-write-ms', type=float, default=50.0, help="Simulated Memory Bank write latency (--memory local).")
+    parser.add_argument('--email-ms', type=float, default=0.0, help="Simulated latency of sending an email.")
+    parser.add_argument('--no-tool-cache', dest='tool_cache', action='store_false', help="Disable the tool result cache.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', default=None, help="Write results as JSON to this path.")
+    parser.add_argument('--compare', default=None, help="Earlier --json report to check for regressions.")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed slowdown of a p50/p99 against --compare.")
+    main(parser.parse_args())
@@ -0,0 +1,145 @@
+"""
+Benchmark: cold-start cost of the agent, as import time and time to the first response.
+
+Each run is a fresh interpreter that imports `agent.agent`, optionally waits `--idle`
+seconds (the server starting, the user typing), then runs the greeting turn of
+`root_agent` on an InMemoryRunner. The model is replaced by a stub that answers at once,
+so the turn measures what the agent itself does first: listing the MCP tools (against a
+local server started here), the memory preload and callbacks. Runs alternate between
+WARM_UP=0 and WARM_UP=all.
+
+`--max-import-seconds` makes the script exit non-zero when the median import time of
+either mode is above it, to catch start-up regressions in CI.
+
+    python benchmarks/bench_startup.py --runs 5 --idle 1 --max-import-seconds 2.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+async def first_response(root_agent):
+    from google.adk.models.base_llm import BaseLlm
+    from google.adk.models.llm_response import LlmResponse
+    from google.adk.runners import InMemoryRunner
+    from google.genai import types
+
+    class ImmediateLlm(BaseLlm):
+        model: str = 'immediate'
+
+        async def generate_content_async(self, llm_request, stream=False):
+            tools = (llm_request.config.tools or [None])[0]
+            declared = len(tools.function_declarations or []) if tools else 0
+            yield LlmResponse(content=types.Content(role='model', parts=[types.Part(text=f"Hi! ({declared} tools)")]))
+
+    root_agent.model = ImmediateLlm()
+    runner = InMemoryRunner(agent=root_agent, app_name='bench_startup')
+    session = await runner.session_service.create_session(app_name='bench_startup', user_id='bench')
+    message = types.Content(role='user', parts=[types.Part(text='Hej')])
+    start = time.perf_counter()
+    text = None
+    async for event in runner.run_async(user_id='bench', session_id=session.id, new_message=message):
+        if event.content and event.content.parts and event.content.parts[0].text:
+            text = event.content.parts[0].text
+            break
+    return time.perf_counter() - start, text
+
+
+def child(idle):
+    start = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    from agent.agent import root_agent
+    imported = time.perf_counter() - start
+    time.sleep(idle)
+    seconds, text = asyncio.run(first_response(root_agent))
+    print(json.dumps({'import_s': imported, 'first_response_s': seconds, 'response': text}))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"MCP server did not start on port {port}")
+
+
+def main(args):
+    server = None
+    env = dict(os.environ, MEMORY_BACKEND=os.environ.get('MEMORY_BACKEND', 'local'))
+    # Without credentials, ADK's MCP session probes the GCE metadata server for mTLS and waits
+    # out its timeout; a deployed instance answers at once, so skip the probe offline
+    env.setdefault('NO_GCE_CHECK', 'true')
+    if not args.mcp_url:
+        port = free_port()
+        server = subprocess.Popen([sys.executable, os.path.join(ROOT, 'mcp_server', 'local_server.py'), '--port', str(port)],
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        wait_for_port(port)
+        args.mcp_url = f'http://127.0.0.1:{port}/mcp'
+    env['MCP_URL'] = args.mcp_url
+    runs = {'0': [], 'all': []}
+    try:
+        for _ in range(args.runs):
+            for mode in runs:
+                out = subprocess.run([sys.executable, '-W', 'ignore', os.path.abspath(__file__), '--child', '--idle', str(args.idle)],
+                                     env=dict(env, WARM_UP=mode), capture_output=True, text=True, timeout=300)
+                lines = [line for line in out.stdout.splitlines() if line.startswith('{')]
+                if out.returncode or not lines:
+                    raise RuntimeError(f"Run failed (WARM_UP={mode}):\n{out.stderr[-2000:]}")
+                runs[mode].append(json.loads(lines[-1]))
+    finally:
+        if server is not None:
+            server.terminate()
+
+    results = {'runs': args.runs, 'idle_s': args.idle, 'modes': {}}
+    failed = False
+    for mode, samples in runs.items():
+        imports = [s['import_s'] for s in samples]
+        firsts = [s['first_response_s'] for s in samples]
+        result = {
+            'import_median_s': round(statistics.median(imports), 3),
+            'import_max_s': round(max(imports), 3),
+            'first_response_median_s': round(statistics.median(firsts), 3),
+            'first_response_max_s': round(max(firsts), 3),
+            'response': samples[-1]['response'],
+        }
+        results['modes'][f'WARM_UP={mode}'] = result
+        print(f"WARM_UP={mode:<4} " + '  '.join(f"{k}={v}" for k, v in result.items()))
+        if args.max_import_seconds and result['import_median_s'] > args.max_import_seconds:
+            print(f"  import time over the {args.max_import_seconds}s limit")
+            failed = True
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help="Fresh processes per mode.")
+    parser.add_argument('--idle', type=float, default=1.0, help="Seconds between import and the first request.")
+    parser.add_argument('--mcp-url', default=None, help="Use this MCP server instead of starting the local one.")
+    parser.add_argument('--max-import-seconds', type=float, default=None)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--json', default=None, help="Write results as JSON to this path.")
+    args = parser.parse_args()
+    if args.child:
+        child(args.idle)
+    else:
+        main(args)
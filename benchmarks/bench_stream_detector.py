@@ -0,0 +1,90 @@
+"""
+Benchmark: throughput of the streaming structuring / rapid-movement detector on one core.
+
+Generates a time-ordered synthetic stream of background transfers (100-50,000 SEK, as in
+`generate_data.py`) with injected smurfs (deposits of 80-95k SEK over ten days) and mules
+(a 150-250k SEK wire forwarded at 95% two hours later), feeds it through
+`StreamDetector.process`, and reports events per second, the injected accounts found and
+false alerts. Decoding the input is excluded; `process` gets Python values.
+
+    python benchmarks/bench_stream_detector.py --transactions 5000000 --users 1000000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data'))
+
+from stream_detector import StreamDetector  # noqa: E402
+
+START = 1_750_000_000.0
+
+
+def synthetic_stream(transactions, users, days, smurfs, mules, seed):
+    rng = np.random.default_rng(seed)
+    ids = np.array([f'U-{i:08X}' for i in range(users)], dtype=object)
+    sender = rng.integers(users, size=transactions)
+    receiver = (sender + rng.integers(1, users, transactions)) % users
+    columns = [ids[sender], ids[receiver], rng.uniform(100, 50_000, transactions).round(2),
+               START + rng.uniform(0, days * 86400, transactions)]
+    injected = rng.choice(users, smurfs + mules, replace=False)
+    extra = []
+    for account in ids[injected[:smurfs]]:
+        first = START + rng.uniform(0, (days - 10) * 86400)
+        extra += [('EXTERNAL_DEPOSIT', account, rng.uniform(80_000, 95_000), first + rng.uniform(0, 10 * 86400))
+                  for _ in range(10)]
+    for account in ids[injected[smurfs:]]:
+        amount, at = rng.uniform(150_000, 250_000), START + rng.uniform(0, days * 86400 - 7200)
+        extra += [('EXTERNAL_WIRE', account, amount, at), (account, 'EXTERNAL_CONTROLLER', amount * 0.95, at + 7200)]
+    columns = [np.concatenate([column, np.array(values, dtype=column.dtype)]) for column, values in zip(columns, zip(*extra))]
+    order = np.argsort(columns[3], kind='stable')
+    return [column[order].tolist() for column in columns], set(ids[injected[:smurfs]]), set(ids[injected[smurfs:]])
+
+
+def main(args):
+    stream, smurfs, mules = synthetic_stream(args.transactions, args.users, args.days, args.smurfs, args.mules, args.seed)
+    detector = StreamDetector()
+    process = detector.process
+    peak_state = 0
+    start = time.perf_counter()
+    for i, (sender, receiver, amount, ts) in enumerate(zip(*stream)):
+        process(sender, receiver, amount, ts)
+        if not i & 0xFFFF:
+            peak_state = max(peak_state, detector.state_size())
+    elapsed = time.perf_counter() - start
+    found = {}
+    for alert in detector.alerts:
+        found.setdefault(alert['trigger_reason'].split(':')[0], set()).add(alert['user_id'])
+    structuring, rapid = found.get('Strukturering', set()), found.get('Snabb rörelse', set())
+    result = {
+        'events': len(stream[0]),
+        'seconds': round(elapsed, 2),
+        'events_per_second': round(len(stream[0]) / elapsed),
+        'us_per_event': round(elapsed / len(stream[0]) * 1e6, 2),
+        'peak_window_entries': peak_state,
+        'structuring_found': f"{len(structuring & smurfs)}/{len(smurfs)}",
+        'structuring_false': len(structuring - smurfs),
+        'rapid_found': f"{len(rapid & mules)}/{len(mules)}",
+        'rapid_false': len(rapid - mules),
+    }
+    for key, value in result.items():
+        print(f"{key:>22}: {value}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--transactions', type=int, default=2_000_000)
+    parser.add_argument('--users', type=int, default=200_000)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--smurfs', type=int, default=100)
+    parser.add_argument('--mules', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', default=None, help="Write results as JSON to this path.")
+    main(parser.parse_args())
@@ -0,0 +1,162 @@
+"""
+Benchmark: local vector memory search, and what the session cache saves the memory preload.
+
+Fills a fresh VectorMemoryService with `--memories` synthetic investigation notes for one
+analyst (built from the generated users and alerts), then measures:
+
+  * search latency p50/p99 through `search_memory` (IVF once the scope is large enough) vs.
+    an exact scan of the same vectors, and recall@k of the returned rows against the exact top k;
+  * the memory preload before a model request: PreloadMemoryTool over ADK's
+    InMemoryMemoryService (keyword matching over every memory), PreloadMemoryTool over the
+    vector store, and CachedPreloadMemoryTool on repeated requests of a turn.
+
+    python benchmarks/bench_vector_memory.py --memories 20000 --queries 300 --json vector_memory.json
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from google.adk.events.event import Event  # noqa: E402
+from google.adk.memory import InMemoryMemoryService  # noqa: E402
+from google.adk.models.llm_request import LlmRequest  # noqa: E402
+from google.adk.tools.preload_memory_tool import PreloadMemoryTool  # noqa: E402
+from google.genai import types  # noqa: E402
+
+from agent.vector_memory import CachedPreloadMemoryTool, VectorMemoryService  # noqa: E402
+
+APP, USER = 'bench_vector_memory', 'analyst'
+OUTCOMES = ['stängt som falsk positiv', 'eskalerat till SAR', 'väntar på kundkontakt',
+            'kopplat till mulring', 'stängt efter verifierad lönebetalning']
+
+
+def notes(data_dir, n, seed=0):
+    rng = random.Random(seed)
+    with open(os.path.join(data_dir, 'users.csv'), newline='') as f:
+        users = list(csv.DictReader(f))
+    with open(os.path.join(data_dir, 'alerts.csv'), newline='') as f:
+        reasons = sorted({row['trigger_reason'] for row in csv.DictReader(f)})
+    for _ in range(n):
+        user = rng.choice(users)
+        yield (f"Utredning av {user['name']} ({user['user_id']}, {user['occupation']}): "
+               f"{rng.choice(reasons)}. {rng.randint(9, 490) * 1000} kr, {rng.choice(OUTCOMES)}.")
+
+
+def event(text):
+    return Event(author='aml_agent', invocation_id='bench', timestamp=time.time(),
+                 content=types.Content(role='model', parts=[types.Part(text=text)]))
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return {'p50_ms': round(1000 * samples[len(samples) // 2], 3),
+            'p99_ms': round(1000 * samples[min(len(samples) - 1, int(len(samples) * 0.99))], 3),
+            'mean_ms': round(1000 * statistics.fmean(samples), 3)}
+
+
+async def timed(call, repeat=1):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await call()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def main(args):
+    texts = list(notes(args.data_dir, args.memories))
+    rng = random.Random(1)
+    # Queries as an analyst would type them: a name or user id plus a few words of the note
+    queries = []
+    for text in rng.sample(texts, args.queries):
+        words = text.replace(',', '').replace(':', '').split()
+        queries.append(' '.join(words[2:4] + rng.sample(words[4:], 3)))
+
+    path = tempfile.mkdtemp(prefix='vector_memory_')
+    try:
+        store = VectorMemoryService(path)
+        baseline = InMemoryMemoryService()
+        start = time.perf_counter()
+        for i in range(0, len(texts), 1000):
+            batch = [event(text) for text in texts[i:i + 1000]]
+            await store.add_events_to_memory(app_name=APP, user_id=USER, events=batch)
+            await baseline.add_events_to_memory(app_name=APP, user_id=USER, events=batch)
+        load = time.perf_counter() - start
+        scope = store._scopes[(APP, USER)]
+        print(f"{len(texts)} memories loaded in {load:.1f}s, "
+              f"{'IVF with ' + str(len(scope.centroids)) + ' lists' if scope.centroids is not None else 'exact scan'}")
+
+        search, exact, hits = [], [], 0
+        for query in queries:
+            search += await timed(lambda: store.search_memory(app_name=APP, user_id=USER, query=query))
+            vector = store.embed([query])[0]
+            start = time.perf_counter()
+            scores = scope.vectors[:scope.count] @ vector
+            top = scope.rows[np.argpartition(-scores, args.k)[:args.k]]
+            exact.append(time.perf_counter() - start)
+            rows, _ = scope.search(vector, args.k)
+            hits += len(set(rows.tolist()) & set(top.tolist()))
+        results = {
+            'memories': len(texts), 'queries': len(queries), 'load_s': round(load, 2),
+            'ivf_lists': len(scope.centroids) if scope.centroids is not None else 0,
+            'search_memory': percentiles(search),
+            'exact_scan': percentiles(exact),
+            f'recall_at_{args.k}': round(hits / (args.k * len(queries)), 3),
+        }
+
+        session = SimpleNamespace(id='s1', app_name=APP, user_id=USER)
+        stock, cached = PreloadMemoryTool(), CachedPreloadMemoryTool(store)
+
+        def preload(tool, query, service):
+            context = SimpleNamespace(session=session, user_content=types.Content(role='user', parts=[types.Part(text=query)]),
+                                      search_memory=lambda q: service.search_memory(app_name=APP, user_id=USER, query=q))
+            return lambda: tool.process_llm_request(tool_context=context, llm_request=LlmRequest())
+
+        preloads = {'keyword_in_memory': [], 'vector': [], 'vector_cached_first': [], 'vector_cached_repeat': []}
+        for query in queries[:args.preload_queries]:
+            preloads['keyword_in_memory'] += await timed(preload(stock, query, baseline))
+            preloads['vector'] += await timed(preload(stock, query, store), args.requests_per_turn)
+            preloads['vector_cached_first'] += await timed(preload(cached, query, store))
+            preloads['vector_cached_repeat'] += await timed(preload(cached, query, store), args.requests_per_turn - 1)
+        results['preload'] = {name: percentiles(samples) for name, samples in preloads.items()}
+        results['preload']['cache_hit_rate'] = round(cached.hits.value / (cached.hits.value + cached.misses.value), 3)
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+    for name in ('search_memory', 'exact_scan'):
+        print(f"{name:<22} " + '  '.join(f"{k}={v}" for k, v in results[name].items()))
+    print(f"recall@{args.k}: {results[f'recall_at_{args.k}']}")
+    for name, value in results['preload'].items():
+        if isinstance(value, dict):
+            value = '  '.join(f"{k}={v}" for k, v in value.items())
+        print(f"preload {name:<22} {value}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data-dir', default=os.path.join(ROOT, 'data'))
+    parser.add_argument('--memories', type=int, default=20_000)
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--preload-queries', type=int, default=30,
+                        help="Turns to preload for (the keyword baseline is slow on large stores).")
+    parser.add_argument('--requests-per-turn', type=int, default=4,
+                        help="Model requests per turn, i.e. preloads with the same query.")
+    parser.add_argument('--json', default=None, help="Write results as JSON to this path.")
+    asyncio.run(main(parser.parse_args()))
@@ -1,5 +1,9 @@
+import argparse
 import csv
+import multiprocessing
+import os
 import random
+import secrets
 import uuid
 from datetime import datetime, timedelta
 import faker
@@ -7,7 +11,7 @@ import faker
 # Use Swedish locale for names and addresses
 fake = faker.Faker('sv_SE')
 
-# Configuration
+# Configuration (defaults, overridable from the command line)
 NUM_USERS = 100
 NUM_TRANSACTIONS = 1000
 START_DATE = datetime.now() - timedelta(days=90)
@@ -32,6 +36,10 @@ users = []
 transactions = []
 alerts = []
 
+def new_uuid():
+    """uuid4-shaped identifier drawn from the seeded `random` module so runs are reproducible."""
+    return uuid.UUID(int=random.getrandbits(128), version=4)
+
 def generate_users():
     print("Generating Users...")
     pep_count = 0
@@ -50,7 +58,7 @@ def generate_users():
                 pep_count += 1
         
         user = {
-            'user_id': f"U-{uuid.uuid4().hex[:8].upper()}",
+            'user_id': f"U-{new_uuid().hex[:8].upper()}",
             'name': fake.name(),
             'occupation': occupation,
             'email': fake.email(),
@@ -76,7 +84,7 @@ def generate_transactions():
         txn_date = START_DATE + timedelta(days=random.randint(0, 90))
         
         txn = {
-            'txn_id': f"TX-{uuid.uuid4().hex[:12].upper()}",
+            'txn_id': f"TX-{new_uuid().hex[:12].upper()}",
             'sender_id': sender['user_id'],
             'receiver_id': receiver['user_id'],
             'amount': amount,
@@ -106,7 +114,7 @@ def inject_smurfing_pattern():
         txn_date = START_DATE + timedelta(days=random.randint(60, 70))
         
         txn = {
-            'txn_id': f"TX-SMURF-IN-{uuid.uuid4().hex[:8].upper()}",
+            'txn_id': f"TX-SMURF-IN-{new_uuid().hex[:8].upper()}",
             'sender_id': 'EXTERNAL_DEPOSIT', # Simulating cash deposit
             'receiver_id': smurf['user_id'],
             'amount': amount,
@@ -118,7 +126,7 @@ def inject_smurfing_pattern():
         
     # 1 large transfer out
     txn_out = {
-        'txn_id': f"TX-SMURF-OUT-{uuid.uuid4().hex[:8].upper()}",
+        'txn_id': f"TX-SMURF-OUT-{new_uuid().hex[:8].upper()}",
         'sender_id': smurf['user_id'],
         'receiver_id': beneficiary['user_id'],
         'amount': total_amount,
@@ -130,7 +138,7 @@ def inject_smurfing_pattern():
     
     # Create Alert
     alert = {
-        'alert_id': str(uuid.uuid4()),
+        'alert_id': str(new_uuid()),
         'user_id': smurf['user_id'],
         'trigger_reason': 'Strukturering: Flera insättningar strax under rapporteringsgräns',
         'status': 'NY',
@@ -153,7 +161,7 @@ def inject_mule_ring_pattern():
         txn_date = START_DATE + timedelta(days=random.randint(80, 82))
         
         transactions.append({
-            'txn_id': f"TX-MULE-IN-{uuid.uuid4().hex[:8].upper()}",
+            'txn_id': f"TX-MULE-IN-{new_uuid().hex[:8].upper()}",
             'sender_id': 'EXTERNAL_WIRE',
             'receiver_id': mule['user_id'],
             'amount': amount,
@@ -164,7 +172,7 @@ def inject_mule_ring_pattern():
         
         # Mule forwards to controller
         transactions.append({
-            'txn_id': f"TX-MULE-OUT-{uuid.uuid4().hex[:8].upper()}",
+            'txn_id': f"TX-MULE-OUT-{new_uuid().hex[:8].upper()}",
             'sender_id': mule['user_id'],
             'receiver_id': controller['user_id'],
             'amount': amount * 0.95, # Keeps cut
@@ -175,7 +183,7 @@ def inject_mule_ring_pattern():
         
         # Alert on Mule
         alerts.append({
-            'alert_id': str(uuid.uuid4()),
+            'alert_id': str(new_uuid()),
             'user_id': mule['user_id'],
             'trigger_reason': 'Snabb rörelse: Pengar överförda omedelbart efter mottagande',
             'status': 'NY',
@@ -197,7 +205,7 @@ def inject_false_positives():
         txn_date = START_DATE + timedelta(days=random.randint(50, 60))
         
         transactions.append({
-            'txn_id': f"TX-FP-RICH-{uuid.uuid4().hex[:8].upper()}",
+            'txn_id': f"TX-FP-RICH-{new_uuid().hex[:8].upper()}",
             'sender_id': rich_user['user_id'],
             'receiver_id': 'EXTERNAL_MERCHANT_LUXURY_GOODS',
             'amount': amount,
@@ -207,7 +215,7 @@ def inject_false_positives():
         })
         
         alerts.append({
-            'alert_id': str(uuid.uuid4()),
+            'alert_id': str(new_uuid()),
             'user_id': rich_user['user_id'],
             'trigger_reason': 'Högt värde transaktion: Enskild transaktion > 100 000 kr',
             'status': 'NY',
@@ -226,7 +234,7 @@ def inject_false_positives():
         txn_date = START_DATE + timedelta(days=random.randint(40, 50))
         
         transactions.append({
-            'txn_id': f"TX-FP-GEO-{uuid.uuid4().hex[:8].upper()}",
+            'txn_id': f"TX-FP-GEO-{new_uuid().hex[:8].upper()}",
             'sender_id': importer['user_id'],
             'receiver_id': 'EXTERNAL_SUPPLIER_HIGH_RISK_GEO',
             'amount': amount,
@@ -236,7 +244,7 @@ def inject_false_positives():
         })
         
         alerts.append({
-            'alert_id': str(uuid.uuid4()),
+            'alert_id': str(new_uuid()),
             'user_id': importer['user_id'],
             'trigger_reason': 'Geografisk risk: Stor överföring till högriskjurisdiktion',
             'status': 'NY',
@@ -244,28 +252,266 @@ def inject_false_positives():
             'severity': 'HÖG'
         })
 
-def save_to_csv():
+def save_to_csv(output_dir='.'):
     print("Saving to CSV...")
-    with open('users.csv', 'w', newline='') as f:
+    with open(os.path.join(output_dir, 'users.csv'), 'w', newline='') as f:
         writer = csv.DictWriter(f, fieldnames=users[0].keys())
         writer.writeheader()
         writer.writerows(users)
         
-    with open('transactions.csv', 'w', newline='') as f:
+    with open(os.path.join(output_dir, 'transactions.csv'), 'w', newline='') as f:
         writer = csv.DictWriter(f, fieldnames=transactions[0].keys())
         writer.writeheader()
         writer.writerows(transactions)
         
-    with open('alerts.csv', 'w', newline='') as f:
+    with open(os.path.join(output_dir, 'alerts.csv'), 'w', newline='') as f:
         writer = csv.DictWriter(f, fieldnames=alerts[0].keys())
         writer.writeheader()
         writer.writerows(alerts)
 
-if __name__ == "__main__":
-    generate_users()
-    generate_transactions()
+
+# ----------------------------------------------------------------------
+# Bulk mode: NumPy column generation, chunked and streamed to disk
+# ----------------------------------------------------------------------
+USER_FIELDS = ['user_id', 'name', 'occupation', 'email', 'phone', 'address',
+               'annual_income', 'risk_score', 'joined_date', 'is_pep']
+TRANSACTION_FIELDS = ['txn_id', 'sender_id', 'receiver_id', 'amount', 'currency',
+                      'timestamp', 'txn_type']
+ALERT_FIELDS = ['alert_id', 'user_id', 'trigger_reason', 'status', 'created_at', 'severity']
+
+# Size of the Faker value pools that bulk rows are sampled from
+FAKER_POOL_SIZE = 1000
+# Number of random users kept in memory as candidates for the injected scenarios
+SCENARIO_SAMPLE_SIZE = 2000
+
+# Odd multipliers make `(i * m + offset) mod 2**bits` a bijection, so ids never collide
+_USER_ID_MULTIPLIER = 0x9E3779B1
+_TXN_ID_MULTIPLIER = 0x9E3779B97F4B
+
+_bulk = {}
+
+
+def _hex_ids(prefix, values, width):
+    """Formats uint64 values as fixed-width upper-case hex strings with a prefix."""
+    import numpy as np
+    shifts = np.arange(width - 1, -1, -1, dtype=np.uint64) * np.uint64(4)
+    digits = (values[:, None] >> shifts) & np.uint64(0xF)
+    hex_digits = np.frombuffer(b'0123456789ABCDEF', dtype='S1')
+    encoded = np.ascontiguousarray(hex_digits[digits]).view(f'S{width}').ravel()
+    return np.char.add(prefix.encode(), encoded).astype(str)
+
+
+def _user_ids(indices):
+    import numpy as np
+    values = (indices.astype(np.uint64) * np.uint64(_USER_ID_MULTIPLIER)
+              + np.uint64(_bulk['user_id_offset'])) & np.uint64(0xFFFFFFFF)
+    return _hex_ids('U-', values, 8)
+
+
+def _init_bulk_worker(seed, start_date, num_users):
+    """Builds the per-process state shared by every chunk: Faker pools and id offsets."""
+    import numpy as np
+    rng = np.random.default_rng([seed, 0])
+    pool_fake = faker.Faker('sv_SE')
+    pool_fake.seed_instance(seed)
+    _bulk.update({
+        'seed': seed,
+        'start_date': np.datetime64(start_date, 'us'),
+        'num_users': num_users,
+        'user_id_offset': int(rng.integers(0, 2**32)),
+        'txn_id_offset': int(rng.integers(0, 2**48)),
+        'first_names': np.array([pool_fake.first_name() for _ in range(FAKER_POOL_SIZE)]),
+        'last_names': np.array([pool_fake.last_name() for _ in range(FAKER_POOL_SIZE)]),
+        'email_users': np.array([pool_fake.user_name() for _ in range(FAKER_POOL_SIZE)]),
+        'email_domains': np.array([pool_fake.free_email_domain() for _ in range(FAKER_POOL_SIZE)]),
+        'phones': np.array([pool_fake.phone_number() for _ in range(FAKER_POOL_SIZE)]),
+        'addresses': np.array([pool_fake.address().replace('\n', ', ') for _ in range(FAKER_POOL_SIZE)]),
+    })
+
+
+def _generate_user_chunk(chunk_idx, start, stop):
+    """Generates users [start, stop) as a DataFrame. PEP flags are candidates; the cap is applied by the caller."""
+    import numpy as np
+    import pandas as pd
+    rng = np.random.default_rng([_bulk['seed'], 1, chunk_idx])
+    n = stop - start
+    names = list(OCCUPATIONS.keys())
+    profiles = list(OCCUPATIONS.values())
+    low = np.array([p['income_range'][0] for p in profiles])
+    high = np.array([p['income_range'][1] for p in profiles])
+    base_risk = np.array([p['base_risk'] for p in profiles])
+    pep_eligible = np.array([p['pep_eligible'] for p in profiles])
+
+    occ = rng.integers(0, len(names), n)
+    pick = lambda pool: _bulk[pool][rng.integers(0, FAKER_POOL_SIZE, n)]
+    index = np.arange(start, stop)
+
+    joined = _bulk['start_date'] - rng.integers(0, 1001, n).astype('timedelta64[D]')
+    email = np.char.add(np.char.add(pick('email_users'), index.astype(str)),
+                        np.char.add('@', pick('email_domains')))
+    return pd.DataFrame({
+        'user_id': _user_ids(index),
+        'name': np.char.add(np.char.add(pick('first_names'), ' '), pick('last_names')),
+        'occupation': np.array(names)[occ],
+        'email': email,
+        'phone': pick('phones'),
+        'address': pick('addresses'),
+        'annual_income': rng.integers(low[occ], high[occ] + 1),
+        'risk_score': np.clip(rng.normal(base_risk[occ], 0.1), 0.0, 1.0),
+        'joined_date': np.datetime_as_string(joined, unit='D'),
+        'is_pep': pep_eligible[occ] & (rng.random(n) < 0.8),
+    }, index=index)
+
+
+def _generate_transaction_chunk(chunk_idx, start, stop):
+    """Generates background transactions [start, stop) and returns them encoded as CSV rows."""
+    import numpy as np
+    import pandas as pd
+    rng = np.random.default_rng([_bulk['seed'], 2, chunk_idx])
+    n = stop - start
+    num_users = _bulk['num_users']
+
+    sender = rng.integers(0, num_users, n)
+    # Shift by 1..num_users-1 so the receiver is never the sender
+    receiver = (sender + rng.integers(1, num_users, n)) % num_users
+    txn_ids = (np.arange(start, stop, dtype=np.uint64) * np.uint64(_TXN_ID_MULTIPLIER)
+               + np.uint64(_bulk['txn_id_offset'])) & np.uint64(0xFFFFFFFFFFFF)
+    timestamps = _bulk['start_date'] + rng.integers(0, 91, n).astype('timedelta64[D]')
+
+    frame = pd.DataFrame({
+        'txn_id': _hex_ids('TX-', txn_ids, 12),
+        'sender_id': _user_ids(sender),
+        'receiver_id': _user_ids(receiver),
+        # SEK amounts: 100-50,000 SEK
+        'amount': rng.uniform(100, 50000, n).round(2),
+        'currency': 'SEK',
+        'timestamp': np.datetime_as_string(timestamps, unit='us'),
+        'txn_type': 'TRANSFER',
+    })
+    return frame.to_csv(header=False, index=False, lineterminator='\n').encode('utf-8')
+
+
+def _bulk_timestamp(value):
+    """An isoformat() timestamp of a scenario row in the chunks' format, with microseconds."""
+    return datetime.fromisoformat(value).isoformat(timespec='microseconds')
+
+
+def _run_chunk(task):
+    kind, chunk_idx, start, stop = task
+    if kind == 'users':
+        return _generate_user_chunk(chunk_idx, start, stop)
+    return _generate_transaction_chunk(chunk_idx, start, stop)
+
+
+def _chunks(kind, total, chunk_size):
+    return [(kind, i, start, min(start + chunk_size, total))
+            for i, start in enumerate(range(0, total, chunk_size))]
+
+
+def generate_bulk(num_users, num_transactions, seed, chunk_size=1_000_000,
+                  workers=None, output_dir='.'):
+    """Generates a large dataset column-wise with NumPy and streams it to CSV chunk by chunk.
+
+    Background users and transactions are produced in parallel worker processes and
+    written in order, so memory stays bounded by roughly `workers * chunk_size` rows.
+    The smurfing, mule ring and false positive scenarios are injected from a random
+    sample of the generated users, exactly as in the small in-memory mode.
+    """
+    import numpy as np
+    workers = workers or os.cpu_count() or 1
+    init_args = (seed, START_DATE, num_users)
+    _init_bulk_worker(*init_args)
+
+    sample_rng = np.random.default_rng([seed, 3])
+    sample_idx = np.sort(sample_rng.choice(num_users, size=min(num_users, SCENARIO_SAMPLE_SIZE), replace=False))
+    target_peps = max(5, num_users // 20)
+    pep_count = 0
+
+    pool = None
+    if workers > 1:
+        pool = multiprocessing.Pool(workers, initializer=_init_bulk_worker, initargs=init_args)
+    run = pool.imap if pool else map
+
+    try:
+        print(f"Generating {num_users:,} Users...")
+        with open(os.path.join(output_dir, 'users.csv'), 'w', newline='') as f:
+            f.write(','.join(USER_FIELDS) + '\n')
+            for chunk in run(_run_chunk, _chunks('users', num_users, chunk_size)):
+                # Cap the number of PEPs across chunks, in generation order
+                candidates = chunk['is_pep'].to_numpy()
+                allowed = np.cumsum(candidates) <= target_peps - pep_count
+                chunk['is_pep'] = candidates & allowed
+                pep_count += int(chunk['is_pep'].sum())
+                chunk.to_csv(f, header=False, index=False, lineterminator='\n')
+                in_chunk = sample_idx[(sample_idx >= chunk.index[0]) & (sample_idx <= chunk.index[-1])]
+                users.extend(chunk.loc[in_chunk].to_dict('records'))
+
+        print(f"Generating {num_transactions:,} Background Transactions...")
+        with open(os.path.join(output_dir, 'transactions.csv'), 'wb') as f:
+            f.write((','.join(TRANSACTION_FIELDS) + '\n').encode('utf-8'))
+            for i, rows in enumerate(run(_run_chunk, _chunks('transactions', num_transactions, chunk_size))):
+                f.write(rows)
+                print(f"  -> chunk {i + 1}: {min((i + 1) * chunk_size, num_transactions):,} rows")
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    # Scenario rows are few, so they go through the regular in-memory path
     inject_smurfing_pattern()
     inject_mule_ring_pattern()
     inject_false_positives()
-    save_to_csv()
+
+    # Same timestamp format and line endings as the chunks: NumPy always writes microseconds,
+    # isoformat() drops them when they are zero, and DuckDB rejects a file that mixes either
+    for txn in transactions:
+        txn['timestamp'] = _bulk_timestamp(txn['timestamp'])
+    for alert in alerts:
+        alert['created_at'] = _bulk_timestamp(alert['created_at'])
+    with open(os.path.join(output_dir, 'transactions.csv'), 'a', newline='') as f:
+        csv.DictWriter(f, fieldnames=TRANSACTION_FIELDS, lineterminator='\n').writerows(transactions)
+    with open(os.path.join(output_dir, 'alerts.csv'), 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=ALERT_FIELDS, lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(alerts)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate synthetic AML users, transactions and alerts.")
+    parser.add_argument('--users', type=int, default=NUM_USERS, help="Number of users to generate.")
+    parser.add_argument('--transactions', type=int, default=NUM_TRANSACTIONS,
+                        help="Number of background transactions to generate.")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="Random seed for reproducible runs (a random one is chosen and printed if omitted).")
+    parser.add_argument('--start-date', type=datetime.fromisoformat, default=None,
+                        help="Start of the 90 day activity window (default: 90 days ago).")
+    parser.add_argument('--bulk', action='store_true',
+                        help="Use the vectorized, chunked generator for large datasets (requires numpy and pandas).")
+    parser.add_argument('--chunk-size', type=int, default=1_000_000, help="Rows per chunk in bulk mode.")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes in bulk mode (default: number of CPUs).")
+    parser.add_argument('--output-dir', default='.', help="Directory to write the CSV files to.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    NUM_USERS = args.users
+    NUM_TRANSACTIONS = args.transactions
+    if args.start_date:
+        START_DATE = args.start_date
+    seed = args.seed if args.seed is not None else secrets.randbits(32)
+    print(f"Using seed {seed}")
+    random.seed(seed)
+    fake.seed_instance(seed)
+
+    if args.bulk:
+        generate_bulk(NUM_USERS, NUM_TRANSACTIONS, seed, args.chunk_size, args.workers, args.output_dir)
+    else:
+        generate_users()
+        generate_transactions()
+        inject_smurfing_pattern()
+        inject_mule_ring_pattern()
+        inject_false_positives()
+        save_to_csv(args.output_dir)
     print("Done! Generated users.csv, transactions.csv, alerts.csv")
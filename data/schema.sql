@@ -8,8 +8,10 @@ CREATE TABLE `aml_dataset.users` (
     address STRING,
     annual_income INT64,
     risk_score FLOAT64,
-    joined_date DATE
-);
+    joined_date DATE,
+    is_pep BOOL
+)
+CLUSTER BY user_id;
 
 -- Create Transactions Table
 CREATE TABLE `aml_dataset.transactions` (
@@ -20,7 +22,11 @@ CREATE TABLE `aml_dataset.transactions` (
     currency STRING,
     timestamp TIMESTAMP,
     txn_type STRING
-);
+)
+-- One partition per day and clustered by account, so tool queries that filter on the
+-- account and a time window only read the matching blocks of the matching days
+PARTITION BY DATE(timestamp)
+CLUSTER BY sender_id, receiver_id;
 
 -- Create Alerts Table
 CREATE TABLE `aml_dataset.alerts` (
@@ -29,5 +35,28 @@ CREATE TABLE `aml_dataset.alerts` (
     trigger_reason STRING,
     status STRING,
     created_at TIMESTAMP,
-    severity STRING
-);
+    severity STRING,
+    -- Work queue state (see the QUEUE tools): precomputed priority, and the claim holding the alert
+    priority FLOAT64,
+    claimed_by STRING,
+    claim_id STRING,
+    lease_expires_at TIMESTAMP,
+    attempts INT64
+)
+PARTITION BY DATE(created_at)
+CLUSTER BY status, severity;
+
+-- Precomputed mule rings, one row per member (written by mcp_server/ring_detection.py)
+CREATE TABLE `aml_dataset.ring_membership` (
+    ring_id STRING,
+    user_id STRING,
+    role STRING,
+    ring_size INT64,
+    hub_id STRING,
+    fan_in INT64,
+    amount_in FLOAT64,
+    amount_out FLOAT64,
+    in_cycle BOOL,
+    computed_at TIMESTAMP
+)
+CLUSTER BY user_id;
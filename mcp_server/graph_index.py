@@ -0,0 +1,318 @@
+"""
+In-memory transaction graph index for the money-flow and counterparty tools.
+
+Transactions are stored as compressed-sparse-row adjacency in both directions, with
+each account's edges sorted by timestamp, so `trace-money-flow`, `analyze-counterparties`
+and `get-recent-transactions` are answered by slicing NumPy arrays instead of scanning
+the transactions table. The index is saved as one binary file and loaded through mmap,
+so worker processes share the pages and start without parsing anything.
+
+    python mcp_server/graph_index.py --data-dir data --output data/transactions.graph
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+MAGIC = b'AMLGRAPH1\n'
+_ALIGN = 64
+
+
+def _encode_strings(values):
+    """Variable-length strings as a UTF-8 blob plus offsets."""
+    encoded = [v.encode('utf-8') for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(v) for v in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def write_arrays(path, magic, arrays, meta):
+    """Writes named arrays into one file: magic, JSON header, then 64-byte aligned raw arrays."""
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        offset = -(-offset // _ALIGN) * _ALIGN
+        layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += array.nbytes
+    header = json.dumps({'meta': meta, 'arrays': layout}).encode('utf-8')
+    data_start = -(-(len(magic) + 8 + len(header)) // _ALIGN) * _ALIGN
+    with open(path, 'wb') as f:
+        f.write(magic)
+        f.write(np.uint64(len(header)).tobytes())
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]['offset'])
+            f.write(np.ascontiguousarray(array).tobytes())
+
+
+def map_arrays(path, magic):
+    """Maps a file written by `write_arrays`; returns (arrays, meta) without copying the data."""
+    raw = np.memmap(path, dtype=np.uint8, mode='r')
+    if bytes(raw[:len(magic)]) != magic:
+        raise ValueError(f"{path} is not a {magic.decode().strip()} file")
+    header_len = int(raw[len(magic):len(magic) + 8].view(np.uint64)[0])
+    header_start = len(magic) + 8
+    header = json.loads(bytes(raw[header_start:header_start + header_len]))
+    data_start = -(-(header_start + header_len) // _ALIGN) * _ALIGN
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape'])) if spec['shape'] else 1
+        start = data_start + spec['offset']
+        arrays[name] = raw[start:start + count * dtype.itemsize].view(dtype).reshape(spec['shape'])
+    return arrays, header['meta']
+
+
+class TransactionGraph:
+    """CSR adjacency over accounts, edges sorted by (sender, timestamp).
+
+    Arrays:
+      node_ids       sorted fixed-width account ids (binary searched for lookups)
+      is_user        whether the account exists in the users table
+      risk_score     user risk score (NaN for non-users)
+      name_blob/name_offsets  user names
+      out_ptr        CSR row pointer into the edge arrays, per sender
+      src/dst/amount/ts/txn_type/txn_id  edge arrays, sorted by (src, ts)
+      in_ptr/in_edges  CSR over receivers, edge indices sorted by (dst, ts)
+    """
+
+    def __init__(self, arrays, meta):
+        self.arrays = arrays
+        self.meta = meta
+        for name, array in arrays.items():
+            setattr(self, name, array)
+        self.txn_types = meta['txn_types']
+
+    # ------------------------------------------------------------------
+    # Building and persistence
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_frames(cls, transactions, users):
+        """Builds the index from `transactions` and `users` DataFrames (schema.sql columns)."""
+        accounts = pd.concat([transactions['sender_id'], transactions['receiver_id'], users['user_id']]).unique()
+        node_ids = np.sort(np.asarray(accounts, dtype=str)).astype(np.bytes_)
+        n = len(node_ids)
+
+        user_pos = np.searchsorted(node_ids, users['user_id'].to_numpy(dtype=str).astype(np.bytes_))
+        is_user = np.zeros(n, dtype=bool)
+        is_user[user_pos] = True
+        risk_score = np.full(n, np.nan)
+        risk_score[user_pos] = users['risk_score'].to_numpy(dtype=np.float64)
+        names = np.full(n, '', dtype=object)
+        names[user_pos] = users['name'].to_numpy(dtype=object)
+        name_blob, name_offsets = _encode_strings(names)
+
+        src = np.searchsorted(node_ids, transactions['sender_id'].to_numpy(dtype=str).astype(np.bytes_))
+        dst = np.searchsorted(node_ids, transactions['receiver_id'].to_numpy(dtype=str).astype(np.bytes_))
+        ts = pd.to_datetime(transactions['timestamp'], format='ISO8601').to_numpy(dtype='datetime64[us]').view(np.int64)
+        txn_types, type_codes = np.unique(transactions['txn_type'].to_numpy(dtype=str), return_inverse=True)
+
+        order = np.lexsort((ts, src))
+        src, dst, ts = src[order], dst[order], ts[order]
+        out_ptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=out_ptr[1:])
+        in_edges = np.lexsort((ts, dst)).astype(np.int64)
+        in_ptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(dst, minlength=n), out=in_ptr[1:])
+
+        arrays = {
+            'node_ids': node_ids,
+            'is_user': is_user,
+            'risk_score': risk_score,
+            'name_blob': name_blob,
+            'name_offsets': name_offsets,
+            'out_ptr': out_ptr,
+            'src': src.astype(np.int32 if n < 2**31 else np.int64),
+            'dst': dst.astype(np.int32 if n < 2**31 else np.int64),
+            'amount': transactions['amount'].to_numpy(dtype=np.float64)[order],
+            'ts': ts,
+            'txn_type': type_codes.astype(np.uint8)[order],
+            'txn_id': transactions['txn_id'].to_numpy(dtype=str).astype(np.bytes_)[order],
+            'in_ptr': in_ptr,
+            'in_edges': in_edges,
+        }
+        return cls(arrays, {'txn_types': txn_types.tolist()})
+
+    @classmethod
+    def from_csv(cls, data_dir):
+        transactions = pd.read_csv(os.path.join(data_dir, 'transactions.csv'), dtype={'txn_id': str, 'sender_id': str, 'receiver_id': str})
+        users = pd.read_csv(os.path.join(data_dir, 'users.csv'), usecols=['user_id', 'name', 'risk_score'])
+        return cls.from_frames(transactions, users)
+
+    def save(self, path):
+        write_arrays(path, MAGIC, self.arrays, self.meta)
+
+    @classmethod
+    def load(cls, path):
+        """Maps an index file written by `save` without copying it into memory."""
+        return cls(*map_arrays(path, MAGIC))
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+    def node(self, user_id):
+        """Index of an account id, or None if it never transacted and is not a user."""
+        key = np.bytes_(user_id.encode('utf-8'))
+        pos = int(np.searchsorted(self.node_ids, key))
+        if pos < len(self.node_ids) and self.node_ids[pos] == key:
+            return pos
+        return None
+
+    def node_id(self, node):
+        return self.node_ids[node].decode('utf-8')
+
+    def name(self, node):
+        if not self.is_user[node]:
+            return None
+        return bytes(self.name_blob[self.name_offsets[node]:self.name_offsets[node + 1]]).decode('utf-8')
+
+    @staticmethod
+    def _bounds(start_date=None, end_date=None):
+        """Microsecond timestamps for a [start_date, end_date) window; None means unbounded."""
+        lo = np.datetime64(start_date, 'us').astype(np.int64) if start_date else np.iinfo(np.int64).min
+        hi = np.datetime64(end_date, 'us').astype(np.int64) if end_date else np.iinfo(np.int64).max
+        return lo, hi
+
+    def _out_edges(self, node, lo, hi):
+        """Edges sent by the node inside the window, oldest first."""
+        start, stop = self.out_ptr[node], self.out_ptr[node + 1]
+        ts = self.ts[start:stop]
+        return np.arange(start + np.searchsorted(ts, lo), start + np.searchsorted(ts, hi))
+
+    def _in_edges(self, node, lo, hi):
+        """Edges received by the node inside the window, oldest first."""
+        edges = self.in_edges[self.in_ptr[node]:self.in_ptr[node + 1]]
+        ts = self.ts[edges]
+        return edges[np.searchsorted(ts, lo):np.searchsorted(ts, hi)]
+
+    def _timestamp(self, edge):
+        return np.datetime64(int(self.ts[edge]), 'us').item().isoformat()
+
+    def _edge_row(self, edge):
+        return {
+            'txn_id': self.txn_id[edge].decode('utf-8'),
+            'sender_id': self.node_id(self.src[edge]),
+            'receiver_id': self.node_id(self.dst[edge]),
+            'amount': float(self.amount[edge]),
+            'txn_type': self.txn_types[self.txn_type[edge]],
+            'timestamp': self._timestamp(edge),
+        }
+
+    # ------------------------------------------------------------------
+    # Tools
+    # ------------------------------------------------------------------
+    def recent_transactions(self, user_id, limit=20, start_date=None, end_date=None):
+        """Same result as `get-recent-transactions`: latest transactions in either direction."""
+        node = self.node(user_id)
+        if node is None:
+            return []
+        lo, hi = self._bounds(start_date, end_date)
+        out_edges = self._out_edges(node, lo, hi)[-limit:]
+        in_edges = self._in_edges(node, lo, hi)[-limit:]
+        edges = np.unique(np.concatenate([out_edges, in_edges]))
+        edges = edges[np.argsort(-self.ts[edges], kind='stable')][:limit]
+        return [self._edge_row(e) for e in edges]
+
+    def counterparties(self, user_id, limit=10, start_date=None, end_date=None):
+        """Same result as `analyze-counterparties`: top counterparties (users only) by volume."""
+        node = self.node(user_id)
+        if node is None:
+            return []
+        lo, hi = self._bounds(start_date, end_date)
+        out_edges = self._out_edges(node, lo, hi)
+        in_edges = self._in_edges(node, lo, hi)
+        others = np.concatenate([self.dst[out_edges], self.src[in_edges]])
+        amounts = np.concatenate([self.amount[out_edges], self.amount[in_edges]])
+        keep = self.is_user[others]
+        parties, inverse = np.unique(others[keep], return_inverse=True)
+        counts = np.bincount(inverse, minlength=len(parties))
+        volumes = np.bincount(inverse, weights=amounts[keep], minlength=len(parties))
+        top = np.argsort(-volumes, kind='stable')[:limit]
+        return [{
+            'counterparty_id': self.node_id(parties[i]),
+            'counterparty_name': self.name(parties[i]),
+            'counterparty_risk': float(self.risk_score[parties[i]]),
+            'txn_count': int(counts[i]),
+            'total_volume': float(volumes[i]),
+        } for i in top]
+
+    def _continuations(self, edge, min_fraction, max_fraction, hi=np.iinfo(np.int64).max):
+        """Outgoing edges of the edge's receiver that happen after it (and before `hi`) and respect amount conservation."""
+        node = self.dst[edge]
+        start, stop = self.out_ptr[node], self.out_ptr[node + 1]
+        ts = self.ts[start:stop]
+        edges = np.arange(start + np.searchsorted(ts, self.ts[edge], side='right'), start + np.searchsorted(ts, hi))
+        if min_fraction is not None:
+            edges = edges[self.amount[edges] >= self.amount[edge] * min_fraction]
+        if max_fraction is not None:
+            edges = edges[self.amount[edges] <= self.amount[edge] * max_fraction]
+        return edges
+
+    def trace_paths(self, user_id, depth=2, limit=20, min_fraction=None, max_fraction=None, start_date=None,
+                    end_date=None):
+        """Time-respecting money-flow paths of up to `depth` hops starting at `user_id`.
+
+        Each next hop must leave the intermediate account after the previous hop arrived.
+        `min_fraction`/`max_fraction` prune hops whose amount is outside that fraction of
+        the amount received (e.g. 0.8 and 1.05 to follow forwarded funds only). Paths are
+        ordered by first-hop time, newest first, and paths that cannot be extended are kept.
+        Every hop must fall inside the [start_date, end_date) window.
+        """
+        node = self.node(user_id)
+        if node is None or not self.is_user[node]:
+            return []
+        lo, hi = self._bounds(start_date, end_date)
+        paths = []
+        first_hops = self._out_edges(node, lo, hi)[::-1]
+        for first in first_hops:
+            if not self.is_user[self.dst[first]]:
+                continue
+            stack = [[int(first)]]
+            while stack and len(paths) < limit:
+                path = stack.pop()
+                nexts = self._continuations(path[-1], min_fraction, max_fraction, hi) if len(path) < depth else []
+                if len(nexts) == 0:
+                    paths.append(path)
+                    continue
+                stack.extend(path + [int(e)] for e in nexts[::-1])
+            if len(paths) >= limit:
+                break
+        return paths
+
+    def trace_money_flow(self, user_id, depth=2, limit=20, min_fraction=None, max_fraction=None, start_date=None,
+                         end_date=None):
+        """Same columns as `trace-money-flow`, extended with a `hops` list when depth > 2."""
+        rows = []
+        for path in self.trace_paths(user_id, depth, limit, min_fraction, max_fraction, start_date, end_date):
+            first, last = path[0], path[-1] if len(path) > 1 else None
+            row = {
+                'source': self.node_id(self.src[first]),
+                'source_name': self.name(self.src[first]),
+                'intermediate': self.node_id(self.dst[first]),
+                'intermediate_name': self.name(self.dst[first]),
+                'txn_id_in': self.txn_id[first].decode('utf-8'),
+                'amount_in': float(self.amount[first]),
+                'final_destination': self.node_id(self.dst[last]) if last is not None else None,
+                'destination_name': self.name(self.dst[last]) if last is not None else None,
+                'txn_id_out': self.txn_id[last].decode('utf-8') if last is not None else None,
+                'amount_out': float(self.amount[last]) if last is not None else None,
+            }
+            if depth > 2:
+                row['hops'] = [self._edge_row(e) for e in path]
+            rows.append(row)
+        return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the transaction graph index from CSV data.")
+    parser.add_argument('--data-dir', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data'))
+    parser.add_argument('--output', required=True, help="Path of the index file to write.")
+    args = parser.parse_args()
+    graph = TransactionGraph.from_csv(args.data_dir)
+    graph.save(args.output)
+    print(f"Indexed {len(graph.src):,} transactions over {len(graph.node_ids):,} accounts -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,317 @@
+"""
+Local MCP server that runs the `tools.yaml` statements offline.
+
+Loads `data/*.csv` into an embedded DuckDB database laid out like `data/schema.sql`
+and serves every `bigquery-sql` tool under the same name over streamable HTTP, so the
+agent can be pointed at it with e.g. MCP_URL="http://127.0.0.1:5000/mcp".
+
+    python mcp_server/local_server.py --data-dir data --port 5000
+    python mcp_server/local_server.py --data-dir data --graph-index data/transactions.graph
+    python mcp_server/local_server.py --data-dir data --name-index data/users.names
+    python mcp_server/local_server.py --parquet-dir data/parquet
+"""
+import argparse
+import contextlib
+import datetime
+import decimal
+import json
+import os
+import re
+import threading
+import time
+
+import duckdb
+import yaml
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_TOOLS_PATH = os.path.join(HERE, 'tools.yaml')
+DEFAULT_DATA_DIR = os.path.join(HERE, '..', 'data')
+
+DATASET = 'aml_dataset'
+TABLES = ['users', 'transactions', 'alerts']
+# Tables written by batch jobs (mcp_server/ring_detection.py); empty until the job has run
+DERIVED_TABLES = ['ring_membership']
+# Hive partition column of each partitioned table in the Parquet export
+PARTITION_COLUMNS = {'transactions': 'txn_date', 'alerts': 'created_date'}
+# Tables the queue tools update; copied into DuckDB even when the rest is read from Parquet
+QUEUE_TABLES = ['alerts']
+# Run after loading, so the queue is ordered from the start
+LOAD_TOOLS = ['prioritize-alerts']
+
+# BigQuery type names that DuckDB spells differently
+_TYPE_MAP = {'STRING': 'VARCHAR', 'INT64': 'BIGINT', 'FLOAT64': 'DOUBLE', 'BOOL': 'BOOLEAN'}
+
+# Tools answered from the transaction graph index when one is loaded
+GRAPH_TOOLS = {
+    'trace-money-flow': 'trace_money_flow',
+    'analyze-counterparties': 'counterparties',
+    'get-recent-transactions': 'recent_transactions',
+}
+
+_DML = re.compile(r'^\s*(UPDATE|INSERT|DELETE|MERGE)\b', re.IGNORECASE | re.MULTILINE)
+
+# tools.yaml parameter types -> JSON schema types for the MCP tool listing
+_JSON_TYPES = {'string': 'string', 'integer': 'integer', 'float': 'number', 'boolean': 'boolean', 'array': 'array'}
+
+
+def translate_sql(statement):
+    """Minimal BigQuery -> DuckDB dialect translation for the tools.yaml statements."""
+    sql = statement.replace('`', '')
+    sql = re.sub(r'\b(' + '|'.join(_TYPE_MAP) + r')\b', lambda m: _TYPE_MAP[m.group(1)], sql)
+    # Storage layout clauses have no DuckDB equivalent (the Parquet export covers the layout)
+    sql = re.sub(r'\)\s*(--[^\n]*\n\s*)*(PARTITION BY|CLUSTER BY)[\s\S]*$', ')', sql)
+    # Array membership: x IN UNNEST(@ids) -> x IN (SELECT UNNEST($ids))
+    sql = re.sub(r'\bIN\s+UNNEST\((@\w+)\)', r'IN (SELECT UNNEST(\1))', sql)
+    # BigQuery timestamps are UTC; DuckDB's now() is in the session time zone
+    sql = re.sub(r'TIMESTAMP_ADD\((.+?),\s*INTERVAL\s+(@\w+|\d+)\s+SECOND\)', r'(\1 + to_seconds(\2))', sql)
+    sql = sql.replace('CURRENT_TIMESTAMP()', "CAST(now() AT TIME ZONE 'UTC' AS TIMESTAMP)")
+    # Named query parameters: @user_id -> $user_id
+    return re.sub(r'@(\w+)', r'$\1', sql)
+
+
+def load_tools(tools_path=DEFAULT_TOOLS_PATH):
+    with open(tools_path) as f:
+        config = yaml.safe_load(f)
+    return {name: tool for name, tool in config['tools'].items() if tool.get('kind') == 'bigquery-sql'}
+
+
+def _to_json_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    return value
+
+
+def create_parquet_views(con, parquet_dir):
+    """Points the dataset tables at a `data/export_parquet.py` export instead of loading them.
+
+    Returns the tables created as views.
+    """
+    views = set()
+    for table in TABLES + [t for t in DERIVED_TABLES if os.path.exists(f'{parquet_dir}/{t}.parquet')]:
+        path = f'{parquet_dir}/{table}.parquet'
+        if table not in PARTITION_COLUMNS:
+            source = f"read_parquet('{path}')"
+        else:
+            # Partition directories become a column; drop it so the views match schema.sql
+            source = f"(SELECT * EXCLUDE ({PARTITION_COLUMNS[table]}) FROM read_parquet('{path}/*/*.parquet', hive_partitioning = true))"
+        con.execute(f'CREATE OR REPLACE VIEW {DATASET}.{table} AS SELECT * FROM {source}')
+        views.add(table)
+    return views
+
+
+class LocalBackend:
+    """DuckDB-backed executor for the tools.yaml statements."""
+
+    def __init__(self, data_dir=DEFAULT_DATA_DIR, tools_path=DEFAULT_TOOLS_PATH, schema_path=None, graph_path=None,
+                 name_index_path=None, parquet_dir=None):
+        self.data_dir = data_dir
+        self.parquet_dir = parquet_dir
+        self.graph_path = graph_path
+        self.graph = None
+        self.name_index_path = name_index_path
+        self.names = None
+        self.schema_path = schema_path or os.path.join(data_dir, 'schema.sql')
+        if not os.path.exists(self.schema_path):
+            self.schema_path = os.path.join(DEFAULT_DATA_DIR, 'schema.sql')
+        self.tools = load_tools(tools_path)
+        self.statements = {name: translate_sql(tool['statement']) for name, tool in self.tools.items()}
+        self._lock = threading.Lock()
+        # Statements that write run one at a time, as BigQuery runs DML on a table, so a
+        # claim's select-then-update cannot interleave with another
+        self._write_lock = threading.Lock()
+        self.con = None
+        self.reload()
+
+    def reload(self):
+        """(Re)creates the database from the CSV files (or views over the Parquet export)."""
+        con = duckdb.connect(':memory:')
+        con.execute(f'CREATE SCHEMA {DATASET}')
+        views = create_parquet_views(con, self.parquet_dir) if self.parquet_dir else set()
+        copied = views & set(QUEUE_TABLES)
+        for table in copied:
+            con.execute(f'ALTER VIEW {DATASET}.{table} RENAME TO {table}_parquet')
+        views -= copied
+        with open(self.schema_path) as f:
+            for statement in f.read().split(';'):
+                if 'CREATE' in statement.upper() and not any(f'{DATASET}.{t}`' in statement for t in views):
+                    con.execute(translate_sql(statement))
+        for table in copied:
+            con.execute(f'INSERT INTO {DATASET}.{table} BY NAME SELECT * FROM {DATASET}.{table}_parquet')
+            con.execute(f'DROP VIEW {DATASET}.{table}_parquet')
+        for table in TABLES + DERIVED_TABLES:
+            path = os.path.join(self.data_dir, f'{table}.csv')
+            if table not in views | copied and os.path.exists(path):
+                con.execute(f'INSERT INTO {DATASET}.{table} BY NAME SELECT * FROM read_csv_auto(?, header = true)', [path])
+        for tool_name in LOAD_TOOLS:
+            if tool_name in self.statements:
+                self._execute(con.cursor(), tool_name, {})
+        graph = self._load_graph() if self.graph_path else None
+        names = self._load_name_index() if self.name_index_path else None
+        with self._lock:
+            self.con = con
+            self.graph = graph
+            self.names = names
+
+    def _stale(self, index_path, table):
+        return not os.path.exists(index_path) or (
+            os.path.getmtime(index_path) < os.path.getmtime(os.path.join(self.data_dir, f'{table}.csv')))
+
+    def _load_graph(self):
+        from graph_index import TransactionGraph
+        if self._stale(self.graph_path, 'transactions'):
+            TransactionGraph.from_csv(self.data_dir).save(self.graph_path)
+        return TransactionGraph.load(self.graph_path)
+
+    def _load_name_index(self):
+        from name_index import NameIndex
+        if self._stale(self.name_index_path, 'users'):
+            NameIndex.from_csv(self.data_dir).save(self.name_index_path)
+        return NameIndex.load(self.name_index_path)
+
+    def add_users(self, users):
+        """Inserts new users (a DataFrame with the users columns) and makes them searchable by name at once."""
+        with self._lock:
+            self.con.register('new_users', users)
+            try:
+                self.con.execute(f'INSERT INTO {DATASET}.users BY NAME SELECT * FROM new_users')
+            finally:
+                self.con.unregister('new_users')
+            if self.names is not None:
+                for user_id, name in zip(users['user_id'], users['name']):
+                    self.names.add(user_id, name)
+
+    def _search_names(self, params):
+        """`search-user-by-name` from the trigram index: ranked matches, then their profiles in one query."""
+        matches = self.names.search(params['name'])
+        if not matches:
+            return []
+        rows = self.run('get-user-details-batch', {'user_ids': [user_id for user_id, _, _ in matches]})
+        by_id = {row['user_id']: row for row in rows}
+        return [dict(by_id[user_id], similarity=similarity) for user_id, _, similarity in matches if user_id in by_id]
+
+    def run(self, tool_name, params):
+        """Runs a tool statement and returns its rows as JSON-serializable dicts."""
+        if tool_name not in self.statements:
+            raise KeyError(f"Unknown tool: {tool_name}")
+        if self.graph is not None and tool_name in GRAPH_TOOLS:
+            method = getattr(self.graph, GRAPH_TOOLS[tool_name])
+            extra = {k: params[k] for k in ('start_date', 'end_date') if params.get(k)}
+            if tool_name == 'trace-money-flow':
+                # Depth beyond 2 hops is only followed here; the statement applies the fractions too
+                extra.update({k: params[k] for k in ('min_fraction', 'max_fraction') if params.get(k) is not None})
+                extra.update({k: int(params[k]) for k in ('depth', 'limit') if params.get(k) is not None})
+            return method(params['user_id'], **extra)
+        if self.names is not None and tool_name == 'search-user-by-name':
+            return self._search_names(params)
+        with self._lock:
+            cursor = self.con.cursor()
+        try:
+            return self._execute(cursor, tool_name, params)
+        finally:
+            cursor.close()
+
+    def _execute(self, cursor, tool_name, params):
+        """Runs the tool's statements in order on `cursor`; the rows of the last one are the result."""
+        statement = self.statements[tool_name]
+        defaults = {p['name']: p['default'] for p in self.tools[tool_name].get('parameters') or [] if 'default' in p}
+        writes = _DML.search(statement) is not None
+        with self._write_lock if writes else contextlib.nullcontext():
+            if writes:
+                cursor.begin()
+            try:
+                # DuckDB binds parameters for one statement at a time
+                for sql in [part for part in statement.split(';') if part.strip()]:
+                    names = set(re.findall(r'\$(\w+)', sql))
+                    args = {name: params[name] if params.get(name) is not None else defaults.get(name) for name in names}
+                    result = cursor.execute(sql, args)
+                columns = [d[0] for d in result.description]
+                rows = [{c: _to_json_value(v) for c, v in zip(columns, row)} for row in result.fetchall()]
+            except Exception:
+                if writes:
+                    cursor.rollback()
+                raise
+            if writes:
+                cursor.commit()
+        return rows
+
+    def tool_schema(self, tool_name):
+        """JSON schema for a tool's parameters, as advertised over MCP."""
+        properties, required = {}, []
+        for param in self.tools[tool_name].get('parameters') or []:
+            prop = {'type': _JSON_TYPES.get(param['type'], 'string'), 'description': param.get('description', '')}
+            if param['type'] == 'array':
+                prop['items'] = {'type': _JSON_TYPES.get(param.get('items', {}).get('type'), 'string')}
+            if 'default' in param:
+                prop['default'] = param['default']
+            else:
+                required.append(param['name'])
+            properties[param['name']] = prop
+        return {'type': 'object', 'properties': properties, 'required': required}
+
+
+def create_app(backend, verbose=False):
+    """Builds a Starlette app serving the backend's tools over MCP streamable HTTP at /mcp."""
+    from mcp import types
+    from mcp.server.lowlevel import Server
+    from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+    from starlette.applications import Starlette
+    from starlette.routing import Mount
+
+    server = Server('aml-local-toolbox')
+
+    @server.list_tools()
+    async def list_tools():
+        return [
+            types.Tool(name=name, description=tool.get('description', ''), inputSchema=backend.tool_schema(name))
+            for name, tool in backend.tools.items()
+        ]
+
+    @server.call_tool()
+    async def call_tool(name, arguments):
+        start = time.perf_counter()
+        rows = backend.run(name, arguments or {})
+        if verbose:
+            print(f"{name} {json.dumps(arguments)} -> {len(rows)} rows in {(time.perf_counter() - start) * 1000:.2f} ms")
+        return [types.TextContent(type='text', text=json.dumps(rows, ensure_ascii=False))]
+
+    session_manager = StreamableHTTPSessionManager(app=server, stateless=True)
+
+    async def handle_mcp(scope, receive, send):
+        await session_manager.handle_request(scope, receive, send)
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        async with session_manager.run():
+            yield
+
+    return Starlette(routes=[Mount('/mcp', app=handle_mcp)], lifespan=lifespan)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve tools.yaml over MCP from local CSV data.")
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help="Directory with users/transactions/alerts CSVs.")
+    parser.add_argument('--tools', default=DEFAULT_TOOLS_PATH, help="Path to tools.yaml.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=int(os.getenv('PORT', '5000')))
+    parser.add_argument('--graph-index', default=None,
+                        help="Serve the money-flow and counterparty tools from this graph index file "
+                             "(built from the CSVs if missing or stale).")
+    parser.add_argument('--name-index', default=None,
+                        help="Serve search-user-by-name from this trigram name index file "
+                             "(built from the CSVs if missing or stale).")
+    parser.add_argument('--parquet-dir', default=None,
+                        help="Query a data/export_parquet.py export in place instead of loading the CSVs.")
+    parser.add_argument('--verbose', action='store_true', help="Log each tool call with its latency.")
+    args = parser.parse_args()
+
+    import uvicorn
+    backend = LocalBackend(args.data_dir, args.tools, graph_path=args.graph_index, name_index_path=args.name_index,
+                           parquet_dir=args.parquet_dir)
+    print(f"Serving {len(backend.tools)} tools at http://{args.host}:{args.port}/mcp")
+    uvicorn.run(create_app(backend, args.verbose), host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,302 @@
+"""
+Trigram inverted index over user names for `search-user-by-name`.
+
+Names are folded before indexing (case, å/ä/ö and other diacritics, hyphens), so
+"Asa Soderberg" finds "Åsa Söderberg". Each folded word is padded and split into
+trigrams; every trigram maps to a sorted posting list of user rows. A query only
+reads the postings of its rarest trigrams to collect candidates, then scores the
+candidates against the remaining lists. Results are ranked by the share of query
+trigrams the name contains, then by how much of the name the query covers.
+
+Full-name queries are answered from a hash of the folded name in tens of
+microseconds at 1M users. Fuzzy surname and partial-name queries are much slower
+when the name pool is small and every trigram is common: at 1M synthetic sv_SE
+names they take 2-4 ms p50, and surnames are slower than a LIKE scan there.
+
+The index is saved with the same mmap-able layout as the transaction graph index.
+Users added after the build go into a small in-memory delta that is searched
+together with the base index until the next rebuild.
+
+    python mcp_server/name_index.py --data-dir data --output data/users.names
+"""
+import argparse
+import hashlib
+import math
+import os
+import threading
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from graph_index import _encode_strings, map_arrays, write_arrays
+
+MAGIC = b'AMLNAMES1\n'
+
+# Letters NFKD does not decompose into a base letter plus a combining mark
+_FOLD = str.maketrans({'ø': 'o', 'æ': 'ae', 'ß': 'ss', 'đ': 'd', 'ł': 'l', 'þ': 'th', '-': ' ', '.': ' ', "'": ''})
+
+# Share of the query's trigrams a name must contain to be returned
+DEFAULT_THRESHOLD = 0.5
+# Upper bound on posting entries read in full per query; only very short, very common queries reach it
+MAX_CANDIDATES = 200_000
+
+
+def fold(text):
+    """Case- and accent-insensitive form of a name: 'Åsa Söderberg-Öhman' -> 'asa soderberg ohman'."""
+    text = unicodedata.normalize('NFKD', text.casefold()).translate(_FOLD)
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(text.split())
+
+
+def name_key(text):
+    """64-bit hash of the folded name, for exact (accent-insensitive) full-name lookups."""
+    return int.from_bytes(hashlib.blake2b(fold(text).encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def trigrams(text):
+    """Set of trigrams of the folded text, with each word padded like pg_trgm ('  so', ' so', ..., 'rg ')."""
+    grams = set()
+    for word in fold(text).split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class NameIndex:
+    """Base index (CSR posting lists, possibly memory-mapped) plus an in-memory delta for new users.
+
+    Arrays:
+      grams          sorted trigram vocabulary (UTF-8, fixed width)
+      ptr            CSR row pointer into `rows`, per trigram
+      rows           posting lists: user rows, sorted within each trigram
+      dense_grams/bitmaps  membership bitmaps for the most common trigrams
+      name_keys/name_key_rows  sorted folded-name hashes and their rows, for exact matches
+      gram_count     number of distinct trigrams per user name
+      user_ids       user id per row
+      name_blob/name_offsets  original user names
+    """
+
+    def __init__(self, arrays, meta=None):
+        self.arrays = arrays
+        self.meta = meta or {}
+        for name, array in arrays.items():
+            # Plain ndarray views: slicing np.memmap objects carries noticeable per-call overhead
+            setattr(self, name, np.asarray(array))
+        self.size = len(self.user_ids)
+        # The vocabulary is small (tens of thousands of trigrams); a dict beats binary search per lookup
+        self._vocabulary = {g.decode('utf-8'): i for i, g in enumerate(self.grams.tolist())}
+        self._bitmap_slot = {int(g): slot for slot, g in enumerate(self.dense_grams)}
+        self._delta_postings = {}  # trigram -> list of rows
+        self._delta_ids = []
+        self._delta_names = []
+        self._delta_counts = []
+        self._delta_keys = {}  # folded-name hash -> rows
+        self._counter = None
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Building and persistence
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_frame(cls, users):
+        """Builds the index from a DataFrame with `user_id` and `name` columns."""
+        names = users['name'].fillna('').to_numpy(dtype=object)
+        vocabulary, gram_ids, row_ids = {}, [], []
+        gram_count = np.zeros(len(names), dtype=np.uint16)
+        for row, name in enumerate(names):
+            grams = trigrams(name)
+            gram_count[row] = len(grams)
+            for gram in grams:
+                gram_ids.append(vocabulary.setdefault(gram, len(vocabulary)))
+            row_ids.extend([row] * len(grams))
+        # Renumber trigrams in sorted order so the file layout does not depend on insertion order
+        grams = np.array(sorted(vocabulary), dtype=object)
+        remap = np.empty(len(grams), dtype=np.int64)
+        remap[[vocabulary[g] for g in grams]] = np.arange(len(grams))
+        gram_ids = remap[np.asarray(gram_ids, dtype=np.int64)]
+        row_ids = np.asarray(row_ids, dtype=np.uint32)
+        order = np.lexsort((row_ids, gram_ids))
+        ptr = np.zeros(len(grams) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(gram_ids, minlength=len(grams)), out=ptr[1:])
+        rows = row_ids[order]
+        # Trigrams in more than 1/64 of the names also get a bitmap (at most twice the size of their posting list)
+        dense = np.flatnonzero(np.diff(ptr) * 64 > len(names)).astype(np.int32)
+        bitmaps = np.zeros((len(dense), (len(names) + 7) // 8), dtype=np.uint8)
+        for slot, gram in enumerate(dense):
+            bits = np.zeros(bitmaps.shape[1] * 8, dtype=bool)
+            bits[rows[ptr[gram]:ptr[gram + 1]]] = True
+            bitmaps[slot] = np.packbits(bits, bitorder='little')
+        keys = np.array([name_key(name) for name in names], dtype=np.uint64)
+        key_order = np.argsort(keys, kind='stable').astype(np.uint32)
+        name_blob, name_offsets = _encode_strings(names)
+        arrays = {
+            'grams': np.array([g.encode('utf-8') for g in grams], dtype=np.bytes_),
+            'ptr': ptr,
+            'rows': rows,
+            'dense_grams': dense,
+            'bitmaps': bitmaps,
+            'name_keys': keys[key_order],
+            'name_key_rows': key_order,
+            'gram_count': gram_count,
+            'user_ids': users['user_id'].to_numpy(dtype=str).astype(np.bytes_),
+            'name_blob': name_blob,
+            'name_offsets': name_offsets,
+        }
+        return cls(arrays)
+
+    @classmethod
+    def from_csv(cls, data_dir):
+        return cls.from_frame(pd.read_csv(os.path.join(data_dir, 'users.csv'), usecols=['user_id', 'name']))
+
+    def save(self, path):
+        if self._delta_ids:
+            raise ValueError("Rebuild the index to include users added since it was loaded.")
+        write_arrays(path, MAGIC, self.arrays, self.meta)
+
+    @classmethod
+    def load(cls, path):
+        return cls(*map_arrays(path, MAGIC))
+
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+    def add(self, user_id, name):
+        """Makes a new user searchable immediately (kept in the delta until the next rebuild)."""
+        row = self.size + len(self._delta_ids)
+        grams = trigrams(name)
+        for gram in grams:
+            self._delta_postings.setdefault(gram, []).append(row)
+        self._delta_ids.append(user_id)
+        self._delta_names.append(name)
+        self._delta_counts.append(len(grams))
+        self._delta_keys.setdefault(name_key(name), []).append(row)
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+    def _postings(self, gram):
+        """(sorted rows containing the trigram, bitmap over the base rows or None)."""
+        pos = self._vocabulary.get(gram)
+        if pos is not None:
+            base = self.rows[self.ptr[pos]:self.ptr[pos + 1]]
+            slot = self._bitmap_slot.get(pos)
+            bitmap = self.bitmaps[slot] if slot is not None else None
+        else:
+            base, bitmap = self.rows[:0], None
+        delta = self._delta_postings.get(gram)
+        if delta:
+            base = np.concatenate([base, np.asarray(delta, dtype=self.rows.dtype)])
+        return base, bitmap
+
+    def _contains(self, posting, candidates):
+        """Whether each sorted candidate row is in the posting list."""
+        rows, bitmap = posting
+        if not len(rows):
+            return np.zeros(len(candidates), dtype=bool)
+        if bitmap is None or candidates[-1] >= self.size:
+            # Binary search; also covers delta rows, which the bitmaps do not
+            pos = np.minimum(np.searchsorted(rows, candidates), len(rows) - 1)
+            return rows[pos] == candidates
+        # Common trigram: one bit lookup per candidate instead of a binary search over a long list
+        return ((bitmap[candidates >> 3] >> (candidates & 7)) & 1).astype(bool)
+
+    def user_id(self, row):
+        if row < self.size:
+            return self.user_ids[row].decode('utf-8')
+        return self._delta_ids[row - self.size]
+
+    def name(self, row):
+        if row < self.size:
+            return bytes(self.name_blob[self.name_offsets[row]:self.name_offsets[row + 1]]).decode('utf-8')
+        return self._delta_names[row - self.size]
+
+    def _gram_counts(self, rows):
+        counts = np.empty(len(rows), dtype=np.float64)
+        base = rows < self.size
+        counts[base] = self.gram_count[rows[base]]
+        counts[~base] = [self._delta_counts[r - self.size] for r in rows[~base]]
+        return counts
+
+    def _shared(self, candidates, postings):
+        """Number of posting lists each (sorted, unique) candidate row appears in."""
+        shared = np.zeros(len(candidates), dtype=np.int64)
+        if len(candidates):
+            for posting in postings:
+                shared += self._contains(posting, candidates)
+        return shared
+
+    def _rank(self, candidates, shared, total, limit):
+        similarity = shared / total
+        coverage = shared / np.maximum(self._gram_counts(candidates), 1)
+        order = np.lexsort((candidates, -coverage, -similarity))[:limit]
+        return [(self.user_id(int(r)), self.name(int(r)), round(float(similarity[i]), 3))
+                for i, r in zip(order, candidates[order])]
+
+    def _seed_counts(self, seeds):
+        """Per-row number of `seeds` lists containing each row, using a dense scratch counter."""
+        total = self.size + len(self._delta_ids)
+        with self._lock:
+            if self._counter is None or len(self._counter) < total:
+                # int32: a long query has more seed lists than a uint8 can count
+                self._counter = np.zeros(total + 1024, dtype=np.int32)
+            counter = self._counter
+            for posting, _ in seeds:
+                counter[posting] += 1
+            rows = np.concatenate([posting for posting, _ in seeds])
+            counts = counter[rows].astype(np.int64)
+            counter[rows] = 0
+        return rows, counts
+
+    def search(self, query, limit=5, threshold=DEFAULT_THRESHOLD, max_candidates=MAX_CANDIDATES):
+        """Returns up to `limit` (user_id, name, similarity) tuples, best match first.
+
+        If the query equals one or more full names after folding, only those users are returned.
+
+        The names found through the rarest trigram give a lower bound on the `limit`-th best
+        score. Only names reaching that score can be in the result, and each of them appears in
+        one of the rarest len(grams) - score + 1 posting lists, so only those lists are read in
+        full; the common trigrams are checked for the surviving candidates only.
+        """
+        grams = trigrams(query)
+        if not grams:
+            return []
+        # Fast path: a query that is somebody's full name (after folding) returns just those users
+        key = np.uint64(name_key(query))
+        start, end = np.searchsorted(self.name_keys, key, 'left'), np.searchsorted(self.name_keys, key, 'right')
+        exact = sorted(self.name_key_rows[start:end].tolist()) + self._delta_keys.get(int(key), [])
+        if exact:
+            return [(self.user_id(r), self.name(r), 1.0) for r in exact[:limit]]
+        postings = sorted((self._postings(g) for g in grams), key=lambda p: len(p[0]))
+        required = max(1, math.ceil(threshold * len(grams)))
+        kth = required
+        if len(postings[0][0]) >= limit:
+            shared = self._shared(postings[0][0], postings[1:]) + 1
+            kth = max(kth, int(np.partition(shared, -limit)[-limit]))
+        seeds, scanned = [], 0
+        for posting in postings[:len(grams) - kth + 1]:
+            if seeds and scanned + len(posting[0]) > max_candidates:
+                break
+            seeds.append(posting)
+            scanned += len(posting[0])
+        rest = postings[len(seeds):]
+        rows, shared = self._seed_counts(seeds)
+        keep = shared + len(rest) >= kth
+        rows, index = np.unique(rows[keep], return_index=True)
+        shared = shared[keep][index] + self._shared(rows, rest)
+        keep = shared >= required
+        return self._rank(rows[keep], shared[keep], len(grams), limit)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the user name trigram index from CSV data.")
+    parser.add_argument('--data-dir', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data'))
+    parser.add_argument('--output', required=True, help="Path of the index file to write.")
+    args = parser.parse_args()
+    index = NameIndex.from_csv(args.data_dir)
+    index.save(args.output)
+    print(f"Indexed {index.size:,} names over {len(index.grams):,} trigrams -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+"""
+Batch job that finds mule rings across the whole transaction graph and writes `ring_membership`.
+
+1. Rapid-forwarding edges: an account receives a large payment (FORWARD_MIN_AMOUNT or more)
+   and sends between FORWARD_SHARE and 100% of it on within FORWARD_WINDOW. DuckDB runs this
+   temporal self-join out of core under `--memory-limit`, so the full transaction history
+   never has to fit in memory.
+2. The forwarding edges are collapsed to (sender, receiver) pairs and streamed in chunks into
+   array-backed state: a union-find parent array gives the connected components (rings),
+   bincounts give each account's fan-in (distinct forwarders paying into it).
+3. Short cycles (up to MAX_CYCLE_LENGTH accounts) are searched in the CSR adjacency of the
+   pairs, after repeatedly dropping accounts with no forwarding in or out.
+
+Memory is proportional to the forwarding pairs, which are a small fraction of all edges.
+Rings of at least MIN_RING_SIZE accounts (or containing a cycle) are written one row per
+member; the agent reads them with the `get-ring-membership` tool.
+
+    python mcp_server/ring_detection.py --data-dir data
+    python mcp_server/ring_detection.py --parquet-dir data/parquet --output data/parquet/ring_membership.parquet
+"""
+import argparse
+import datetime
+import os
+import time
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+FORWARD_MIN_AMOUNT = 100_000
+FORWARD_SHARE = 0.9
+FORWARD_WINDOW = 24 * 3600
+# Distinct forwarders paying into an account that make it a hub
+FAN_IN_MIN = 3
+MIN_RING_SIZE = 3
+MAX_CYCLE_LENGTH = 4
+# Cycle search stops after this many cycles; rings found beyond it are still reported
+MAX_CYCLES = 100_000
+CHUNK_ROWS = 1_000_000
+
+RING_FIELDS = ['ring_id', 'user_id', 'role', 'ring_size', 'hub_id', 'fan_in', 'amount_in', 'amount_out',
+               'in_cycle', 'computed_at']
+
+FORWARDS_SQL = """
+CREATE TEMP TABLE forward_pairs AS
+WITH large_in AS (
+  SELECT receiver_id, amount, timestamp FROM txns WHERE amount >= $min_amount
+),
+forwards AS (
+  SELECT DISTINCT o.txn_id, o.sender_id, o.receiver_id, o.amount
+  FROM txns o
+  JOIN large_in i ON o.sender_id = i.receiver_id
+  WHERE o.timestamp > i.timestamp
+    AND o.timestamp <= i.timestamp + to_seconds($window)
+    AND o.amount >= $share * i.amount AND o.amount <= i.amount
+    AND o.receiver_id <> o.sender_id
+)
+SELECT sender_id, receiver_id, SUM(amount) AS amount FROM forwards GROUP BY sender_id, receiver_id
+"""
+
+NODES_SQL = """
+CREATE TEMP TABLE forward_nodes AS
+SELECT account, CAST(ROW_NUMBER() OVER (ORDER BY account) - 1 AS INTEGER) AS id
+FROM (SELECT sender_id AS account FROM forward_pairs UNION SELECT receiver_id FROM forward_pairs)
+"""
+
+PAIRS_SQL = """
+SELECT s.id AS src, r.id AS dst, p.amount
+FROM forward_pairs p
+JOIN forward_nodes s ON s.account = p.sender_id
+JOIN forward_nodes r ON r.account = p.receiver_id
+"""
+
+
+def _compress(parent):
+    while True:
+        grandparent = parent[parent]
+        if np.array_equal(grandparent, parent):
+            return parent
+        parent = grandparent
+
+
+def union(parent, src, dst):
+    """Merges the components joined by the edges; `parent` stays fully compressed.
+
+    Roots are hooked under the smaller root of each edge (vectorized with np.minimum.at)
+    and paths are then compressed by pointer jumping, until no edge spans two components.
+    """
+    while True:
+        a, b = parent[src], parent[dst]
+        split = a != b
+        if not split.any():
+            return parent
+        np.minimum.at(parent, np.maximum(a[split], b[split]), np.minimum(a[split], b[split]))
+        parent = _compress(parent)
+
+
+def csr(n, src, dst):
+    order = np.lexsort((dst, src))
+    ptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=ptr[1:])
+    return ptr, dst[order]
+
+
+def short_cycles(n, src, dst, max_length=MAX_CYCLE_LENGTH, max_cycles=MAX_CYCLES):
+    """Simple directed cycles of 2..max_length accounts, each reported once from its smallest node."""
+    # Accounts on a cycle both send and receive along it; peel the rest off first
+    alive = np.ones(len(src), dtype=bool)
+    while True:
+        has_out = np.bincount(src[alive], minlength=n) > 0
+        has_in = np.bincount(dst[alive], minlength=n) > 0
+        keep = alive & has_in[src] & has_out[src] & has_in[dst] & has_out[dst]
+        if keep.sum() == alive.sum():
+            break
+        alive = keep
+    ptr, adj = csr(n, src[alive], dst[alive])
+    cycles = []
+    for start in np.unique(src[alive]).tolist():
+        stack = [(start, [start])]
+        while stack:
+            node, path = stack.pop()
+            for nxt in adj[ptr[node]:ptr[node + 1]].tolist():
+                if nxt == start:
+                    cycles.append(path)
+                    if len(cycles) >= max_cycles:
+                        return cycles
+                elif nxt > start and nxt not in path and len(path) < max_length:
+                    stack.append((nxt, path + [nxt]))
+    return cycles
+
+
+def find_rings(con, chunk_rows=CHUNK_ROWS):
+    """Runs the detection over the `txns` relation on `con`; returns one row per ring member."""
+    con.execute(FORWARDS_SQL, {'min_amount': FORWARD_MIN_AMOUNT, 'share': FORWARD_SHARE, 'window': FORWARD_WINDOW})
+    con.execute(NODES_SQL)
+    n = con.execute('SELECT COUNT(*) FROM forward_nodes').fetchone()[0]
+    parent = np.arange(n, dtype=np.int32)
+    fan_in = np.zeros(n, dtype=np.int64)
+    amount_in = np.zeros(n)
+    amount_out = np.zeros(n)
+    src_parts, dst_parts = [], []
+    result = con.execute(PAIRS_SQL)
+    while True:
+        chunk = result.fetch_df_chunk(max(1, chunk_rows // 2048))
+        if chunk.empty:
+            break
+        src = chunk['src'].to_numpy(dtype=np.int32)
+        dst = chunk['dst'].to_numpy(dtype=np.int32)
+        amount = chunk['amount'].to_numpy(dtype=np.float64)
+        parent = union(parent, src, dst)
+        # Pairs are distinct, so counting them per receiver counts distinct forwarders
+        fan_in += np.bincount(dst, minlength=n)
+        amount_in += np.bincount(dst, weights=amount, minlength=n)
+        amount_out += np.bincount(src, weights=amount, minlength=n)
+        src_parts.append(src)
+        dst_parts.append(dst)
+    if not n:
+        return pd.DataFrame(columns=RING_FIELDS)
+    src, dst = np.concatenate(src_parts), np.concatenate(dst_parts)
+
+    in_cycle = np.zeros(n, dtype=bool)
+    for cycle in short_cycles(n, src, dst):
+        in_cycle[cycle] = True
+    ring_size = np.bincount(parent, minlength=n)[parent]
+    ring_has_cycle = np.bincount(parent, weights=in_cycle, minlength=n)[parent] > 0
+    member = (ring_size >= MIN_RING_SIZE) | ring_has_cycle
+    # Each ring's hub: its member with the largest fan-in, if that reaches FAN_IN_MIN
+    order = np.lexsort((-amount_in, -fan_in, parent))
+    first = np.ones(n, dtype=bool)
+    first[1:] = parent[order][1:] != parent[order][:-1]
+    top = np.full(n, -1)
+    top[parent[order][first]] = order[first]
+    hub = top[parent]
+    hub = np.where(fan_in[hub] >= FAN_IN_MIN, hub, -1)
+
+    accounts = con.execute('SELECT account FROM forward_nodes ORDER BY id').fetchnumpy()['account']
+    accounts = np.asarray(accounts, dtype=object)
+    role = np.where(fan_in >= FAN_IN_MIN, 'hub', np.where(amount_out > 0, 'forwarder', 'recipient'))
+    rows = pd.DataFrame({
+        'ring_id': 'RING-' + accounts[parent],
+        'user_id': accounts,
+        'role': role,
+        'ring_size': ring_size,
+        'hub_id': np.where(hub >= 0, accounts[np.maximum(hub, 0)], None),
+        'fan_in': fan_in,
+        'amount_in': amount_in.round(2),
+        'amount_out': amount_out.round(2),
+        'in_cycle': in_cycle,
+        'computed_at': datetime.datetime.now().replace(microsecond=0).isoformat(),
+    })[member]
+    return rows.sort_values(['ring_id', 'user_id']).reset_index(drop=True)
+
+
+def connect(data_dir=None, parquet_dir=None, memory_limit=None, temp_dir=None):
+    """DuckDB connection exposing the transactions as `txns`, from the CSV or the Parquet export."""
+    con = duckdb.connect()
+    if memory_limit:
+        con.execute(f"SET memory_limit = '{memory_limit}'")
+    if temp_dir:
+        con.execute(f"SET temp_directory = '{temp_dir}'")
+    if parquet_dir:
+        source = f"read_parquet('{parquet_dir}/transactions.parquet/*/*.parquet', hive_partitioning = true)"
+    else:
+        source = f"read_csv_auto('{os.path.join(data_dir, 'transactions.csv')}', header = true)"
+    con.execute(f"CREATE VIEW txns AS SELECT txn_id, sender_id, receiver_id, amount, CAST(timestamp AS TIMESTAMP) AS timestamp "
+                f"FROM {source}")
+    return con
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detect mule rings over all transactions and write ring_membership.")
+    parser.add_argument('--data-dir', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data'))
+    parser.add_argument('--parquet-dir', default=None, help="Read transactions from a data/export_parquet.py export.")
+    parser.add_argument('--output', default=None, help="CSV or .parquet path (default: <data-dir>/ring_membership.csv).")
+    parser.add_argument('--memory-limit', default=None, help="DuckDB memory limit, e.g. 4GB; larger joins spill to disk.")
+    parser.add_argument('--temp-dir', default=None, help="Where DuckDB spills when over the memory limit.")
+    args = parser.parse_args()
+
+    start = time.time()
+    con = connect(args.data_dir, args.parquet_dir, args.memory_limit, args.temp_dir)
+    rows = find_rings(con)
+    output = args.output or os.path.join(args.data_dir, 'ring_membership.csv')
+    if output.endswith('.parquet'):
+        rows.to_parquet(output, index=False)
+    else:
+        rows.to_csv(output, index=False)
+    hubs = rows[rows['role'] == 'hub']
+    print(f"{rows['ring_id'].nunique()} rings, {len(rows)} members, {len(hubs)} hubs, "
+          f"{int(rows['in_cycle'].sum())} accounts on short cycles in {time.time() - start:.1f}s -> {output}")
+
+
+if __name__ == '__main__':
+    main()